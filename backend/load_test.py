@@ -0,0 +1,262 @@
+"""Load generator for the measurement and optimizer services.
+
+Usage:
+  python load_test.py measure --start --concurrency 8 --requests 100
+  python load_test.py optimize --url http://localhost:8000 --rate 2 --duration 60
+
+Targets: "measure" replays the image pairs in measurement_system/testing/images,
+"measure2d" replays every image and "optimize" sends generated packing problems.
+With --rate, requests arrive as a Poisson process at that many per second and
+latency is counted from the scheduled arrival, so time spent queued behind a
+slow server is included; without it each of the --concurrency clients sends
+its next request as soon as the previous one returns.
+"""
+import argparse
+import base64
+import glob
+import json
+import math
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+IMAGES_DIRECTORY = os.path.join(BACKEND_DIRECTORY, "measurement_system", "testing", "images")
+
+TARGETS = {
+    "measure": ("measurement_system", "/measure"),
+    "measure2d": ("measurement_system", "/measure2d"),
+    "optimize": ("optimizer", "/optimize"),
+}
+
+# The bundled photos use a credit card on the left as the reference object
+REFERENCE = {"ref_obj_pos": "left", "ref_obj_width_real": 8.56, "ref_obj_height_real": 5.39}
+
+
+def encode_image(path):
+    with open(path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode("utf-8")
+
+
+def measure_payloads():
+    pairs = sorted(glob.glob(os.path.join(IMAGES_DIRECTORY, "*-1.jpg")))
+    return [dict(REFERENCE, front_image_b64=encode_image(front),
+                 side_image_b64=encode_image(front[:-len("-1.jpg")] + "-2.jpg"))
+            for front in pairs]
+
+
+def measure2d_payloads():
+    return [dict(REFERENCE, image_b64=encode_image(path))
+            for path in sorted(glob.glob(os.path.join(IMAGES_DIRECTORY, "*.jpg")))]
+
+
+def optimize_payloads(items, count=20, seed=0):
+    """Random packing problems that fill roughly 60% of their container."""
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        boxes = [{"id": i, "dimensions": {"width": rng.randint(2, 8), "height": rng.randint(2, 8),
+                                          "depth": rng.randint(2, 8)}} for i in range(items)]
+        volume = sum(b["dimensions"]["width"] * b["dimensions"]["height"] * b["dimensions"]["depth"]
+                     for b in boxes)
+        side = max(8, round((volume / 0.6) ** (1 / 3)))
+        payloads.append({"container": {"width": side, "height": side, "depth": side},
+                         "items": boxes, "config": {"warm_start": False}})
+    return payloads
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(service, workers):
+    """Start a service under gunicorn with its own config and wait until it accepts connections."""
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                              cwd=os.path.join(BACKEND_DIRECTORY, service), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return server, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{service} did not start")
+
+
+class LoadTest:
+    """Sends payloads to one endpoint and records the outcome of every request."""
+
+    def __init__(self, url, payloads, concurrency, rate=None, total=None, duration=None,
+                 timeout=60, seed=0):
+        self.url = url
+        self.bodies = [json.dumps(payload).encode() for payload in payloads]
+        self.concurrency = concurrency
+        self.rate = rate
+        self.total = total
+        self.duration = duration
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.results = []  # (status, latency seconds, bytes sent)
+
+    def send(self, body, scheduled):
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        except OSError:
+            status = "connection error"
+        with self.lock:
+            self.results.append((status, time.perf_counter() - scheduled, len(body)))
+
+    def run(self):
+        start = time.perf_counter()
+        stop_at = start + self.duration if self.duration else None
+        arrivals = queue.Queue()
+        sent = 0
+
+        def next_body():
+            """Body of the next request, or None once the run is over."""
+            nonlocal sent
+            with self.lock:
+                if self.total is not None and sent >= self.total:
+                    return None
+                if stop_at is not None and time.perf_counter() >= stop_at:
+                    return None
+                sent += 1
+                return self.bodies[(sent - 1) % len(self.bodies)]
+
+        def open_loop_client():
+            while True:
+                job = arrivals.get()
+                if job is None:
+                    return
+                self.send(*job)
+
+        def closed_loop_client():
+            # Each client keeps exactly one request outstanding
+            while True:
+                body = next_body()
+                if body is None:
+                    return
+                self.send(body, time.perf_counter())
+
+        client = open_loop_client if self.rate else closed_loop_client
+        workers = [threading.Thread(target=client, daemon=True) for _ in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+
+        if self.rate:
+            # Open loop: arrivals don't wait for responses
+            next_arrival = start
+            while True:
+                next_arrival += self.random.expovariate(self.rate)
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+                body = next_body()
+                if body is None:
+                    break
+                arrivals.put((body, next_arrival))
+            for _ in workers:
+                arrivals.put(None)
+
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - start
+
+    def report(self, elapsed):
+        latencies = sorted(latency for status, latency, _ in self.results if status == 200)
+        statuses = {}
+        for status, _, _ in self.results:
+            statuses[status] = statuses.get(status, 0) + 1
+        sent_bytes = sum(size for _, _, size in self.results)
+        return {
+            "requests": len(self.results),
+            "elapsed": round(elapsed, 2),
+            "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+            "upload_mib_per_second": round(sent_bytes / elapsed / 1024 / 1024, 2) if elapsed else 0.0,
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3) if latencies else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", choices=TARGETS)
+    parser.add_argument("--url", help="service base URL, e.g. http://localhost:8000")
+    parser.add_argument("--start", action="store_true", help="start the service locally under gunicorn")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers with --start")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads")
+    parser.add_argument("--rate", type=float, help="open-loop arrival rate in requests per second")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--items", type=int, default=30, help="items per generated packing problem")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if not args.url and not args.start:
+        parser.error("pass --url or --start")
+    if args.requests is None and args.duration is None:
+        args.requests = 50
+
+    service, path = TARGETS[args.target]
+    if args.target == "optimize":
+        payloads = optimize_payloads(args.items, seed=args.seed)
+    elif args.target == "measure":
+        payloads = measure_payloads()
+    else:
+        payloads = measure2d_payloads()
+
+    server = None
+    base_url = args.url
+    if args.start:
+        server, base_url = start_service(service, args.workers)
+    try:
+        load_test = LoadTest(base_url.rstrip("/") + path, payloads, args.concurrency, rate=args.rate,
+                             total=args.requests, duration=args.duration, timeout=args.timeout,
+                             seed=args.seed)
+        report = load_test.report(load_test.run())
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"{args.target}: {report['requests']} requests in {report['elapsed']}s, "
+          f"{report['throughput']} ok/s, statuses {report['statuses']}")
+    print(f"latency p50 {report['p50']}s  p95 {report['p95']}s  p99 {report['p99']}s  max {report['max']}s, "
+          f"upload {report['upload_mib_per_second']} MiB/s")
+
+
+if __name__ == '__main__':
+    main()
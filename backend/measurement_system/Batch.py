@@ -0,0 +1,59 @@
+import base64
+import functools
+from ImageProcessor import ImageProcessor
+from ResultCache import result_cache
+from ThreadPool import iterate_concurrently, run_concurrently
+
+
+class ItemError(ValueError):
+    """A problem with one item of a batch, reported in that item's result."""
+
+
+def measure_item(item, measurement_system):
+    """
+    Decode and measure one item: a front and side image pair, or a single
+    image for a 2D measurement. Settings other than the item's manual
+    polygons come from measurement_system.
+    """
+    names = ("front_image", "side_image") if "front_image_b64" in item or "side_image_b64" in item \
+        else ("image",)
+    encoded_images = [item.get(f"{name}_b64") for name in names]
+    if not all(encoded_images):
+        raise ItemError("Missing image data.")
+
+    try:
+        buffers = [base64.b64decode(encoded) for encoded in encoded_images]
+    except ValueError:
+        raise ItemError("Invalid image data.")
+
+    polygons = [item.get(f"polygons_{name}") or None for name in names]
+    item_system = measurement_system.with_selection(tuple(polygons) if len(polygons) == 2 else (polygons[0], None))
+    cache_key = result_cache.key(buffers, item_system.cache_parameters())
+    results = result_cache.get(cache_key)
+    if results is not None:
+        return results
+
+    images = run_concurrently(
+        *[functools.partial(ImageProcessor.decode_image_buffer, buffer) for buffer in buffers])
+    if any(image is None for image in images):
+        raise ItemError("Invalid image data.")
+
+    if len(images) == 2:
+        results = item_system.measure_3d_item(*images)
+    else:
+        results = item_system.measure_2d_item(images[0], polygons[0])
+    if "error" in results:
+        raise ItemError(results["error"])
+    result_cache.put(cache_key, results)
+    return results
+
+
+def measure_batch(items, measurement_system):
+    """Measure items concurrently, yielding their results in order; failures become per-item errors."""
+    def measure(item):
+        try:
+            return {"id": item.get("id"), **measure_item(item, measurement_system)}
+        except Exception as e:
+            return {"id": item.get("id"), "error": str(e)}
+
+    return iterate_concurrently(*[functools.partial(measure, item) for item in items])
@@ -1,14 +1,5 @@
 import cv2 as cv
 import numpy as np
-from imutils import perspective as imutils_perspective
-from imutils import grab_contours as imutils_grab_contours
-from imutils.contours import sort_contours as imutils_sort_contours
-from scipy.spatial.distance import euclidean
-import os
-import base64
-import io
-from PIL import Image
-from flask import Flask, request, jsonify
 
 
 class Config:
@@ -19,6 +10,17 @@ class Config:
     CANNY_KERNEL = np.ones((3, 3), np.uint8)
     CANNY_DILATE_ITERATIONS = 5
     CANNY_ERODE_ITERATIONS = 3
+    # Contours smaller than this (in resized-image pixels) are noise, not objects
+    MIN_CONTOUR_AREA = 100
+    # Coarse-to-fine contour detection: candidates are found at 1/PYRAMID_SCALE
+    # size and refined at full size within PYRAMID_MARGIN pixels around them
+    PYRAMID_SCALE = 4
+    PYRAMID_BLUR_SIZE = (3, 3)
+    PYRAMID_MARGIN = 16
+    PYRAMID_MIN_AREA = 400  # full-resolution pixels
+    PYRAMID_CANDIDATES = 4
+    # Above this share of the frame, regions are refined in one full-frame pass
+    PYRAMID_MAX_COVERAGE = 0.5
     TEXT_FONT = cv.FONT_HERSHEY_SIMPLEX
     TEXT_SCALE = 1.2
     TEXT_COLOR = (255, 255, 255)
@@ -31,6 +33,26 @@ class Config:
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # Batch and pipeline requests carry images of many items
+    MAX_BATCH_CONTENT_LENGTH = 128 * 1024 * 1024
+    MAX_BATCH_ITEMS = 100
+    # Images are measured at no more than this size
+    MAX_IMAGE_WIDTH = 1920
+    MAX_IMAGE_HEIGHT = 1080
+    # Annotated images: "full" size, a "thumbnail", "deferred" to GET /annotations/<id>, or "none"
+    ANNOTATION_MODES = ("full", "thumbnail", "deferred", "none")
+    ANNOTATION_FORMATS = {"jpeg": (".jpg", "image/jpeg"), "webp": (".webp", "image/webp")}
+    ANNOTATION_FORMAT = "jpeg"
+    ANNOTATION_QUALITY = 75  # 1-100, the quality responses had when they were encoded with Pillow
+    THUMBNAIL_WIDTH = 480
+    ANNOTATION_TTL = 10 * 60  # seconds a deferred image can be fetched
+    # Measurement results of recently seen images, shared by all workers
+    RESULT_CACHE_SIZE = 256  # results; one with full-size annotated images takes a few hundred KB
+    RESULT_CACHE_TTL = 24 * 60 * 60
+    RESULT_CACHE_VERSION = 1  # bump when a change alters measurements, to drop the old results
+    # Calibration sessions keep the scale of a fixed camera and reference object
+    CALIBRATION_TTL = 60 * 60  # seconds, unless the calibration request asks for less
+    MAX_CALIBRATION_TTL = 24 * 60 * 60
 
     @staticmethod
     def allowed_file(filename):
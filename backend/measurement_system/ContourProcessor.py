@@ -1,8 +1,9 @@
+import heapq
 import cv2 as cv
-from imutils import grab_contours as imutils_grab_contours
-from Config import *
-from ManualContourSelector import *
-from ImageProcessor import *
+import numpy as np
+from Config import Config
+from ManualContourSelector import ManualContourSelector
+from ImageProcessor import ImageProcessor
 
 
 class ContourProcessor:
@@ -21,6 +22,45 @@ class ContourProcessor:
 
         return "left-to-right"
 
+    @staticmethod
+    def sort_contours(contour_list, method="left-to-right"):
+        """Sort contours by bounding box position; returns (contours, bounding boxes)."""
+        reverse = method in ("right-to-left", "bottom-to-top")
+        # Sort on y for vertical orders, x otherwise
+        axis = 1 if method in ("top-to-bottom", "bottom-to-top") else 0
+        bounding_boxes = [cv.boundingRect(contour) for contour in contour_list]
+        return tuple(zip(*sorted(zip(contour_list, bounding_boxes),
+                                 key=lambda pair: pair[1][axis], reverse=reverse)))
+
+    @staticmethod
+    def select_contours(contour_list, count=2, min_area=Config.MIN_CONTOUR_AREA, roi=None, image_size=None):
+        """
+        Keep the count largest contours of at least min_area, in their original order.
+
+        Bounding boxes are checked first, since a contour is never larger than
+        its box, so cluttered backgrounds don't need an area computed for every
+        noise contour. roi is (x, y, width, height) as fractions of image_size,
+        the (width, height) of the image; contours centred outside it are dropped.
+        """
+        if roi:
+            image_w, image_h = image_size
+            roi_x1, roi_y1 = roi[0] * image_w, roi[1] * image_h
+            roi_x2, roi_y2 = roi_x1 + roi[2] * image_w, roi_y1 + roi[3] * image_h
+
+        candidates = []
+        for index, contour in enumerate(contour_list):
+            x, y, w, h = cv.boundingRect(contour)
+            if w * h < min_area:
+                continue
+            if roi and not (roi_x1 <= x + w / 2 <= roi_x2 and roi_y1 <= y + h / 2 <= roi_y2):
+                continue
+            area = cv.contourArea(contour)
+            if area >= min_area:
+                candidates.append((area, index))
+
+        largest = heapq.nlargest(count, candidates)
+        return [contour_list[index] for _, index in sorted(largest, key=lambda candidate: candidate[1])]
+
     @staticmethod
     def get_two_largest_contours(contour_list):
         if len(contour_list) < 2:
@@ -48,20 +88,89 @@ class ContourProcessor:
         return ref_obj_contour, obj_contour
 
     @staticmethod
-    def get_contours(image, polygons=None):
+    def exclude_region(contour_list, region):
+        """Drop contours whose bounding box is centred inside the region, a polygon of points."""
+        region = np.array(region, dtype="float32")
+        kept = []
+        for contour in contour_list:
+            x, y, w, h = cv.boundingRect(contour)
+            if cv.pointPolygonTest(region, (x + w / 2, y + h / 2), False) < 0:
+                kept.append(contour)
+        return kept
+
+    @staticmethod
+    def get_contours(image, polygons=None, pyramid=False):
         if polygons:
             selector = ManualContourSelector()
             return selector.set_polygons_from_flutter(polygons)
-        else:
-            gray_image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
-            blurred_image = cv.GaussianBlur(gray_image, Config.BLUR_SIZE, 0)
-
-            # Edge Detection
-            edges_detected = ImageProcessor.detect_edges(
-                blurred_image, upper_threshold=120)
-
-            # Find Contours
-            contour_list = cv.findContours(
-                edges_detected, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-            contour_list = imutils_grab_contours(contour_list)
-            return contour_list
+
+        gray_image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+        if pyramid:
+            return ContourProcessor.get_contours_pyramid(gray_image)
+        return ContourProcessor.find_contours(gray_image)
+
+    @staticmethod
+    def find_contours(gray_image, offset=(0, 0)):
+        """Run edge detection on a grayscale image (or region) and return its outer contours."""
+        blurred_image = cv.GaussianBlur(gray_image, Config.BLUR_SIZE, 0)
+
+        # Edge Detection
+        edges_detected = ImageProcessor.detect_edges(
+            blurred_image, upper_threshold=120)
+
+        # Find Contours
+        contour_list, _ = cv.findContours(
+            edges_detected, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE, offset=offset)
+        return contour_list
+
+    @staticmethod
+    def get_contours_pyramid(gray_image):
+        """
+        Find candidate objects on a downscaled copy, then detect edges at full
+        resolution only inside their (merged) regions.
+        """
+        scale = Config.PYRAMID_SCALE
+        h, w = gray_image.shape[:2]
+        # A scale factor (rather than a target size) keeps OpenCV on its fast integer-area path
+        small_image = cv.resize(gray_image, None, fx=1 / scale, fy=1 / scale, interpolation=cv.INTER_AREA)
+        blurred_image = cv.GaussianBlur(small_image, Config.PYRAMID_BLUR_SIZE, 0)
+        edges_detected = cv.Canny(blurred_image, 10, 120)
+        edges_detected = cv.dilate(edges_detected, Config.CANNY_KERNEL, iterations=2)
+        candidates, _ = cv.findContours(edges_detected, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+
+        # Only the largest objects are measured, so small clutter isn't refined
+        candidates = sorted(candidates, key=cv.contourArea, reverse=True)[:Config.PYRAMID_CANDIDATES]
+
+        # Scale candidate boxes back up, with room for the full-resolution blur and dilation
+        margin = Config.PYRAMID_MARGIN + scale
+        regions = []
+        for candidate in candidates:
+            x, y, box_w, box_h = cv.boundingRect(candidate)
+            if box_w * box_h * scale * scale < Config.PYRAMID_MIN_AREA:
+                continue
+            regions.append([max(0, x * scale - margin), max(0, y * scale - margin),
+                            min(w, (x + box_w) * scale + margin), min(h, (y + box_h) * scale + margin)])
+
+        # Overlapping regions would report the same contour twice, so merge them
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(regions)):
+                for j in range(i + 1, len(regions)):
+                    a, b = regions[i], regions[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                        del regions[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+
+        # Large objects leave little to skip, and one full pass is cheaper than several crops
+        if sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions) > Config.PYRAMID_MAX_COVERAGE * w * h:
+            return ContourProcessor.find_contours(gray_image)
+
+        contour_list = []
+        for x1, y1, x2, y2 in regions:
+            contour_list.extend(ContourProcessor.find_contours(gray_image[y1:y2, x1:x2], offset=(x1, y1)))
+        return contour_list
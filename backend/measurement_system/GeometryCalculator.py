@@ -1,7 +1,6 @@
+import math
 import cv2 as cv
 import numpy as np
-from imutils import perspective as imutils_perspective
-from scipy.spatial.distance import euclidean
 
 
 class GeometryCalculator:
@@ -13,18 +12,38 @@ class GeometryCalculator:
         midpoint_y = (first_point[1] + second_point[1]) * 0.5
         return (midpoint_x, midpoint_y)
 
+    @staticmethod
+    def calc_distance(first_point, second_point):
+        return math.hypot(first_point[0] - second_point[0], first_point[1] - second_point[1])
+
+    @staticmethod
+    def order_points(points):
+        """Order box corners as top-left, top-right, bottom-right, bottom-left."""
+        x_sorted = points[np.argsort(points[:, 0]), :]
+
+        # The two left-most corners are the top-left and bottom-left, by y
+        left_most = x_sorted[:2, :]
+        right_most = x_sorted[2:, :]
+        top_left, bottom_left = left_most[np.argsort(left_most[:, 1]), :]
+
+        # Of the right-most corners, the one furthest from the top-left is the bottom-right
+        distances = [GeometryCalculator.calc_distance(top_left, point) for point in right_most]
+        bottom_right, top_right = right_most[np.argsort(distances)[::-1], :]
+
+        return np.array([top_left, top_right, bottom_right, bottom_left], dtype="float32")
+
     @staticmethod
     def calc_dimensions_px(contour):
         # Calculate Rotated Bounding Box
         bounding_box = cv.minAreaRect(contour)
         bounding_box = cv.boxPoints(bounding_box)
         bounding_box = np.array(bounding_box, dtype="int")
-        bounding_box = imutils_perspective.order_points(bounding_box)
+        bounding_box = GeometryCalculator.order_points(bounding_box)
         tl, tr, br, bl = bounding_box
 
-        width_px = euclidean(GeometryCalculator.calc_midpoint(
+        width_px = GeometryCalculator.calc_distance(GeometryCalculator.calc_midpoint(
             tl, bl), GeometryCalculator.calc_midpoint(tr, br))
-        height_px = euclidean(GeometryCalculator.calc_midpoint(
+        height_px = GeometryCalculator.calc_distance(GeometryCalculator.calc_midpoint(
             tl, tr), GeometryCalculator.calc_midpoint(bl, br))
 
         return width_px, height_px, bounding_box
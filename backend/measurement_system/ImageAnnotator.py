@@ -1,6 +1,6 @@
 import cv2 as cv
-from Config import *
-from GeometryCalculator import *
+from Config import Config
+from GeometryCalculator import GeometryCalculator
 
 
 class ImageAnnotator:
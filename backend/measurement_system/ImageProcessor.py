@@ -1,13 +1,38 @@
+import base64
+import struct
 import cv2 as cv
-from Config import *
+import numpy as np
+from Config import Config
+from Metrics import BYTES_RECEIVED, BYTES_SENT, IMAGES_DECODED
 
 
 class ImageProcessor:
     """Handles image processing operations like resizing and edge detection."""
 
+    # OpenCV decode modes that scale JPEGs down while decoding, by factor
+    REDUCED_DECODE_FLAGS = {8: cv.IMREAD_REDUCED_COLOR_8, 4: cv.IMREAD_REDUCED_COLOR_4,
+                            2: cv.IMREAD_REDUCED_COLOR_2}
+    # How much larger than the resize target a reduced decode must be. libjpeg's
+    # reduced decode is a coarse box filter, and resizing from just above the
+    # target keeps its blur and moves the edges that are found
+    REDUCED_DECODE_MARGIN = 1.5
+    # JPEG start-of-frame markers, which hold the image size
+    JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
     @staticmethod
-    def resize_image(image, max_width=1920, max_height=1080):
+    def resize_image(image, max_width=Config.MAX_IMAGE_WIDTH, max_height=Config.MAX_IMAGE_HEIGHT):
         h, w = image.shape[:2]
+        new_w, new_h = ImageProcessor.calc_resize_dims(w, h, max_width, max_height)
+        if (new_w, new_h) == (w, h):
+            return image
+
+        # Edge detection is tuned to Lanczos' sharpening; smoother filters such as
+        # INTER_AREA change which contours are found on the test images
+        return cv.resize(image, (new_w, new_h), interpolation=cv.INTER_LANCZOS4)
+
+    @staticmethod
+    def calc_resize_dims(w, h, max_width, max_height):
+        """Size that fits within the maximum while keeping the aspect ratio."""
         aspect_ratio = w / h
 
         while w > max_width or h > max_height:
@@ -19,7 +44,37 @@ class ImageProcessor:
                 h = max_height
                 w = int(h * aspect_ratio)
 
-        return cv.resize(image, (w, h), interpolation=cv.INTER_LANCZOS4)
+        return w, h
+
+    @staticmethod
+    def read_image_size(buffer):
+        """Width and height from a JPEG or PNG header, or None if they can't be read."""
+        data = memoryview(buffer).cast("B")
+        try:
+            if data[:8] == b"\x89PNG\r\n\x1a\n":
+                return struct.unpack_from(">II", data, 16)
+
+            if data[:2] != b"\xff\xd8":
+                return None
+            offset = 2
+            while offset + 4 <= len(data):
+                if data[offset] != 0xFF:
+                    return None
+                marker = data[offset + 1]
+                if marker == 0xFF:  # Fill byte
+                    offset += 1
+                    continue
+                if marker in ImageProcessor.JPEG_SOF_MARKERS:
+                    h, w = struct.unpack_from(">HH", data, offset + 5)
+                    return w, h
+                if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # Markers without a payload
+                    offset += 2
+                    continue
+                # Skip the segment: marker plus its big-endian length
+                offset += 2 + struct.unpack_from(">H", data, offset + 2)[0]
+        except struct.error:
+            return None
+        return None
 
     @staticmethod
     def detect_edges(image, upper_threshold=None):
@@ -36,20 +91,72 @@ class ImageProcessor:
         """Decode base64 string to OpenCV image."""
         # Decode the base64 string
         img_data = base64.b64decode(base64_string)
-        # Convert to numpy array
-        nparr = np.frombuffer(img_data, np.uint8)
+        return ImageProcessor.decode_image_buffer(img_data)
+
+    @staticmethod
+    def decode_image_buffer(buffer, max_width=Config.MAX_IMAGE_WIDTH, max_height=Config.MAX_IMAGE_HEIGHT):
+        """Decode encoded image bytes, or any buffer such as a memoryview, to OpenCV image.
+
+        The image is returned resized to fit within max_width x max_height. JPEGs
+        several times that size are decoded at a reduced scale that still covers it
+        with a margin, so the full-resolution pixels are never built.
+        """
+        # View the buffer as a numpy array without copying it
+        nparr = np.frombuffer(buffer, np.uint8)
+        BYTES_RECEIVED.inc(nparr.size)
+        size = ImageProcessor.read_image_size(nparr) if nparr.size else None
+
+        flags = cv.IMREAD_COLOR
+        # Only libjpeg decodes at a reduced scale; other formats are decoded in full
+        # and then shrunk with INTER_AREA, which costs as much and blurs the edges
+        if size and size[0] and size[1] and nparr[:2].tobytes() == b"\xff\xd8":
+            w, h = size
+            new_w, new_h = ImageProcessor.calc_resize_dims(w, h, max_width, max_height)
+            # EXIF rotation may swap the sides, so the reduced image must cover both ways
+            need_short = min(new_w, new_h) * ImageProcessor.REDUCED_DECODE_MARGIN
+            need_long = max(new_w, new_h) * ImageProcessor.REDUCED_DECODE_MARGIN
+            for factor, reduced_flags in ImageProcessor.REDUCED_DECODE_FLAGS.items():
+                if min(-(-w // factor), -(-h // factor)) >= need_short and \
+                        max(-(-w // factor), -(-h // factor)) >= need_long:
+                    flags = reduced_flags
+                    break
+
         # Decode image
-        img = cv.imdecode(nparr, cv.IMREAD_COLOR)
-        return img
+        img = cv.imdecode(nparr, flags) if nparr.size else None
+        IMAGES_DECODED.labels("ok" if img is not None else "invalid").inc()
+        if img is None:
+            return None
+
+        if size and flags != cv.IMREAD_COLOR:
+            # Resize to what the full-size image would have been resized to
+            w, h = size
+            if (img.shape[1] > img.shape[0]) != (w > h):
+                w, h = h, w
+            new_w, new_h = ImageProcessor.calc_resize_dims(w, h, max_width, max_height)
+            return cv.resize(img, (new_w, new_h), interpolation=cv.INTER_LANCZOS4)
+        return ImageProcessor.resize_image(img, max_width, max_height)
+
+    @staticmethod
+    def make_thumbnail(image, width=Config.THUMBNAIL_WIDTH):
+        """Downscale an image to the given width; returns it with the scale factor applied."""
+        scale = width / image.shape[1]
+        if scale >= 1:
+            return image.copy(), 1.0
+        return cv.resize(image, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA), scale
+
+    @staticmethod
+    def encode_image(image, image_format=Config.ANNOTATION_FORMAT, quality=Config.ANNOTATION_QUALITY):
+        """Compress an OpenCV image to JPEG or WebP bytes."""
+        extension, _ = Config.ANNOTATION_FORMATS[image_format]
+        quality_flag = cv.IMWRITE_WEBP_QUALITY if image_format == "webp" else cv.IMWRITE_JPEG_QUALITY
+        success, encoded_image = cv.imencode(extension, image, [quality_flag, int(quality)])
+        if not success:
+            raise ValueError(f"Could not encode image as {image_format}.")
+        return encoded_image.tobytes()
 
     @staticmethod
-    def encode_image_to_base64(image):
+    def encode_image_to_base64(image, image_format=Config.ANNOTATION_FORMAT, quality=Config.ANNOTATION_QUALITY):
         """Encode OpenCV image to base64 string."""
-        # Convert image to PIL format
-        img_pil = Image.fromarray(cv.cvtColor(image, cv.COLOR_BGR2RGB))
-        # Save to buffer
-        buffer = io.BytesIO()
-        img_pil.save(buffer, format="JPEG")
-        # Encode to base64
-        img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        return img_str
+        encoded_image = ImageProcessor.encode_image(image, image_format, quality)
+        BYTES_SENT.inc(len(encoded_image))
+        return base64.b64encode(encoded_image).decode('utf-8')
@@ -1,20 +1,62 @@
-from imutils.contours import sort_contours as imutils_sort_contours
-from Config import *
-from ManualContourSelector import *
-from ImageProcessor import *
-from ContourProcessor import *
-from GeometryCalculator import *
-from ImageAnnotator import *
+import copy
+import uuid
+import cv2 as cv
+import numpy as np
+from Config import Config
+from ImageProcessor import ImageProcessor
+from ContourProcessor import ContourProcessor
+from GeometryCalculator import GeometryCalculator
+from ImageAnnotator import ImageAnnotator
+from Metrics import MEASUREMENTS
+from SharedStore import SharedStore
+from ThreadPool import run_concurrently
+
+# Deferred annotated images, fetched later from whichever worker gets the request
+annotation_store = SharedStore("annotations", Config.ANNOTATION_TTL)
 
 
 class MeasurementSystem:
     """Main class that coordinates the measurement functionality."""
 
-    def __init__(self, ref_obj_pos, ref_obj_width_real, ref_obj_height_real, manual_selection_points):
+    def __init__(self, ref_obj_pos, ref_obj_width_real, ref_obj_height_real, manual_selection_points,
+                 pyramid=False, annotation="full", annotation_format=Config.ANNOTATION_FORMAT,
+                 annotation_quality=Config.ANNOTATION_QUALITY, calibration=None, roi=None):
         self.ref_obj_pos = ref_obj_pos
         self.ref_obj_width_real = ref_obj_width_real
         self.ref_obj_height_real = ref_obj_height_real
         self.manual_selection_points = manual_selection_points
+        # Coarse-to-fine contour detection, faster when the objects fill little of the frame
+        self.pyramid = pyramid
+        # How the annotated images are returned, one of Config.ANNOTATION_MODES
+        self.annotation = annotation
+        self.annotation_format = annotation_format
+        self.annotation_quality = annotation_quality
+        # Scale and reference region from calibrate(), for a fixed camera and reference object
+        self.calibration = calibration
+        # Region of interest as (x, y, width, height) fractions of the image; objects outside are ignored
+        self.roi = roi
+
+    def cache_parameters(self):
+        """Settings that determine the results, or None if the results can't be cached."""
+        # Deferred images expire before the cached results would
+        if self.annotation == "deferred":
+            return None
+        return {
+            "ref_obj_pos": self.ref_obj_pos,
+            "ref_obj_width_real": self.ref_obj_width_real,
+            "ref_obj_height_real": self.ref_obj_height_real,
+            "manual_selection_points": self.manual_selection_points,
+            "pyramid": self.pyramid,
+            "annotation": [self.annotation, self.annotation_format, self.annotation_quality],
+            "calibration": self.calibration,
+            "roi": self.roi
+        }
+
+    def with_selection(self, manual_selection_points):
+        """A measurement system with the same settings but other manual polygons."""
+        measurement_system = copy.copy(self)
+        measurement_system.manual_selection_points = manual_selection_points
+        return measurement_system
 
     def measure_2d_item(self, image, polygons):
         """
@@ -30,8 +72,17 @@ class MeasurementSystem:
         image = ImageProcessor.resize_image(image)
 
         # Find Contours
-        contour_list = ContourProcessor.get_contours(image, polygons)
-        (contour_list, _) = imutils_sort_contours(
+        contour_list = ContourProcessor.get_contours(image, polygons, pyramid=self.pyramid)
+        if self.calibration:
+            return self.measure_calibrated(image, contour_list)
+
+        # Only the two largest contours are measured, so drop the rest before ordering them
+        contour_list = ContourProcessor.select_contours(
+            contour_list, min_area=0 if polygons else Config.MIN_CONTOUR_AREA,
+            roi=self.roi, image_size=(image.shape[1], image.shape[0]))
+        if not contour_list:
+            return {"error": "No objects found."}
+        (contour_list, _) = ContourProcessor.sort_contours(
             contour_list, method=ContourProcessor.get_sorting_order(self.ref_obj_pos))
 
         # Get the two largest contours
@@ -58,24 +109,112 @@ class MeasurementSystem:
         obj_width_real, obj_height_real = GeometryCalculator.calc_dimensions_real(
             obj_width_px, obj_height_px, pixels_per_metric)
 
-        # Create a copy for annotation
-        annotated_image = image.copy()
+        MEASUREMENTS.labels("2d").inc()
+        results = {"width": obj_width_real, "height": obj_height_real}
+        if self.annotation != "none":
+            results.update(self.annotate(image, [
+                (ref_obj_bounding_box, self.ref_obj_width_real, ref_obj_height_real),
+                (obj_bounding_box, obj_width_real, obj_height_real)]))
+        return results
 
-        # Annotate the image
-        ImageAnnotator.annotate_image(annotated_image, ref_obj_bounding_box,
-                                      self.ref_obj_width_real, ref_obj_height_real)
-        ImageAnnotator.annotate_image(annotated_image, obj_bounding_box,
-                                      obj_width_real, obj_height_real)
+    def calibrate(self, image, store_region=True):
+        """
+        Find the reference object and the scale of an image, so later images
+        from the same camera position can be measured without the reference.
 
-        # Encode the annotated image to base64
-        encoded_image = ImageProcessor.encode_image_to_base64(annotated_image)
+        Args:
+            image: OpenCV image object
+            store_region: Keep the reference object's position, so it is
+                ignored if it stays in view
+
+        Returns:
+            dict: The calibration to pass to MeasurementSystem
+        """
+        image = ImageProcessor.resize_image(image)
+        contour_list = ContourProcessor.get_contours(image, None, pyramid=self.pyramid)
+        contour_list = ContourProcessor.select_contours(
+            contour_list, roi=self.roi, image_size=(image.shape[1], image.shape[0]))
+        if not contour_list:
+            return {"error": "No reference object found."}
+        (contour_list, _) = ContourProcessor.sort_contours(
+            contour_list, method=ContourProcessor.get_sorting_order(self.ref_obj_pos))
+        ref_obj_contour, _ = ContourProcessor.get_two_largest_contours(contour_list)
+
+        ref_obj_width_px, ref_obj_height_px, ref_obj_bounding_box = GeometryCalculator.calc_dimensions_px(
+            ref_obj_contour)
+        pixels_per_metric = GeometryCalculator.calc_pixels_per_metric(
+            ref_obj_width_px, self.ref_obj_width_real)
+        _, ref_obj_height_real = GeometryCalculator.calc_dimensions_real(
+            ref_obj_width_px, ref_obj_height_px, pixels_per_metric)
 
         return {
-            "width": obj_width_real,
-            "height": obj_height_real,
-            "annotated_image": encoded_image
+            "ref_obj_pos": self.ref_obj_pos,
+            "ref_obj_width_real": self.ref_obj_width_real,
+            "ref_obj_height_real": ref_obj_height_real,
+            "pixels_per_metric": pixels_per_metric,
+            "image_size": [image.shape[1], image.shape[0]],
+            "ref_obj_bounding_box": ref_obj_bounding_box.tolist() if store_region else None
         }
 
+    def measure_calibrated(self, image, contour_list):
+        """Measure the largest object outside the reference region, at the calibrated scale."""
+        if [image.shape[1], image.shape[0]] != self.calibration["image_size"]:
+            return {"error": "Image size differs from the calibration image."}
+
+        # The item, and the reference object if it is still in view
+        contour_list = ContourProcessor.select_contours(
+            contour_list, roi=self.roi, image_size=(image.shape[1], image.shape[0]))
+        measurements = []
+        ref_obj_bounding_box = self.calibration["ref_obj_bounding_box"]
+        if ref_obj_bounding_box:
+            contour_list = ContourProcessor.exclude_region(contour_list, ref_obj_bounding_box)
+            measurements.append((np.array(ref_obj_bounding_box, dtype="float32"),
+                                 self.calibration["ref_obj_width_real"], self.calibration["ref_obj_height_real"]))
+        if not contour_list:
+            return {"error": "No object found."}
+
+        obj_width_px, obj_height_px, obj_bounding_box = GeometryCalculator.calc_dimensions_px(
+            max(contour_list, key=cv.contourArea))
+        obj_width_real, obj_height_real = GeometryCalculator.calc_dimensions_real(
+            obj_width_px, obj_height_px, self.calibration["pixels_per_metric"])
+        measurements.append((obj_bounding_box, obj_width_real, obj_height_real))
+
+        MEASUREMENTS.labels("2d").inc()
+        results = {"width": obj_width_real, "height": obj_height_real}
+        if self.annotation != "none":
+            results.update(self.annotate(image, measurements))
+        return results
+
+    def annotate(self, image, measurements):
+        """
+        Draw measurements on a copy of the image and encode it for the response.
+
+        Args:
+            image: OpenCV image object
+            measurements: (bounding box, width, height) of each object
+
+        Returns:
+            dict: The base64 encoded "annotated_image", or the
+            "annotated_image_id" to fetch it by when deferred
+        """
+        if self.annotation == "thumbnail":
+            annotated_image, scale = ImageProcessor.make_thumbnail(image)
+        else:
+            annotated_image, scale = image.copy(), 1.0
+
+        for bounding_box, width_real, height_real in measurements:
+            ImageAnnotator.annotate_image(annotated_image, bounding_box * scale, width_real, height_real)
+
+        if self.annotation == "deferred":
+            encoded_image = ImageProcessor.encode_image(
+                annotated_image, self.annotation_format, self.annotation_quality)
+            annotation_id = f"{uuid.uuid4().hex}.{self.annotation_format}"
+            annotation_store.put(annotation_id, encoded_image)
+            return {"annotated_image_id": annotation_id}
+
+        return {"annotated_image": ImageProcessor.encode_image_to_base64(
+            annotated_image, self.annotation_format, self.annotation_quality)}
+
     def measure_3d_item(self, front_image, side_image):
         """
         Measure a 3D item from front and side images.
@@ -91,13 +230,12 @@ class MeasurementSystem:
         polygons_front_image = self.manual_selection_points[0]
         polygons_side_image = self.manual_selection_points[1]
 
-        # Process front image
-        front_results = self.measure_2d_item(front_image, polygons_front_image)
+        # Process front and side images concurrently
+        front_results, side_results = run_concurrently(
+            lambda: self.measure_2d_item(front_image, polygons_front_image),
+            lambda: self.measure_2d_item(side_image, polygons_side_image))
         if "error" in front_results:
             return front_results
-
-        # Process side image
-        side_results = self.measure_2d_item(side_image, polygons_side_image)
         if "error" in side_results:
             return side_results
 
@@ -108,6 +246,7 @@ class MeasurementSystem:
 
         # The smallest value is the depth
         width, height, depth = dimensions[0], dimensions[1], dimensions[3]
+        MEASUREMENTS.labels("3d").inc()
 
         # Check if the two largest values come from the same image
         if (dimensions[0] == front_results["width"] and dimensions[1] == front_results["height"]) or \
@@ -116,10 +255,13 @@ class MeasurementSystem:
         else:
             width, height = dimensions[0], dimensions[2]
 
-        return {
+        results = {
             "width": width,
             "height": height,
-            "depth": depth,
-            "front_annotated_image": front_results["annotated_image"],
-            "side_annotated_image": side_results["annotated_image"]
+            "depth": depth
         }
+        for key in ("annotated_image", "annotated_image_id"):
+            if key in front_results:
+                results[f"front_{key}"] = front_results[key]
+                results[f"side_{key}"] = side_results[key]
+        return results
@@ -0,0 +1,19 @@
+from prometheus_client import Counter
+from service_common.metrics import RequestMetrics
+
+
+# Request timings; decoding and annotating large photos takes seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+# Request latency, counts, sizes and admission control, with the /metrics endpoint
+REQUEST_METRICS = RequestMetrics("measurement", LATENCY_BUCKETS)
+init_app = REQUEST_METRICS.init_app
+
+# Domain metrics
+IMAGES_DECODED = Counter("measurement_images_decoded_total", "Uploaded images by decode outcome",
+                         ["status"])
+BYTES_RECEIVED = Counter("measurement_image_bytes_received_total", "Encoded image bytes received")
+BYTES_SENT = Counter("measurement_image_bytes_sent_total", "Encoded annotated image bytes sent")
+MEASUREMENTS = Counter("measurement_measurements_total", "Completed measurements by kind", ["kind"])
+CACHE_LOOKUPS = Counter("measurement_result_cache_lookups_total", "Result cache lookups by outcome",
+                        ["result"])
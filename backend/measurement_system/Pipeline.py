@@ -0,0 +1,88 @@
+import functools
+import json
+import os
+import urllib.error
+import urllib.request
+from Batch import ItemError, measure_item
+from ThreadPool import run_concurrently
+from service_common.workers import DEFAULT_PORT
+
+# The optimizer is its own service; measured items are packed through its /optimize.
+# Its gunicorn.conf.py binds DEFAULT_PORT unless PORT says otherwise
+OPTIMIZER_URL = os.environ.get("OPTIMIZER_URL", f"http://127.0.0.1:{DEFAULT_PORT}")
+OPTIMIZER_TIMEOUT = float(os.environ.get("OPTIMIZER_TIMEOUT", 60))
+
+
+class PipelineError(ValueError):
+    """A problem with one item of a pipeline request, reported back to the client."""
+
+
+class OptimizerUnavailable(Exception):
+    """The optimizer service failed, was busy or couldn't be reached."""
+
+    def __init__(self, message, status=502, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def measure_dimensions(item, measurement_system):
+    """Measure one item's image pair; returns its dimensions."""
+    item_id = item.get("id")
+    if not item.get("front_image_b64") or not item.get("side_image_b64"):
+        raise PipelineError(f"Item {item_id}: missing front or side image.")
+    try:
+        results = measure_item(item, measurement_system)
+    except ItemError as e:
+        raise PipelineError(f"Item {item_id}: {e}")
+
+    return {"id": item_id, "width": results["width"], "height": results["height"],
+            "depth": results["depth"]}
+
+
+def pack(container, measured_items, config, job_id=None):
+    """
+    Pack the measured dimensions with the optimizer service. /optimize picks the
+    solver, decomposition, portfolio and warm start as it does for any client.
+    """
+    engine = config.get("engine", "ems")
+    # Measured sizes are real-valued, which only the resolution-free engines handle
+    if engine not in ("ems", "continuous"):
+        raise PipelineError(f"Engine '{engine}' needs integer dimensions, use 'ems' or 'continuous'.")
+
+    payload = {
+        "container": container,
+        "items": [{"id": item["id"], "dimensions": {"width": item["width"], "height": item["height"],
+                                                    "depth": item["depth"]}}
+                  for item in measured_items],
+        "config": config,
+    }
+    if job_id:
+        payload["job_id"] = job_id
+    optimize_request = urllib.request.Request(
+        OPTIMIZER_URL.rstrip("/") + "/optimize", data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"})
+
+    try:
+        with urllib.request.urlopen(optimize_request, timeout=OPTIMIZER_TIMEOUT) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.load(e).get("message")
+        except ValueError:
+            message = None
+        message = message or e.reason
+        # The optimizer rejects what the client sent, such as the container or config
+        if e.code == 400:
+            raise PipelineError(f"Optimizer: {message}")
+        raise OptimizerUnavailable(f"Optimizer returned {e.code}: {message}",
+                                   503 if e.code == 503 else 502, e.headers.get("Retry-After"))
+    except (OSError, ValueError) as e:
+        raise OptimizerUnavailable(f"Optimizer unavailable: {e}")
+
+
+def run_pipeline(container, items, measurement_system, config, job_id=None):
+    """Measure every item concurrently, then pack them into the container."""
+    measured_items = run_concurrently(
+        *[functools.partial(measure_dimensions, item, measurement_system) for item in items])
+    return {"items": measured_items, "packing": pack(container, measured_items, config, job_id)}
@@ -0,0 +1,46 @@
+import hashlib
+import json
+from Config import Config
+from Metrics import CACHE_LOOKUPS
+from SharedStore import SharedStore
+
+
+class ResultCache:
+    """Measurement results keyed by a hash of the image bytes and the settings used.
+
+    Retried uploads and repeated photos are answered without decoding or
+    measuring them again. Results live in a SharedStore, so every worker sees
+    them, limited to the Config.RESULT_CACHE_SIZE most recently used.
+    """
+
+    def __init__(self, path=None):
+        self.store = SharedStore("results", Config.RESULT_CACHE_TTL, path=path,
+                                 max_rows=Config.RESULT_CACHE_SIZE)
+
+    @staticmethod
+    def key(images, parameters):
+        """Key for the encoded images and cache parameters, or None if the results aren't cacheable."""
+        if parameters is None:
+            return None
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps([Config.RESULT_CACHE_VERSION, parameters], sort_keys=True).encode())
+        for image in images:
+            # Length-prefixed, so two images can't hash like one with the bytes split differently
+            digest.update(len(image).to_bytes(8, "little"))
+            digest.update(image)
+        return digest.hexdigest()
+
+    def get(self, key):
+        if key is None:
+            return None
+        stored = self.store.get(key)
+        CACHE_LOOKUPS.labels("miss" if stored is None else "hit").inc()
+        return json.loads(stored) if stored is not None else None
+
+    def put(self, key, results):
+        # Errors may be transient, so only measurements are kept
+        if key is not None and "error" not in results:
+            self.store.put(key, json.dumps(results))
+
+
+result_cache = ResultCache()
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import time
+
+
+class SharedStore:
+    """Short-lived values shared by all gunicorn workers, kept in a local SQLite database.
+
+    Each store is one table of keys to blobs that expire ttl seconds after
+    they are written; expired rows are dropped as new ones are added. With
+    max_rows, the least recently used rows beyond that count are dropped too.
+    """
+
+    DEFAULT_PATH = os.environ.get("MEASUREMENT_DB", "measurements.sqlite3")
+
+    def __init__(self, table, ttl, path=None, max_rows=None):
+        self.table = table
+        self.ttl = ttl
+        self.path = path or self.DEFAULT_PATH
+        self.max_rows = max_rows
+        self.created = False
+
+    def _connect(self):
+        # Several gunicorn workers share the file, so wait for their locks
+        connection = sqlite3.connect(self.path, timeout=5)
+        if not self.created:
+            # Created on first use, so importing the app doesn't touch the disk
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY, value BLOB, expires REAL, used REAL)""")
+            # Tables from before least recently used trimming lack the used column
+            columns = [row[1] for row in connection.execute(f"PRAGMA table_info({self.table})")]
+            if "used" not in columns:
+                try:
+                    connection.execute(f"ALTER TABLE {self.table} ADD COLUMN used REAL")
+                except sqlite3.OperationalError as e:
+                    # Another worker added it first
+                    if "duplicate column" not in str(e):
+                        raise
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_expires ON {self.table} (expires)")
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_used ON {self.table} (used)")
+            self.created = True
+        return connection
+
+    def put(self, key, value, ttl=None):
+        """Store value under key for ttl seconds, or the store's default."""
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(f"DELETE FROM {self.table} WHERE expires < ?", (now,))
+                connection.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                                   (key, value, now + (ttl or self.ttl), now))
+                if self.max_rows:
+                    connection.execute(f"""
+                        DELETE FROM {self.table} WHERE key IN (
+                            SELECT key FROM {self.table} ORDER BY used DESC LIMIT -1 OFFSET ?)""",
+                                       (self.max_rows,))
+        finally:
+            connection.close()
+
+    def get(self, key):
+        """The value stored under key, or None if it is missing or has expired."""
+        now = time.time()
+        connection = self._connect()
+        try:
+            row = connection.execute(f"SELECT value FROM {self.table} WHERE key = ? AND expires >= ?",
+                                     (key, now)).fetchone()
+            if row and self.max_rows:
+                with connection:
+                    connection.execute(f"UPDATE {self.table} SET used = ? WHERE key = ?", (now, key))
+        finally:
+            connection.close()
+        return row[0] if row else None
@@ -0,0 +1,40 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from service_common.workers import worker_count
+
+
+def pool_size():
+    """Threads per worker process, so the gunicorn workers together use about one per core."""
+    if os.environ.get("MEASURE_THREADS"):
+        return int(os.environ["MEASURE_THREADS"])
+    return max(1, (os.cpu_count() or 1) // worker_count())
+
+
+# OpenCV releases the GIL, so decoding and measuring overlap on threads. Threads
+# are only started on first use, so preloading the app doesn't fork any
+executor = ThreadPoolExecutor(max_workers=pool_size(), thread_name_prefix="measure")
+
+
+def iterate_concurrently(*calls):
+    """
+    Run functions on the shared pool and yield their results in order.
+
+    The first runs on the calling thread. A call still queued by the time the
+    caller needs it is taken back and run inline, so nested use (pipeline items
+    measuring their two views) can't deadlock on a full pool.
+    """
+    futures = [executor.submit(call) for call in calls[1:]]
+    try:
+        if calls:
+            yield calls[0]()
+        for call, future in zip(calls[1:], futures):
+            yield call() if future.cancel() else future.result()
+    finally:
+        # Nothing is left queued if a call fails or the caller stops early
+        for future in futures:
+            future.cancel()
+
+
+def run_concurrently(*calls):
+    """Run functions on the shared pool and return their results in order."""
+    return list(iterate_concurrently(*calls))
@@ -1,75 +1,280 @@
-from MeasurementSystem import *
+import base64
+import functools
+import io
+import json
+import math
+import os
+import uuid
+from flask import Flask, Request, Response, request, jsonify
+from werkzeug.exceptions import BadRequest, HTTPException
+from Config import Config
+from ImageProcessor import ImageProcessor
+from MeasurementSystem import MeasurementSystem, annotation_store
+from Batch import measure_batch
+from Pipeline import OptimizerUnavailable, PipelineError, run_pipeline
+from ResultCache import result_cache
+import Metrics
+from Metrics import BYTES_SENT
+from SharedStore import SharedStore
+from ThreadPool import run_concurrently
+from service_common.admission import ConcurrencyLimiter
+
+
+class UploadRequest(Request):
+    """Keeps uploaded files in memory, so images are decoded straight from the upload buffer."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # MAX_CONTENT_LENGTH bounds the size, so spooling to disk isn't needed
+        return io.BytesIO()
+
+
+# Binary uploads can also be sent as the raw request body, with parameters in the query string
+RAW_IMAGE_TYPES = {"image/jpeg", "image/png", "application/octet-stream"}
 
 
 # API Setup
 app = Flask(__name__)
+app.request_class = UploadRequest
+app.config["MAX_CONTENT_LENGTH"] = Config.MAX_CONTENT_LENGTH
+Metrics.init_app(app)
+
+# OpenCV releases the GIL, so a couple of measurements can run per worker; both
+# endpoints share the slots since they compete for the same cores
+QUEUE_TIMEOUT = float(os.environ.get("QUEUE_TIMEOUT", 5))
+measure_limiter = ConcurrencyLimiter(
+    int(os.environ.get("MEASURE_CONCURRENCY", 2)), int(os.environ.get("MEASURE_QUEUE_SIZE", 6)),
+    QUEUE_TIMEOUT, {"error": "Server is busy, retry later"}, Metrics.REQUEST_METRICS)
+
+# Calibration sessions, shared by all workers
+calibration_store = SharedStore("calibrations", Config.CALIBRATION_TTL)
+
+
+@app.errorhandler(400)
+def bad_request(e):
+    return jsonify({"error": e.description}), 400
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Upload exceeds {request.max_content_length // (1024 * 1024)}MB."}), 413
+
+
+def parse_field(data, name, parse):
+    """Parse one form field in place; a malformed value is the client's error."""
+    try:
+        data[name] = parse(data[name])
+    except ValueError:
+        raise BadRequest(f"Invalid value for {name}.")
+
+
+def get_parameters():
+    """
+    Read parameters from a JSON body, or from form fields and the query string
+    of a binary upload. Malformed values raise BadRequest, answered with a 400.
+    """
+    if request.is_json:
+        data = request.get_json()
+    else:
+        data = {**request.args.to_dict(), **request.form.to_dict()}
+        for name in ("ref_obj_width_real", "ref_obj_height_real"):
+            if data.get(name):
+                parse_field(data, name, float)
+        # Polygons and the region of interest are JSON encoded in form fields
+        for name in ("polygons_image", "polygons_front_image", "polygons_side_image", "roi"):
+            if data.get(name):
+                parse_field(data, name, json.loads)
+        for name in ("pyramid", "store_region"):
+            if name in data:
+                data[name] = data[name].lower() in ("1", "true", "yes")
+        for name in ("annotation_quality", "ttl"):
+            if data.get(name):
+                parse_field(data, name, int)
+
+    if not isinstance(data, dict):
+        return None
+    for name in ("ref_obj_width_real", "ref_obj_height_real"):
+        value = data.get(name)
+        if value is not None and not (isinstance(value, (int, float)) and not isinstance(value, bool) and
+                                      0 < value < math.inf):
+            raise BadRequest(f"Invalid value for {name}.")
+    return data
+
+
+def get_annotation_options(data):
+    """MeasurementSystem arguments for the requested annotated images, or None if they aren't supported."""
+    # A quality of 0 is out of range, not a request for the default
+    quality = data.get("annotation_quality")
+    options = {
+        "annotation": data.get("annotation") or "full",
+        "annotation_format": data.get("annotation_format") or Config.ANNOTATION_FORMAT,
+        "annotation_quality": Config.ANNOTATION_QUALITY if quality in (None, "") else quality,
+    }
+    if options["annotation"] not in Config.ANNOTATION_MODES or \
+            options["annotation_format"] not in Config.ANNOTATION_FORMATS or \
+            not isinstance(options["annotation_quality"], int) or isinstance(options["annotation_quality"], bool) or \
+            not 1 <= options["annotation_quality"] <= 100:
+        return None
+    return options
+
+
+def is_valid_roi(roi):
+    """A region of interest is either absent or (x, y, width, height) as fractions of the image."""
+    if roi is None:
+        return True
+    return isinstance(roi, list) and len(roi) == 4 and \
+        all(isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 1 for value in roi) and \
+        roi[2] > 0 and roi[3] > 0
+
+
+def apply_calibration(data):
+    """
+    Fill in the reference object from the request's calibration session, if it
+    names one, and add the calibration to data. Returns an error response if
+    the session is unknown or has expired.
+    """
+    session_id = data.get("session_id")
+    if not session_id:
+        return None
+    stored = calibration_store.get(session_id)
+    if stored is None:
+        return jsonify({"error": "Calibration session not found or expired."}), 404
+    calibration = json.loads(stored)
+    data.update({name: calibration[name] for name in ("ref_obj_pos", "ref_obj_width_real", "ref_obj_height_real")})
+    data["calibration"] = calibration
+    return None
+
+
+def is_raw_upload():
+    return request.mimetype in RAW_IMAGE_TYPES and bool(request.content_length)
+
+
+def has_image(data, name):
+    if name == "image" and is_raw_upload():
+        return True
+    return name in request.files or bool(data.get(f"{name}_b64"))
+
+
+def read_image(data, name):
+    """
+    Encoded bytes of an image sent as a multipart file, the raw body, or a
+    base64 field of the JSON body; None if the base64 is invalid.
+    """
+    upload = request.files.get(name)
+    if upload is not None:
+        return upload.stream.getbuffer()
+    if name == "image" and is_raw_upload():
+        return request.get_data(cache=False)
+    try:
+        return base64.b64decode(data[f"{name}_b64"])
+    except ValueError:
+        return None
+
+
+def get_image(data, name):
+    buffer = read_image(data, name)
+    return ImageProcessor.decode_image_buffer(buffer) if buffer is not None else None
 
 
 @app.route('/measure2d', methods=['POST'])
+@measure_limiter
 def measure_2d():
     """
     API endpoint to measure a 2D object from one image.
-    Expects a JSON request with base64 encoded image.
+    Expects a JSON request with base64 encoded image, a multipart/form-data
+    request with an "image" file, or the raw image as the request body.
     """
     try:
-        data = request.get_json()
+        data = get_parameters()
         if not data:
             return jsonify({"error": "Invalid request format."}), 400
+        session_error = apply_calibration(data)
+        if session_error:
+            return session_error
 
         # Extract data
-        image_b64 = data.get("image_b64")
         ref_obj_pos = data.get("ref_obj_pos")
         ref_obj_width_real = data.get("ref_obj_width_real")
         ref_obj_height_real = data.get("ref_obj_height_real")
         polygons_image = data.get("polygons_image", None)
 
-        if not all([image_b64, ref_obj_pos, ref_obj_width_real, ref_obj_height_real]):
+        if not all([has_image(data, "image"), ref_obj_pos, ref_obj_width_real, ref_obj_height_real]):
             return jsonify({"error": "Missing required parameters."}), 400
+        if not is_valid_roi(data.get("roi")):
+            return jsonify({"error": "Invalid region of interest."}), 400
+        annotation_options = get_annotation_options(data)
+        if annotation_options is None:
+            return jsonify({"error": "Unsupported annotation options."}), 400
 
         # Ensure polygonst_image is None if it is an empty value
         if not polygons_image:
             polygons_image = None
 
+        buffer = read_image(data, "image")
+        if buffer is None:
+            return jsonify({"error": "Invalid image data."}), 400
+
+        measurement_system = MeasurementSystem(
+            ref_obj_pos, ref_obj_width_real, ref_obj_height_real, (polygons_image, None),
+            pyramid=bool(data.get("pyramid")), roi=data.get("roi"), calibration=data.get("calibration"),
+            **annotation_options)
+
+        # The same photo with the same settings gives the same results
+        cache_key = result_cache.key([buffer], measurement_system.cache_parameters())
+        results = result_cache.get(cache_key)
+        if results is not None:
+            return jsonify(results)
+
         # Decode image
-        image = ImageProcessor.decode_base64_image(image_b64)
+        image = ImageProcessor.decode_image_buffer(buffer)
 
         if image is None:
             return jsonify({"error": "Invalid image data."}), 400
 
-        measurement_system = MeasurementSystem(
-            ref_obj_pos, ref_obj_width_real, ref_obj_height_real, (polygons_image, None))
-
         # Perform measurement
         results = measurement_system.measure_2d_item(image, polygons_image)
+        if "error" in results:
+            return jsonify(results), 400
 
+        result_cache.put(cache_key, results)
         return jsonify(results)
 
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/measure', methods=['POST'])
+@measure_limiter
 def measure_3d():
     """
     API endpoint to measure a 3D object from two images.
-    Expects a JSON request with base64 encoded images.
+    Expects a JSON request with base64 encoded images, or a multipart/form-data
+    request with "front_image" and "side_image" files.
     """
     try:
-        data = request.get_json()
+        data = get_parameters()
         if not data:
             return jsonify({"error": "Invalid request format."}), 400
+        session_error = apply_calibration(data)
+        if session_error:
+            return session_error
 
         # Extract data
-        front_image_b64 = data.get("front_image_b64")
-        side_image_b64 = data.get("side_image_b64")
         ref_obj_pos = data.get("ref_obj_pos")
         ref_obj_width_real = data.get("ref_obj_width_real")
         ref_obj_height_real = data.get("ref_obj_height_real")
         polygons_front_image = data.get("polygons_front_image", None)
         polygons_side_image = data.get("polygons_side_image", None)
 
-        if not all([front_image_b64, side_image_b64, ref_obj_pos, ref_obj_width_real, ref_obj_height_real]):
+        if not all([has_image(data, "front_image"), has_image(data, "side_image"),
+                    ref_obj_pos, ref_obj_width_real, ref_obj_height_real]):
             return jsonify({"error": "Missing required parameters."}), 400
+        if not is_valid_roi(data.get("roi")):
+            return jsonify({"error": "Invalid region of interest."}), 400
+        annotation_options = get_annotation_options(data)
+        if annotation_options is None:
+            return jsonify({"error": "Unsupported annotation options."}), 400
 
         # Ensure polygons_front_image is None if it is an empty value
         if not polygons_front_image:
@@ -77,24 +282,234 @@ def measure_3d():
         if not polygons_side_image:
             polygons_side_image = None
 
+        # The request is only accessible on its own thread, so read the images here
+        front_buffer = read_image(data, "front_image")
+        side_buffer = read_image(data, "side_image")
+        if front_buffer is None or side_buffer is None:
+            return jsonify({"error": "Invalid image data."}), 400
+
+        measurement_system = MeasurementSystem(
+            ref_obj_pos, ref_obj_width_real, ref_obj_height_real, (polygons_front_image, polygons_side_image),
+            pyramid=bool(data.get("pyramid")), roi=data.get("roi"), calibration=data.get("calibration"),
+            **annotation_options)
+
+        # The same photos with the same settings give the same results
+        cache_key = result_cache.key([front_buffer, side_buffer], measurement_system.cache_parameters())
+        results = result_cache.get(cache_key)
+        if results is not None:
+            return jsonify(results)
+
         # Decode images
-        front_image = ImageProcessor.decode_base64_image(front_image_b64)
-        side_image = ImageProcessor.decode_base64_image(side_image_b64)
+        front_image, side_image = run_concurrently(
+            functools.partial(ImageProcessor.decode_image_buffer, front_buffer),
+            functools.partial(ImageProcessor.decode_image_buffer, side_buffer))
 
         if front_image is None or side_image is None:
             return jsonify({"error": "Invalid image data."}), 400
 
-        measurement_system = MeasurementSystem(
-            ref_obj_pos, ref_obj_width_real, ref_obj_height_real, (polygons_front_image, polygons_side_image))
-
         # Perform measurement
         results = measurement_system.measure_3d_item(front_image, side_image)
+        if "error" in results:
+            return jsonify(results), 400
 
+        result_cache.put(cache_key, results)
         return jsonify(results)
 
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/measure/batch', methods=['POST'])
+@measure_limiter
+def measure_batch_items():
+    """
+    API endpoint to measure many items that share one reference object.
+    Expects a JSON request with the reference object, the annotation options
+    and a list of items, each with an "id" and base64 encoded front and side
+    images, or a single image for a 2D measurement. Items are measured in
+    parallel; each result carries the item's id, and an "error" instead of
+    the measurements if that item failed. With "stream": true the results
+    are sent as NDJSON, one line per item as soon as it and the ones before
+    it are done.
+    """
+    try:
+        request.max_content_length = Config.MAX_BATCH_CONTENT_LENGTH
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Invalid request format."}), 400
+        session_error = apply_calibration(data)
+        if session_error:
+            return session_error
+
+        # Extract data
+        items = data.get("items")
+        ref_obj_pos = data.get("ref_obj_pos")
+        ref_obj_width_real = data.get("ref_obj_width_real")
+        ref_obj_height_real = data.get("ref_obj_height_real")
+
+        if not all([items, ref_obj_pos, ref_obj_width_real, ref_obj_height_real]):
+            return jsonify({"error": "Missing required parameters."}), 400
+        if not is_valid_roi(data.get("roi")):
+            return jsonify({"error": "Invalid region of interest."}), 400
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return jsonify({"error": "Items must be a list of objects."}), 400
+        if len(items) > Config.MAX_BATCH_ITEMS:
+            return jsonify({"error": f"At most {Config.MAX_BATCH_ITEMS} items per batch."}), 400
+        annotation_options = get_annotation_options(data)
+        if annotation_options is None:
+            return jsonify({"error": "Unsupported annotation options."}), 400
+
+        measurement_system = MeasurementSystem(
+            ref_obj_pos, ref_obj_width_real, ref_obj_height_real, (None, None),
+            pyramid=bool(data.get("pyramid")), roi=data.get("roi"), calibration=data.get("calibration"),
+            **annotation_options)
+        results = measure_batch(items, measurement_system)
+
+        if data.get("stream"):
+            return Response((json.dumps(result) + "\n" for result in results), mimetype="application/x-ndjson")
+        return jsonify({"items": list(results)})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/pipeline', methods=['POST'])
+@measure_limiter
+def pipeline():
+    """
+    API endpoint to measure several 3D items and pack them into a container.
+    Expects a JSON request with a container, the reference object and a list
+    of items, each with base64 encoded front and side images. The measured
+    items are packed by the optimizer service, with the request's config and
+    optional job_id.
+    """
+    try:
+        request.max_content_length = Config.MAX_BATCH_CONTENT_LENGTH
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Invalid request format."}), 400
+        session_error = apply_calibration(data)
+        if session_error:
+            return session_error
+
+        # Extract data
+        container = data.get("container")
+        items = data.get("items")
+        ref_obj_pos = data.get("ref_obj_pos")
+        ref_obj_width_real = data.get("ref_obj_width_real")
+        ref_obj_height_real = data.get("ref_obj_height_real")
+        config = data.get("config") or {}
+
+        if not all([container, items, ref_obj_pos, ref_obj_width_real, ref_obj_height_real]):
+            return jsonify({"error": "Missing required parameters."}), 400
+        if not is_valid_roi(data.get("roi")):
+            return jsonify({"error": "Invalid region of interest."}), 400
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return jsonify({"error": "Items must be a list of objects."}), 400
+        if len(items) > Config.MAX_BATCH_ITEMS:
+            return jsonify({"error": f"At most {Config.MAX_BATCH_ITEMS} items per batch."}), 400
+        if not isinstance(container, dict):
+            return jsonify({"error": "Container must be an object."}), 400
+        if not all(container.get(name) for name in ("width", "height", "depth")):
+            return jsonify({"error": "Container dimensions not specified."}), 400
+
+        measurement_system = MeasurementSystem(
+            ref_obj_pos, ref_obj_width_real, ref_obj_height_real, (None, None),
+            pyramid=bool(data.get("pyramid")), roi=data.get("roi"), calibration=data.get("calibration"),
+            annotation="none")
+
+        return jsonify(run_pipeline(container, items, measurement_system, config, data.get("job_id")))
+
+    except HTTPException:
+        raise
+    except PipelineError as e:
+        return jsonify({"error": str(e)}), 400
+    except OptimizerUnavailable as e:
+        response = jsonify({"error": str(e)})
+        response.status_code = e.status
+        if e.retry_after:
+            response.headers["Retry-After"] = e.retry_after
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/calibrate', methods=['POST'])
+@measure_limiter
+def calibrate():
+    """
+    API endpoint to calibrate a fixed camera with the reference object.
+    Takes an image like /measure2d and returns a session id; measurement
+    requests with that "session_id" need no reference object parameters and
+    reuse the scale, ignoring the reference object if it stays in view
+    (unless "store_region" is false). Sessions expire after "ttl" seconds.
+    """
+    try:
+        data = get_parameters()
+        if not data:
+            return jsonify({"error": "Invalid request format."}), 400
+
+        # Extract data
+        ref_obj_pos = data.get("ref_obj_pos")
+        ref_obj_width_real = data.get("ref_obj_width_real")
+        ref_obj_height_real = data.get("ref_obj_height_real")
+        ttl = data.get("ttl")
+        if ttl in (None, ""):
+            ttl = Config.CALIBRATION_TTL
+        elif not isinstance(ttl, int) or isinstance(ttl, bool) or ttl <= 0:
+            raise BadRequest("Invalid value for ttl.")
+        ttl = min(ttl, Config.MAX_CALIBRATION_TTL)
+
+        if not all([has_image(data, "image"), ref_obj_pos, ref_obj_width_real, ref_obj_height_real]):
+            return jsonify({"error": "Missing required parameters."}), 400
+        if not is_valid_roi(data.get("roi")):
+            return jsonify({"error": "Invalid region of interest."}), 400
+
+        # Decode image
+        image = get_image(data, "image")
+
+        if image is None:
+            return jsonify({"error": "Invalid image data."}), 400
+
+        measurement_system = MeasurementSystem(
+            ref_obj_pos, ref_obj_width_real, ref_obj_height_real, (None, None),
+            pyramid=bool(data.get("pyramid")), roi=data.get("roi"))
+        calibration = measurement_system.calibrate(image, store_region=data.get("store_region", True))
+        if "error" in calibration:
+            return jsonify(calibration), 400
+
+        session_id = uuid.uuid4().hex
+        calibration_store.put(session_id, json.dumps(calibration), ttl)
+        return jsonify({"session_id": session_id, "expires_in": ttl,
+                        "pixels_per_metric": calibration["pixels_per_metric"],
+                        "ref_obj_height_real": calibration["ref_obj_height_real"]})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/annotations/<annotation_id>', methods=['GET'])
+def get_annotation(annotation_id):
+    """
+    API endpoint to fetch an annotated image returned by id from a request
+    with "annotation": "deferred". Images expire after Config.ANNOTATION_TTL seconds.
+    """
+    image_format = annotation_id.rpartition(".")[2]
+    encoded_image = annotation_store.get(annotation_id) if image_format in Config.ANNOTATION_FORMATS else None
+    if encoded_image is None:
+        return jsonify({"error": "Annotated image not found or expired."}), 404
+
+    BYTES_SENT.inc(len(encoded_image))
+    response = Response(encoded_image, mimetype=Config.ANNOTATION_FORMATS[image_format][1])
+    response.headers["Cache-Control"] = f"private, max-age={Config.ANNOTATION_TTL}"
+    return response
+
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,4 @@
+from service_common.server import gunicorn_settings
+
+# Workers, threads, the port and the metrics directory, set up the same way for both services
+globals().update(gunicorn_settings("measurement"))
@@ -0,0 +1,176 @@
+"""
+Benchmark the accuracy and speed of the measurement pipeline on testing/images.
+
+Reports the dimension error against the known sizes in test_accuracy.py, the
+median latency of decoding and measuring each image, throughput with 1..N
+threads and peak memory. With --write-baseline the results are saved; later
+runs compare against that file and exit with status 1 if accuracy, latency,
+throughput or memory regress beyond the thresholds. Timings depend on the
+machine, so write the baseline on the machine that runs the comparison.
+
+Run from backend/measurement_system:
+    python testing/benchmark.py --write-baseline
+    python testing/benchmark.py [--threads 4] [--runs 5] [--annotation full]
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Config import Config
+from ImageProcessor import ImageProcessor
+from MeasurementSystem import MeasurementSystem
+from test_accuracy import IMAGES_DIRECTORY, calculate_accuracy, real_measurements_cm
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+def load_images():
+    """Encoded bytes of every test image, by item name."""
+    images = {}
+    for file_name in sorted(os.listdir(IMAGES_DIRECTORY)):
+        if file_name.endswith(('.jpg', '.png', '.jpeg')):
+            with open(os.path.join(IMAGES_DIRECTORY, file_name), "rb") as image_file:
+                images[file_name.split('.')[0].lower()] = image_file.read()
+    return images
+
+
+def measure(measurement_system, encoded_image):
+    """Decode and measure one image, as the /measure2d endpoint does."""
+    image = ImageProcessor.decode_image_buffer(encoded_image)
+    return measurement_system.measure_2d_item(image, None)
+
+
+def run(images, threads, runs, annotation):
+    measurement_system = MeasurementSystem("left", 8.56, 5.39, [None, None], annotation=annotation)
+
+    # First pass: results and peak memory, which also warms up OpenCV
+    tracemalloc.start()
+    measured = {}
+    for name, encoded_image in images.items():
+        result = measure(measurement_system, encoded_image)
+        measured[name] = [result["width"], result["height"]] if "error" not in result else None
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Only some images have known sizes
+    known = {item["item"].lower() for item in real_measurements_cm}
+    accuracy = calculate_accuracy({name: tuple(dims) for name, dims in measured.items() if dims and name in known},
+                                  real_measurements_cm)
+    errors = {name: 100 - result["average_accuracy"] for name, result in accuracy.items()}
+
+    latencies = {}
+    for name, encoded_image in images.items():
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            measure(measurement_system, encoded_image)
+            samples.append(time.perf_counter() - start)
+        latencies[name] = statistics.median(samples)
+
+    throughput = {}
+    work = list(images.values()) * runs
+    for count in sorted({1, threads}):
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            start = time.perf_counter()
+            list(executor.map(lambda encoded_image: measure(measurement_system, encoded_image), work))
+            throughput[str(count)] = len(work) / (time.perf_counter() - start)
+
+    return {
+        "annotation": annotation,
+        "measured": measured,
+        "errors": errors,
+        "mean_error": statistics.mean(errors.values()),
+        "latencies": latencies,
+        "total_latency": sum(latencies.values()),
+        "throughput": throughput,
+        "peak_traced_mib": peak / 1024 / 1024,
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def regressions(results, baseline, args):
+    """Descriptions of everything that got worse than the baseline allows."""
+    found = []
+    failed = sorted(name for name, dims in results["measured"].items() if dims is None)
+    if failed:
+        found.append(f"measurement failed on {', '.join(failed)}")
+    if results["mean_error"] > baseline["mean_error"] + args.max_error_increase:
+        found.append(f"mean error {results['mean_error']:.2f}% vs {baseline['mean_error']:.2f}%")
+    if results["total_latency"] > baseline["total_latency"] * (1 + args.max_slowdown):
+        found.append(f"total latency {results['total_latency'] * 1000:.0f} ms "
+                     f"vs {baseline['total_latency'] * 1000:.0f} ms")
+    for count, rate in results["throughput"].items():
+        if count in baseline["throughput"] and rate < baseline["throughput"][count] * (1 - args.max_slowdown):
+            found.append(f"throughput with {count} threads {rate:.1f}/s vs {baseline['throughput'][count]:.1f}/s")
+    if results["peak_traced_mib"] > baseline["peak_traced_mib"] * (1 + args.max_memory_increase):
+        found.append(f"peak memory {results['peak_traced_mib']:.1f} MiB vs {baseline['peak_traced_mib']:.1f} MiB")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1,
+                        help="threads for the throughput run, compared with one")
+    parser.add_argument("--runs", type=int, default=5, help="timed repetitions of every image")
+    parser.add_argument("--annotation", choices=Config.ANNOTATION_MODES, default="full")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true", help="save these results as the baseline")
+    parser.add_argument("--max-error-increase", type=float, default=1.0,
+                        help="allowed rise of the mean dimension error, in percentage points")
+    parser.add_argument("--max-slowdown", type=float, default=0.25,
+                        help="allowed fraction of extra latency or lost throughput")
+    parser.add_argument("--max-memory-increase", type=float, default=0.25,
+                        help="allowed fraction of extra peak memory")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.write_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["annotation"] != args.annotation:
+            parser.error(f"the baseline was written with --annotation {baseline['annotation']}")
+
+    results = run(load_images(), args.threads, args.runs, args.annotation)
+
+    print(f"{'image':<22}{'width':>8}{'height':>8}{'error %':>9}{'ms':>8}")
+    for name, dims in results["measured"].items():
+        width, height = dims or ("-", "-")
+        error = f"{results['errors'][name]:.2f}" if name in results["errors"] else "-"
+        print(f"{name:<22}{width:>8}{height:>8}{error:>9}{results['latencies'][name] * 1000:>8.1f}")
+    print(f"mean error {results['mean_error']:.2f}%, total latency {results['total_latency'] * 1000:.0f} ms, "
+          f"peak traced {results['peak_traced_mib']:.1f} MiB, max RSS {results['max_rss_mib']:.1f} MiB")
+    print("throughput " + ", ".join(f"{count} threads {rate:.1f} images/s"
+                                    for count, rate in results["throughput"].items()))
+
+    if args.write_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --write-baseline to create one")
+        return
+
+    found = regressions(results, baseline, args)
+    changed = sorted(name for name, dims in results["measured"].items()
+                     if dims != baseline["measured"].get(name))
+    if changed:
+        print(f"measurements changed on {', '.join(changed)}")
+    for regression in found:
+        print(f"REGRESSION: {regression}")
+    if found:
+        sys.exit(1)
+    print("no regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import base64
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, calibration_store
+from MeasurementSystem import annotation_store
+from ResultCache import result_cache
+
+
+IMAGES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+
+# The card in every test image, on the left
+REFERENCE = {"ref_obj_pos": "left", "ref_obj_width_real": 8.56, "ref_obj_height_real": 5.39}
+
+
+def read_image(name):
+    """Encoded bytes of a test image."""
+    with open(os.path.join(IMAGES_DIRECTORY, f"{name}.jpg"), "rb") as image_file:
+        return image_file.read()
+
+
+def encode_image(name):
+    return base64.b64encode(read_image(name)).decode()
+
+
+def use_temporary_database(test_case):
+    """Point the annotation, calibration and result stores at a fresh database for one test."""
+    directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(directory.cleanup)
+    path = os.path.join(directory.name, "measurements.sqlite3")
+    for store in (annotation_store, calibration_store, result_cache.store):
+        test_case.addCleanup(setattr, store, "created", store.created)
+        test_case.addCleanup(setattr, store, "path", store.path)
+        store.path = path
+        store.created = False
+    return path
+
+
+def client():
+    return app.test_client()
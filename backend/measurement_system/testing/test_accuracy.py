@@ -1,10 +1,13 @@
 import os
-from MeasurementSystem import MeasurementSystem
+import sys
 import cv2 as cv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MeasurementSystem import MeasurementSystem
+
 
-IMAGES_DIRECTORY = "testing/images"
-measurement_system = MeasurementSystem("left", 8.56, [None, None])
+IMAGES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
 
 
 def calculate_accuracy(measured_values, real_measurements_list):
@@ -64,24 +67,31 @@ real_measurements_cm = [
     {'item': 'coin-5', 'width': 1.6, 'height': 1.6, 'depth': 1.6}
 ]
 
-measured_values = {}
 
-for file_name in os.listdir(IMAGES_DIRECTORY):
-    if not file_name.endswith(('.jpg', '.png', '.jpeg')):
-        continue
+def main():
+    measurement_system = MeasurementSystem("left", 8.56, 5.39, [None, None])
+    measured_values = {}
+
+    for file_name in os.listdir(IMAGES_DIRECTORY):
+        if not file_name.endswith(('.jpg', '.png', '.jpeg')):
+            continue
+
+        image_path = os.path.join(IMAGES_DIRECTORY, file_name)
+        # Extract item name from file name
+        item_name = file_name.split('.')[0].lower()
+
+        image = cv.imread(image_path)
+        measurements = measurement_system.measure_2d_item(image, None)
 
-    image_path = os.path.join(IMAGES_DIRECTORY, file_name)
-    # Extract item name from file name
-    item_name = file_name.split('.')[0].lower()
+        measured_values[item_name] = (
+            measurements["width"], measurements["height"]
+        )
 
-    image = cv.imread(image_path)
-    measurements = measurement_system.measure_2d_item(image, None)
+    accuracy_results = calculate_accuracy(measured_values, real_measurements_cm)
 
-    measured_values[item_name] = (
-        measurements["width"], measurements["height"]
-    )
+    for item, result in accuracy_results.items():
+        print(f"{item}: {result['average_accuracy']:.2f}% accuracy")
 
-accuracy_results = calculate_accuracy(measured_values, real_measurements_cm)
 
-for item, result in accuracy_results.items():
-    print(f"{item}: {result['average_accuracy']:.2f}% accuracy")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import base64
+import time
+import unittest
+from unittest import mock
+import cv2 as cv
+import numpy as np
+from helpers import REFERENCE, client, encode_image, use_temporary_database
+from Config import Config
+
+
+def decode(encoded_image):
+    return cv.imdecode(np.frombuffer(encoded_image, np.uint8), cv.IMREAD_COLOR)
+
+
+class TestAnnotations(unittest.TestCase):
+
+    def setUp(self):
+        use_temporary_database(self)
+        self.client = client()
+
+    def measure(self, path='/measure2d', **options):
+        if path == '/measure':
+            images = {"front_image_b64": encode_image("card-usb-1"), "side_image_b64": encode_image("card-usb-2")}
+        else:
+            images = {"image_b64": encode_image("card-usb-1")}
+        response = self.client.post(path, json={**REFERENCE, **images, **options})
+        self.assertEqual(response.status_code, 200)
+        return response.json
+
+    def test_full_annotation_is_the_whole_image(self):
+        result = self.measure()
+
+        image = decode(base64.b64decode(result["annotated_image"]))
+        self.assertEqual(image.shape[:2], (900, 1200))
+        self.assertEqual((result["width"], result["height"]), (4.5, 1.58))
+
+    def test_full_annotation_is_the_default(self):
+        self.assertEqual(self.measure(), self.measure(annotation="full"))
+
+    def test_thumbnail_annotation(self):
+        result = self.measure(annotation="thumbnail")
+
+        image = decode(base64.b64decode(result["annotated_image"]))
+        self.assertEqual(image.shape[:2], (360, Config.THUMBNAIL_WIDTH))
+
+    def test_no_annotation(self):
+        result = self.measure(annotation="none")
+        self.assertEqual(result, {"width": 4.5, "height": 1.58})
+
+        result = self.measure('/measure', annotation="none")
+        self.assertEqual(result, {"width": 4.66, "height": 1.58, "depth": 1.46})
+
+    def test_deferred_annotation_is_fetched_by_id(self):
+        result = self.measure(annotation="deferred")
+        self.assertNotIn("annotated_image", result)
+        self.assertTrue(result["annotated_image_id"].endswith(".jpeg"))
+
+        response = self.client.get(f'/annotations/{result["annotated_image_id"]}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/jpeg")
+        self.assertEqual(response.headers["Cache-Control"], f"private, max-age={Config.ANNOTATION_TTL}")
+        self.assertEqual(decode(response.data).shape[:2], (900, 1200))
+
+    def test_deferred_annotation_format(self):
+        result = self.measure(annotation="deferred", annotation_format="webp", annotation_quality=50)
+
+        response = self.client.get(f'/annotations/{result["annotated_image_id"]}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/webp")
+        self.assertEqual(response.data[8:12], b"WEBP")
+
+    def test_3d_annotations_are_named_by_view(self):
+        result = self.measure('/measure', annotation="deferred")
+
+        for key in ("front_annotated_image_id", "side_annotated_image_id"):
+            with self.subTest(key=key):
+                self.assertEqual(self.client.get(f'/annotations/{result[key]}').status_code, 200)
+
+        result = self.measure('/measure', annotation="thumbnail")
+        self.assertIn("front_annotated_image", result)
+        self.assertIn("side_annotated_image", result)
+
+    def test_deferred_annotation_expires(self):
+        annotation_id = self.measure(annotation="deferred")["annotated_image_id"]
+
+        later = time.time() + Config.ANNOTATION_TTL + 1
+        with mock.patch("SharedStore.time.time", return_value=later):
+            response = self.client.get(f'/annotations/{annotation_id}')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json["error"], "Annotated image not found or expired.")
+
+    def test_unknown_annotations_are_not_found(self):
+        annotation_id = self.measure(annotation="deferred")["annotated_image_id"]
+
+        for path in ('/annotations/missing.jpeg', f'/annotations/{annotation_id.rpartition(".")[0]}.png'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_unsupported_options_are_rejected(self):
+        for options in [{"annotation": "huge"}, {"annotation_format": "png"},
+                        {"annotation_quality": 0}, {"annotation_quality": 101},
+                        {"annotation_quality": True}, {"annotation_quality": "75"}]:
+            with self.subTest(options=options):
+                response = self.client.post('/measure2d', json={
+                    **REFERENCE, "image_b64": encode_image("card-usb-1"), **options})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json["error"], "Unsupported annotation options.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import base64
+import json
+import unittest
+from unittest import mock
+from helpers import REFERENCE, app, client, encode_image, use_temporary_database
+from app import measure_limiter
+
+
+USB_2D = {"id": "usb-front", "image_b64": encode_image("card-usb-1")}
+USB_3D = {"id": "usb", "front_image_b64": encode_image("card-usb-1"), "side_image_b64": encode_image("card-usb-2")}
+
+
+def free_slots():
+    """Measuring slots not held by a request."""
+    count = 0
+    while measure_limiter.slots.acquire(blocking=False):
+        count += 1
+    for _ in range(count):
+        measure_limiter.slots.release()
+    return count
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        use_temporary_database(self)
+        self.client = client()
+
+    def post(self, items, **extra):
+        return self.client.post('/measure/batch', json={**REFERENCE, "annotation": "none", "items": items, **extra},
+                                **({"buffered": False} if extra.get("stream") else {}))
+
+    def test_items_are_measured_in_order(self):
+        response = self.post([USB_3D, USB_2D])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["items"], [
+            {"id": "usb", "width": 4.66, "height": 1.58, "depth": 1.46},
+            {"id": "usb-front", "width": 4.5, "height": 1.58},
+        ])
+
+    def test_failed_items_carry_their_error(self):
+        response = self.post([
+            {"id": "no-image"},
+            {"id": "no-side", "front_image_b64": encode_image("card-usb-1")},
+            {"id": "bad-base64", "image_b64": "abc"},
+            {"id": "not-an-image", "image_b64": base64.b64encode(b"not an image").decode()},
+            USB_2D,
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["items"], [
+            {"id": "no-image", "error": "Missing image data."},
+            {"id": "no-side", "error": "Missing image data."},
+            {"id": "bad-base64", "error": "Invalid image data."},
+            {"id": "not-an-image", "error": "Invalid image data."},
+            {"id": "usb-front", "width": 4.5, "height": 1.58},
+        ])
+
+    def test_invalid_batches_are_rejected(self):
+        for items in [[], "usb", [USB_2D, "usb"]]:
+            with self.subTest(items=items):
+                self.assertEqual(self.post(items).status_code, 400)
+
+        with mock.patch("app.Config.MAX_BATCH_ITEMS", 1):
+            response = self.post([USB_2D, USB_2D])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["error"], "At most 1 items per batch.")
+
+    def test_batches_may_exceed_the_upload_limit(self):
+        original_limit = app.config["MAX_CONTENT_LENGTH"]
+        app.config["MAX_CONTENT_LENGTH"] = 1024
+        self.addCleanup(app.config.__setitem__, "MAX_CONTENT_LENGTH", original_limit)
+
+        self.assertEqual(self.post([USB_2D]).status_code, 200)
+        self.assertEqual(self.client.post('/measure2d', json={**REFERENCE, **USB_2D}).status_code, 413)
+
+    def test_streamed_results(self):
+        items = [USB_3D, {"id": "no-image"}, USB_2D]
+        response = self.post(items, stream=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        response.close()
+        self.assertEqual(lines, self.post(items).json["items"])
+
+    def test_stream_holds_its_slot_until_sent(self):
+        slots = free_slots()
+        response = self.post([USB_2D, USB_2D], stream=True)
+
+        body = iter(response.response)
+        self.assertEqual(json.loads(next(body))["id"], "usb-front")
+        self.assertEqual(free_slots(), slots - 1)
+
+        response.close()
+        self.assertEqual(free_slots(), slots)
+
+    def test_slot_is_released_after_each_request(self):
+        slots = free_slots()
+
+        self.post([USB_2D])
+        self.post([{"id": "no-image"}])
+        self.post("usb")
+        self.post([USB_2D], stream=True).close()
+
+        self.assertEqual(free_slots(), slots)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import io
+import time
+import unittest
+from unittest import mock
+from helpers import REFERENCE, client, encode_image, read_image, use_temporary_database
+from Config import Config
+
+
+class TestCalibration(unittest.TestCase):
+
+    def setUp(self):
+        use_temporary_database(self)
+        self.client = client()
+
+    def calibrate(self, **extra):
+        response = self.client.post('/calibrate', json={**REFERENCE, "image_b64": encode_image("card-usb-1"), **extra})
+        self.assertEqual(response.status_code, 200)
+        return response.json
+
+    def measure(self, session_id, name="card-usb-1"):
+        return self.client.post('/measure2d', json={"session_id": session_id, "annotation": "none",
+                                                    "image_b64": encode_image(name)})
+
+    def test_session_replaces_the_reference(self):
+        session = self.calibrate()
+        self.assertEqual(session["expires_in"], Config.CALIBRATION_TTL)
+        self.assertEqual(session["ref_obj_height_real"], 5.4)
+
+        response = self.measure(session["session_id"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"width": 4.5, "height": 1.58})
+
+    def test_session_applies_to_every_endpoint(self):
+        session_id = self.calibrate()["session_id"]
+
+        response = self.client.post('/measure', json={
+            "session_id": session_id, "annotation": "none",
+            "front_image_b64": encode_image("card-usb-1"), "side_image_b64": encode_image("card-usb-2")})
+        self.assertEqual(response.json, {"width": 4.8, "height": 1.58, "depth": 1.5})
+
+        response = self.client.post('/measure/batch', json={
+            "session_id": session_id, "annotation": "none",
+            "items": [{"id": "usb", "image_b64": encode_image("card-usb-1")}]})
+        self.assertEqual(response.json, {"items": [{"id": "usb", "width": 4.5, "height": 1.58}]})
+
+    def test_reference_is_measured_without_its_region(self):
+        session_id = self.calibrate(store_region=False)["session_id"]
+
+        self.assertEqual(self.measure(session_id).json, {"width": 8.56, "height": 5.4})
+
+    def test_unknown_session(self):
+        response = self.measure("missing")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json["error"], "Calibration session not found or expired.")
+
+    def test_session_expires_after_its_ttl(self):
+        session = self.calibrate(ttl=60)
+        self.assertEqual(session["expires_in"], 60)
+
+        with mock.patch("SharedStore.time.time", return_value=time.time() + 59):
+            self.assertEqual(self.measure(session["session_id"]).status_code, 200)
+        with mock.patch("SharedStore.time.time", return_value=time.time() + 61):
+            self.assertEqual(self.measure(session["session_id"]).status_code, 404)
+
+    def test_ttl_is_capped(self):
+        self.assertEqual(self.calibrate(ttl=10 ** 9)["expires_in"], Config.MAX_CALIBRATION_TTL)
+
+    def test_ttl_form_field(self):
+        response = self.client.post('/calibrate', data={
+            **{name: str(value) for name, value in REFERENCE.items()}, "ttl": "120",
+            "image": (io.BytesIO(read_image("card-usb-1")), "card-usb-1.jpg")},
+            content_type="multipart/form-data")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["expires_in"], 120)
+
+    def test_invalid_ttl_is_rejected(self):
+        for ttl in [0, -60, 1.5, "60", True, [60]]:
+            with self.subTest(ttl=ttl):
+                response = self.client.post('/calibrate', json={
+                    **REFERENCE, "image_b64": encode_image("card-usb-1"), "ttl": ttl})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json["error"], "Invalid value for ttl.")
+
+        for ttl in ["0", "-60", "soon"]:
+            with self.subTest(ttl=ttl):
+                response = self.client.post('/calibrate', query_string={**REFERENCE, "ttl": ttl},
+                                            data=read_image("card-usb-1"),
+                                            content_type="image/jpeg")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json["error"], "Invalid value for ttl.")
+
+
+if __name__ == '__main__':
+    unittest.main()
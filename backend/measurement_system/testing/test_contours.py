@@ -0,0 +1,106 @@
+import unittest
+import numpy as np
+from helpers import REFERENCE, client, encode_image, use_temporary_database
+from ContourProcessor import ContourProcessor
+
+
+def rectangle(x, y, w, h):
+    """Contour of a rectangle, as cv.findContours returns it."""
+    return np.array([[[x, y]], [[x + w, y]], [[x + w, y + h]], [[x, y + h]]], dtype=np.int32)
+
+
+def line(x1, y1, x2, y2):
+    """Contour of a thin diagonal line: a large bounding box around almost no area."""
+    return np.array([[[x1, y1]], [[x2, y2]], [[x2 + 1, y2]], [[x1 + 1, y1]]], dtype=np.int32)
+
+
+class TestSelectContours(unittest.TestCase):
+
+    def assertSelected(self, selected, expected):
+        self.assertEqual([contour.tolist() for contour in selected], [contour.tolist() for contour in expected])
+
+    def test_largest_are_kept_in_order(self):
+        small, large, medium = rectangle(0, 0, 20, 20), rectangle(50, 0, 40, 40), rectangle(100, 0, 30, 30)
+
+        self.assertSelected(ContourProcessor.select_contours([small, large, medium]), [large, medium])
+        self.assertSelected(ContourProcessor.select_contours([small, large, medium], count=3), [small, large, medium])
+        self.assertSelected(ContourProcessor.select_contours([small, large, medium], count=1), [large])
+
+    def test_small_contours_are_dropped(self):
+        speck, thin, box = rectangle(0, 0, 5, 5), line(0, 0, 50, 50), rectangle(300, 0, 20, 20)
+
+        self.assertSelected(ContourProcessor.select_contours([speck, thin, box]), [box])
+        self.assertSelected(ContourProcessor.select_contours([speck, thin, box], min_area=0), [thin, box])
+        self.assertEqual(ContourProcessor.select_contours([]), [])
+
+    def test_region_of_interest(self):
+        # Centres at (20, 20), (120, 20) and (120, 120) in a 200 x 200 image
+        left, right, corner = rectangle(10, 10, 20, 20), rectangle(110, 10, 20, 20), rectangle(110, 110, 20, 20)
+        contours = [left, right, corner]
+
+        for roi, expected in [((0, 0, 1, 1), [left, right, corner]),
+                              ((0.5, 0, 0.5, 1), [right, corner]),
+                              ((0, 0, 1, 0.5), [left, right]),
+                              ((0.6, 0.1, 0.4, 0.5), [right]),
+                              ((0.7, 0, 0.3, 1), [])]:
+            with self.subTest(roi=roi):
+                self.assertSelected(ContourProcessor.select_contours(contours, count=3, roi=roi,
+                                                                     image_size=(200, 200)), expected)
+
+    def test_region_scales_with_each_side(self):
+        # Centres at (20, 20) and (120, 20)
+        contours = [rectangle(10, 10, 20, 20), rectangle(110, 10, 20, 20)]
+
+        for image_size, expected in [((200, 200), contours[:1]), ((400, 400), contours), ((400, 20), [])]:
+            with self.subTest(image_size=image_size):
+                self.assertSelected(ContourProcessor.select_contours(contours, roi=(0, 0, 0.5, 0.5),
+                                                                     image_size=image_size), expected)
+
+
+class TestRegionOfInterest(unittest.TestCase):
+
+    def setUp(self):
+        use_temporary_database(self)
+        self.client = client()
+
+    def measure(self, roi):
+        return self.client.post('/measure2d', json={**REFERENCE, "annotation": "none", "roi": roi,
+                                                    "image_b64": encode_image("card-usb-1")})
+
+    def test_whole_image(self):
+        self.assertEqual(self.measure([0, 0, 1, 1]).json, self.measure(None).json)
+
+    def test_objects_outside_are_ignored(self):
+        # Only the card is left of the middle, so it is measured as the object
+        response = self.measure([0, 0, 0.5, 1])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"width": 8.56, "height": 5.4})
+
+    def test_empty_region(self):
+        response = self.measure([0.9, 0.9, 0.1, 0.1])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["error"], "No objects found.")
+
+    def test_invalid_regions_are_rejected(self):
+        for roi in [[0, 0, 1], [0, 0, 1, 1, 1], [0, 0, 0, 1], [0, 0, 1, 0], [-0.1, 0, 1, 1], [0, 0, 1.5, 1],
+                    [0, 0, "1", 1], [True, 0, 1, 1], {"x": 0}, "0,0,1,1"]:
+            with self.subTest(roi=roi):
+                response = self.measure(roi)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json["error"], "Invalid region of interest.")
+
+    def test_region_is_checked_by_every_endpoint(self):
+        images = {"front_image_b64": encode_image("card-usb-1"), "side_image_b64": encode_image("card-usb-2")}
+        for path, payload in [('/measure', images), ('/measure/batch', {"items": [images]}),
+                              ('/calibrate', {"image_b64": encode_image("card-usb-1")}),
+                              ('/pipeline', {"items": [images], "container": {"width": 1, "height": 1, "depth": 1}})]:
+            with self.subTest(path=path):
+                response = self.client.post(path, json={**REFERENCE, "roi": [0, 0, 2, 1], **payload})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json["error"], "Invalid region of interest.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,17 @@
 import unittest
+from unittest import mock
+from ContourProcessor import ContourProcessor
+from ImageProcessor import ImageProcessor
 from MeasurementSystem import MeasurementSystem
 import cv2 as cv
 
 
 IMAGES_DIRECTORY = "testing/images"
-measurement_system = MeasurementSystem("left", 8.56, [None, None])
+measurement_system = MeasurementSystem("left", 8.56, 5.39, [None, None])
 
 
 class TestMeasure3DItem(unittest.TestCase):
+    measurement_system = measurement_system
 
     def test_measure_2d_item(self):
         test_cases = [
@@ -24,7 +28,7 @@ class TestMeasure3DItem(unittest.TestCase):
                 image_path = f"{IMAGES_DIRECTORY}/{case['item']}.jpg"
                 image = cv.imread(image_path)
 
-                result = measurement_system.measure_2d_item(image, None)
+                result = self.measurement_system.measure_2d_item(image, None)
 
                 self.assertEqual(
                     result['width'], case['width'], f"Failed on {case['item']} - Expected width: {case['width']}, Got: {result['width']}")
@@ -45,7 +49,7 @@ class TestMeasure3DItem(unittest.TestCase):
                 front_image = cv.imread(front_image_path)
                 side_image = cv.imread(side_image_path)
 
-                result = measurement_system.measure_3d_item(
+                result = self.measurement_system.measure_3d_item(
                     front_image, side_image)
 
                 self.assertEqual(
@@ -56,5 +60,53 @@ class TestMeasure3DItem(unittest.TestCase):
                     result['depth'], case['depth'], f"Failed on {case['item']} - Expected depth: {case['depth']}, Got: {result['depth']}")
 
 
+class TestMeasurePyramid(TestMeasure3DItem):
+    """The coarse-to-fine contour search must measure the test images like the full-resolution one."""
+    measurement_system = MeasurementSystem("left", 8.56, 5.39, [None, None], pyramid=True)
+
+    def test_pyramid_search_is_used(self):
+        image = cv.imread(f"{IMAGES_DIRECTORY}/card-usb-1.jpg")
+        with mock.patch("ContourProcessor.ContourProcessor.get_contours_pyramid",
+                        wraps=ContourProcessor.get_contours_pyramid) as get_contours_pyramid:
+            self.measurement_system.measure_2d_item(image, None)
+
+        get_contours_pyramid.assert_called_once()
+
+
+class TestDecodeImageBuffer(unittest.TestCase):
+
+    def test_uploads_measure_like_files(self):
+        # Uploads go through decode_image_buffer; a reduced decode must not cost accuracy
+        test_cases = [
+            {'item': 'card-laptop', 'width': 32.24, 'height': 21.29},
+            {'item': 'card-phone', 'width': 8.39, 'height': 17.26},
+            {'item': 'card-usb-1', 'width': 4.5, 'height': 1.58}
+        ]
+
+        for case in test_cases:
+            with self.subTest(case=case):
+                with open(f"{IMAGES_DIRECTORY}/{case['item']}.jpg", "rb") as image_file:
+                    image = ImageProcessor.decode_image_buffer(image_file.read())
+
+                result = measurement_system.measure_2d_item(image, None)
+
+                self.assertEqual((result['width'], result['height']), (case['width'], case['height']))
+
+    def test_only_large_jpegs_are_decoded_reduced(self):
+        image = cv.imread(f"{IMAGES_DIRECTORY}/card-phone.jpg")
+        large = cv.resize(image, None, fx=2, fy=2)
+
+        for extension, source, flags in [(".jpg", image, cv.IMREAD_COLOR),
+                                         (".jpg", large, cv.IMREAD_REDUCED_COLOR_2),
+                                         (".png", large, cv.IMREAD_COLOR)]:
+            with self.subTest(extension=extension, size=source.shape[:2]):
+                encoded = cv.imencode(extension, source)[1].tobytes()
+                with mock.patch("ImageProcessor.cv.imdecode", wraps=cv.imdecode) as imdecode:
+                    decoded = ImageProcessor.decode_image_buffer(encoded)
+
+                self.assertEqual(imdecode.call_args[0][1], flags)
+                self.assertEqual(decoded.shape[:2], (1080, 1270))
+
+
 if __name__ == '__main__':
     unittest.main()
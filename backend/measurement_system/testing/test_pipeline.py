@@ -0,0 +1,184 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from helpers import REFERENCE, client, encode_image, use_temporary_database
+import Pipeline
+
+
+class FakeOptimizer(BaseHTTPRequestHandler):
+    """Stands in for the optimizer service: records each request and sends the configured reply."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((self.path, json.loads(body)))
+        status, reply = self.server.reply
+        encoded = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        if status == 503:
+            self.send_header("Retry-After", "7")
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        use_temporary_database(self)
+        self.optimizer = ThreadingHTTPServer(("127.0.0.1", 0), FakeOptimizer)
+        self.optimizer.requests = []
+        self.optimizer.reply = (200, {"status": "success", "placements": [], "space_utilization": 12.5})
+        threading.Thread(target=self.optimizer.serve_forever, daemon=True).start()
+        self.addCleanup(self.optimizer.server_close)
+        self.addCleanup(self.optimizer.shutdown)
+
+        original_url = Pipeline.OPTIMIZER_URL
+        Pipeline.OPTIMIZER_URL = f"http://127.0.0.1:{self.optimizer.server_address[1]}"
+        self.addCleanup(setattr, Pipeline, "OPTIMIZER_URL", original_url)
+        self.client = client()
+
+    def post(self, items=None, **extra):
+        if items is None:
+            items = [{"id": "matchbox", "front_image_b64": encode_image("card-matchbox-1"),
+                      "side_image_b64": encode_image("card-matchbox-2")},
+                     {"id": "usb", "front_image_b64": encode_image("card-usb-1"),
+                      "side_image_b64": encode_image("card-usb-2")}]
+        payload = {**REFERENCE, "container": {"width": 30, "height": 20, "depth": 10}, "items": items, **extra}
+        return self.client.post('/pipeline', json=payload)
+
+    def test_packs_measured_items_with_the_optimizer(self):
+        response = self.post(config={"engine": "continuous", "seed": 3}, job_id="load-1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["packing"]["space_utilization"], 12.5)
+        self.assertEqual(response.json["items"], [
+            {"id": "matchbox", "width": 10.5, "height": 5.39, "depth": 2.79},
+            {"id": "usb", "width": 4.66, "height": 1.58, "depth": 1.46},
+        ])
+
+        path, sent = self.optimizer.requests[0]
+        self.assertEqual(path, "/optimize")
+        self.assertEqual(sent["config"], {"engine": "continuous", "seed": 3})
+        self.assertEqual(sent["job_id"], "load-1")
+        self.assertEqual(sent["items"][1], {"id": "usb", "dimensions": {"width": 4.66, "height": 1.58,
+                                                                       "depth": 1.46}})
+
+    def test_item_without_images_is_named(self):
+        response = self.post([{"id": "empty"}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("empty", response.json["error"])
+        self.assertEqual(self.optimizer.requests, [])
+
+    def test_too_many_items_are_rejected(self):
+        with mock.patch("app.Config.MAX_BATCH_ITEMS", 1):
+            response = self.post()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["error"], "At most 1 items per batch.")
+        self.assertEqual(self.optimizer.requests, [])
+
+    def test_container_must_be_an_object(self):
+        for container in [[30, 20, 10], "30x20x10", 30, {"width": 30, "height": 20}]:
+            with self.subTest(container=container):
+                response = self.post(container=container)
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.optimizer.requests, [])
+
+    def test_integer_engines_are_rejected(self):
+        response = self.post(config={"engine": "grid"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.optimizer.requests, [])
+
+    def test_optimizer_errors(self):
+        self.optimizer.reply = (400, {"status": "error", "message": "Unknown solver 'x'"})
+        response = self.post()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown solver 'x'", response.json["error"])
+
+        self.optimizer.reply = (503, {"status": "error", "message": "Server is busy, retry later"})
+        response = self.post()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "7")
+
+        self.optimizer.reply = (500, {"status": "error", "message": "boom"})
+        self.assertEqual(self.post().status_code, 502)
+
+    def test_unreachable_optimizer(self):
+        self.optimizer.shutdown()
+        self.optimizer.server_close()
+
+        response = self.post()
+        self.assertEqual(response.status_code, 502)
+        self.assertIn("unavailable", response.json["error"])
+
+
+class TestPipelineWithOptimizer(unittest.TestCase):
+    """Packs through the real optimizer service, started under its own gunicorn config."""
+
+    def setUp(self):
+        use_temporary_database(self)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY="1",
+                   PROMETHEUS_MULTIPROC_DIR=os.path.join(directory.name, "metrics"),
+                   SOLUTION_DB=os.path.join(directory.name, "solutions.sqlite3"),
+                   CHECKPOINT_DIR=os.path.join(directory.name, "checkpoints"))
+        optimizer_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                           "..", "optimizer")
+        server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                                  cwd=optimizer_directory, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.addCleanup(server.wait, 30)
+        self.addCleanup(server.terminate)
+
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(url + "/metrics", timeout=5).close()
+                break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    self.fail("the optimizer service did not start")
+                time.sleep(0.2)
+
+        original_url = Pipeline.OPTIMIZER_URL
+        Pipeline.OPTIMIZER_URL = url
+        self.addCleanup(setattr, Pipeline, "OPTIMIZER_URL", original_url)
+
+    def test_measured_items_are_packed(self):
+        items = [{"id": "matchbox", "front_image_b64": encode_image("card-matchbox-1"),
+                  "side_image_b64": encode_image("card-matchbox-2")},
+                 {"id": "usb", "front_image_b64": encode_image("card-usb-1"),
+                  "side_image_b64": encode_image("card-usb-2")}]
+        response = client().post('/pipeline', json={
+            **REFERENCE, "container": {"width": 30, "height": 20, "depth": 10}, "items": items,
+            "job_id": "load-1"})
+
+        self.assertEqual(response.status_code, 200)
+        packing = response.json["packing"]
+        self.assertEqual(packing["status"], "success")
+        self.assertEqual(packing["job_id"], "load-1")
+        self.assertEqual(sorted(placement[0] for placement in packing["placements"]), ["matchbox", "usb"])
+
+
+if __name__ == '__main__':
+    unittest.main()
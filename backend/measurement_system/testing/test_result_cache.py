@@ -0,0 +1,125 @@
+import itertools
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+from helpers import REFERENCE, client, encode_image, use_temporary_database
+from ImageProcessor import ImageProcessor
+from ResultCache import ResultCache
+from SharedStore import SharedStore
+
+
+def temporary_path(test_case):
+    directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(directory.cleanup)
+    return os.path.join(directory.name, "measurements.sqlite3")
+
+
+class TestSharedStore(unittest.TestCase):
+
+    def test_old_tables_are_migrated(self):
+        path = temporary_path(self)
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE results (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+            connection.execute("INSERT INTO results VALUES ('old', 'kept', 1e12)")
+        connection.close()
+
+        store = SharedStore("results", 60, path=path, max_rows=2)
+        self.assertEqual(store.get("old"), "kept")
+        store.put("new", "added")
+        self.assertEqual(store.get("new"), "added")
+
+        # A second worker finds the column already there
+        self.assertEqual(SharedStore("results", 60, path=path, max_rows=2).get("old"), "kept")
+        with sqlite3.connect(path) as connection:
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(results)")]
+            indexes = [row[1] for row in connection.execute("PRAGMA index_list(results)")]
+        connection.close()
+        self.assertIn("used", columns)
+        self.assertIn("results_used", indexes)
+
+    def test_least_recently_used_rows_are_dropped(self):
+        store = SharedStore("results", 60, path=temporary_path(self), max_rows=2)
+
+        # Distinct timestamps, so the order of use is unambiguous
+        with mock.patch("SharedStore.time.time", side_effect=itertools.count(1000)):
+            store.put("a", "1")
+            store.put("b", "2")
+            store.get("a")
+            store.put("c", "3")
+
+            self.assertEqual([store.get(key) for key in ("a", "b", "c")], ["1", None, "3"])
+
+    def test_rows_expire(self):
+        store = SharedStore("results", 60, path=temporary_path(self))
+        store.put("short", "1", ttl=10)
+        store.put("default", "2")
+
+        with mock.patch("SharedStore.time.time", return_value=time.time() + 30):
+            self.assertEqual([store.get("short"), store.get("default")], [None, "2"])
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        use_temporary_database(self)
+        self.client = client()
+        decode = mock.patch("app.ImageProcessor.decode_image_buffer", wraps=ImageProcessor.decode_image_buffer)
+        self.decode = decode.start()
+        self.addCleanup(decode.stop)
+
+    def measure(self, **extra):
+        response = self.client.post('/measure2d', json={**REFERENCE, "annotation": "none",
+                                                        "image_b64": encode_image("card-usb-1"), **extra})
+        return response.status_code, response.json
+
+    def test_repeated_request_is_a_hit(self):
+        first = self.measure()
+        self.assertEqual(self.decode.call_count, 1)
+
+        self.assertEqual(self.measure(), first)
+        self.assertEqual(self.decode.call_count, 1)
+
+    def test_changed_settings_are_a_miss(self):
+        self.measure()
+
+        for extra in [{"annotation": "thumbnail"}, {"ref_obj_width_real": 8.5}, {"roi": [0, 0, 0.5, 1]},
+                      {"image_b64": encode_image("card-usb-2")}]:
+            with self.subTest(extra=list(extra)):
+                calls = self.decode.call_count
+                self.measure(**extra)
+                self.assertEqual(self.decode.call_count, calls + 1)
+
+    def test_deferred_annotations_and_errors_are_not_cached(self):
+        for extra in [{"annotation": "deferred"}, {"roi": [0.9, 0.9, 0.1, 0.1]}]:
+            with self.subTest(extra=extra):
+                calls = self.decode.call_count
+                first = self.measure(**extra)
+                second = self.measure(**extra)
+                self.assertEqual(self.decode.call_count, calls + 2)
+                self.assertEqual(first[0], second[0])
+
+    def test_least_recently_used_result_is_evicted(self):
+        cache = ResultCache(path=temporary_path(self))
+        cache.store.max_rows = 2
+        keys = [ResultCache.key([name.encode()], {}) for name in ("a", "b", "c")]
+
+        with mock.patch("SharedStore.time.time", side_effect=itertools.count(1000)):
+            cache.put(keys[0], {"width": 1})
+            cache.put(keys[1], {"width": 2})
+            cache.get(keys[0])
+            cache.put(keys[2], {"width": 3})
+
+            self.assertEqual([cache.get(key) for key in keys], [{"width": 1}, None, {"width": 3}])
+
+    def test_keys(self):
+        self.assertIsNone(ResultCache.key([b"image"], None))
+        self.assertNotEqual(ResultCache.key([b"ab", b"c"], {}), ResultCache.key([b"a", b"bc"], {}))
+        self.assertNotEqual(ResultCache.key([b"image"], {"pyramid": False}),
+                            ResultCache.key([b"image"], {"pyramid": True}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import io
+import unittest
+from helpers import REFERENCE, app, client, encode_image, read_image, use_temporary_database
+
+
+class TestUploads(unittest.TestCase):
+
+    def setUp(self):
+        use_temporary_database(self)
+        self.client = client()
+
+    def post_form(self, path, **fields):
+        data = {**{name: str(value) for name, value in REFERENCE.items()}, **fields}
+        data.setdefault("image", (io.BytesIO(read_image("card-usb-1")), "card-usb-1.jpg"))
+        return self.client.post(path, data=data, content_type="multipart/form-data")
+
+    def test_multipart_upload(self):
+        response = self.post_form('/measure2d', annotation="none")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json["width"], response.json["height"]), (4.5, 1.58))
+
+    def test_multipart_front_and_side_upload(self):
+        response = self.client.post('/measure', data={
+            **{name: str(value) for name, value in REFERENCE.items()}, "annotation": "none",
+            "front_image": (io.BytesIO(read_image("card-usb-1")), "front.jpg"),
+            "side_image": (io.BytesIO(read_image("card-usb-2")), "side.jpg"),
+        }, content_type="multipart/form-data")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json["width"], response.json["height"], response.json["depth"]),
+                         (4.66, 1.58, 1.46))
+
+    def test_raw_body_upload(self):
+        response = self.client.post('/measure2d', query_string={**REFERENCE, "annotation": "none"},
+                                    data=read_image("card-usb-1"), content_type="image/jpeg")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json["width"], response.json["height"]), (4.5, 1.58))
+
+    def test_uploads_measure_like_base64(self):
+        response = self.client.post('/measure2d', json={**REFERENCE, "annotation": "none",
+                                                        "image_b64": encode_image("card-usb-1")})
+        self.assertEqual((response.json["width"], response.json["height"]), (4.5, 1.58))
+
+    def test_raw_body_needs_an_image(self):
+        response = self.client.post('/measure2d', query_string=REFERENCE, data=b"", content_type="image/jpeg")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/measure2d', query_string=REFERENCE, data=b"not an image",
+                                    content_type="image/jpeg")
+        self.assertEqual(response.status_code, 400)
+
+    def test_oversized_upload_is_rejected(self):
+        original_limit = app.config["MAX_CONTENT_LENGTH"]
+        app.config["MAX_CONTENT_LENGTH"] = 1024 * 1024
+        self.addCleanup(app.config.__setitem__, "MAX_CONTENT_LENGTH", original_limit)
+        too_large = b"\xff" * (1024 * 1024 + 1)
+
+        response = self.client.post('/measure2d', query_string=REFERENCE, data=too_large,
+                                    content_type="image/jpeg")
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json["error"], "Upload exceeds 1MB.")
+
+        response = self.post_form('/measure2d', image=(io.BytesIO(too_large), "large.jpg"))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json["error"], "Upload exceeds 1MB.")
+
+    def test_malformed_form_values_are_rejected(self):
+        for name, value in [("ref_obj_width_real", "wide"), ("ref_obj_height_real", "nan"),
+                            ("polygons_image", "[[1, 2]"), ("roi", "{"),
+                            ("annotation_quality", "high"), ("annotation_quality", "7.5")]:
+            with self.subTest(name=name, value=value):
+                response = self.post_form('/measure2d', **{name: value})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json["error"], f"Invalid value for {name}.")
+
+    def test_malformed_json_is_rejected(self):
+        response = self.client.post('/measure2d', data=b'{"ref_obj_pos": ', content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json)
+
+        response = self.client.post('/measure', json=[REFERENCE])
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/measure2d', json={**REFERENCE, "ref_obj_width_real": "8.56",
+                                                        "image_b64": "aGVsbG8="})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["error"], "Invalid value for ref_obj_width_real.")
+
+
+if __name__ == '__main__':
+    unittest.main()
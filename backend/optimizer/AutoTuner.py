@@ -0,0 +1,104 @@
+import math
+
+
+class AutoTuner:
+    """Chooses genetic algorithm parameters from the problem size and a target latency."""
+
+    DEFAULT_TARGET_LATENCY = 10.0  # seconds, well inside gunicorn's 30s timeout
+
+    # Seconds per fitness call, measured on a single core: (per-call overhead,
+    # per placed item squared, per container cell, per item and container cell)
+    COST_MODEL = {
+        "ems": (3e-5, 3.5e-6, 0, 0),
+        "continuous": (4e-5, 2e-6, 0, 0),
+        "grid": (1e-4, 4e-6, 1e-8, 0),
+        "batch": (1e-5, 0, 0, 9e-9),
+    }
+
+    MIN_POPULATION, MAX_POPULATION = 8, 120
+    MIN_GENERATIONS, MAX_GENERATIONS = 5, 300
+    # Generations without improvement before the GA stops
+    STAGNATION_LIMIT = 10
+    # Mutation rate reached when the GA is about to stop from stagnation
+    MAX_MUTATION_RATE = 0.7
+
+    def __init__(self, optimizer):
+        self.optimizer = optimizer
+
+    def estimate_fitness_cost(self):
+        """Predict the seconds one fitness call takes for this problem."""
+        container = self.optimizer.container
+        items = self.optimizer.items
+        container_volume = container.w * container.h * container.d
+        items_volume = sum(item.volume for item in items)
+        overhead, per_item_squared, per_cell, per_item_cell = self.COST_MODEL[self.optimizer.engine]
+
+        # Overfull loads are rejected before any placement is attempted
+        if items_volume > container_volume:
+            return overhead
+
+        # Every placement scans the spaces or points left by earlier ones,
+        # or, for the batch engine, every anchor in the container
+        n = len(items)
+        return overhead + per_item_squared * n * n + per_cell * container_volume + \
+            per_item_cell * n * container_volume
+
+    def tune(self, target_latency=None, overrides=None):
+        """
+        Return population size, generations, elitism and mutation schedule for a latency budget.
+
+        overrides holds parameters the client fixed. A fixed population size or
+        generation count leaves the other to fit the budget, and a fixed mutation
+        rate gets a growth that still reaches the maximum; elitism and the
+        predicted runtime follow the final values. Other overrides replace the
+        tuned value as they are.
+        """
+        overrides = overrides or {}
+        if not target_latency:
+            target_latency = self.DEFAULT_TARGET_LATENCY
+        n = len(self.optimizer.items)
+        cost = self.estimate_fitness_cost()
+
+        # What the search space calls for: bigger genomes need wider and longer searches
+        population_size = self._clamp(round(6 * math.sqrt(n)),
+                                      self.MIN_POPULATION, self.MAX_POPULATION)
+        generations = self._clamp(10 + 2 * n, self.MIN_GENERATIONS, self.MAX_GENERATIONS)
+        population_size = overrides.get("population_size", population_size)
+        generations = overrides.get("generations", generations)
+
+        # Shrink what isn't fixed when that exceeds the number of evaluations we can afford
+        budget = target_latency / cost
+        if population_size * generations > budget:
+            if "population_size" not in overrides and "generations" not in overrides:
+                scale = math.sqrt(budget / (population_size * generations))
+                population_size = self._clamp(round(population_size * scale),
+                                              self.MIN_POPULATION, self.MAX_POPULATION)
+            if "population_size" not in overrides and "generations" in overrides:
+                population_size = self._clamp(int(budget // generations),
+                                              self.MIN_POPULATION, self.MAX_POPULATION)
+            if "generations" not in overrides:
+                generations = self._clamp(int(budget // population_size),
+                                          self.MIN_GENERATIONS, self.MAX_GENERATIONS)
+
+        # Long genomes change less per mutation, so they start with a higher rate,
+        # which then climbs to the maximum as the search stagnates
+        mutation_rate = overrides.get("mutation_rate", round(min(0.4, 0.2 + n / 500), 3))
+        mutation_growth = round(max(0.0, self.MAX_MUTATION_RATE - mutation_rate) / self.STAGNATION_LIMIT, 3)
+
+        return {
+            "population_size": population_size,
+            "generations": generations,
+            "elite_count": max(1, population_size // 10),
+            "mutation_rate": mutation_rate,
+            "mutation_growth": mutation_growth,
+            "target_latency": target_latency,
+            "estimated_fitness_cost": cost,
+            # Upper bound: early stopping on stagnation usually ends the run sooner
+            "predicted_runtime": round(population_size * generations * cost, 3),
+            **{key: value for key, value in overrides.items()
+               if key not in ("population_size", "generations", "mutation_rate")},
+        }
+
+    @staticmethod
+    def _clamp(value, low, high):
+        return max(low, min(high, value))
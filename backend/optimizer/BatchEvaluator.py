@@ -0,0 +1,114 @@
+import os
+import numpy as np
+
+
+class BatchEvaluator:
+    """Evaluates a whole population in lockstep on one stacked summed-volume array."""
+
+    # Bytes held per individual and container cell while a chunk is evaluated:
+    # the int32 table and update arrays, a gathered copy of the table and the
+    # int32 box counts for the individuals being checked, and the boolean free mask
+    BYTES_PER_CELL = 4 + 4 + 4 + 4 + 1
+    # Memory a chunk may use, per gunicorn worker; larger populations are
+    # evaluated in chunks that fit
+    MEMORY_BUDGET = int(os.environ.get("BATCH_MEMORY_BUDGET", 64 * 1024 * 1024))
+
+    def __init__(self, w, h, d):
+        self.w, self.h, self.d = w, h, d
+
+    def evaluate(self, population):
+        """Return (utilization, placements, all_placed) for every individual, in order."""
+        cells = (self.w + 1) * (self.h + 1) * (self.d + 1)
+        chunk_size = max(1, self.MEMORY_BUDGET // (cells * self.BYTES_PER_CELL))
+
+        results = []
+        for start in range(0, len(population), chunk_size):
+            results.extend(self._evaluate_chunk(population[start:start + chunk_size]))
+        return results
+
+    def _evaluate_chunk(self, population):
+        w, h, d = self.w, self.h, self.d
+        size = len(population)
+        total_volume = w * h * d
+        length = max((len(individual) for individual in population), default=0)
+
+        # Summed-volume table: table[i, x, y, z] counts occupied cells below (x, y, z),
+        # so the occupancy of any box is an 8-term inclusion-exclusion
+        table = np.zeros((size, w + 1, h + 1, d + 1), dtype=np.int32)
+        update = np.empty_like(table)
+        # Per-axis overlap of each new box with the prefix [0, coordinate)
+        overlap_x = np.zeros((size, w + 1), dtype=np.int32)
+        overlap_y = np.zeros((size, h + 1), dtype=np.int32)
+        overlap_z = np.zeros((size, d + 1), dtype=np.int32)
+        axis_x, axis_y, axis_z = np.arange(w + 1), np.arange(h + 1), np.arange(d + 1)
+
+        placements = [[] for _ in range(size)]
+        placed_volume = [0] * size
+        # Individuals stop at their first unplaceable item, like Optimizer.fitness
+        active = [sum(item.volume for item, _ in individual) <= total_volume
+                  for individual in population]
+
+        for step in range(length):
+            # Individuals placing an item with the same oriented size share one
+            # vectorized fit check over every anchor in the container
+            groups = {}
+            for i, individual in enumerate(population):
+                if active[i] and step < len(individual):
+                    groups.setdefault(individual[step][1], []).append(i)
+            if not groups:
+                break
+
+            overlap_x.fill(0)
+            overlap_y.fill(0)
+            overlap_z.fill(0)
+
+            for (iw, ih, id_), members in groups.items():
+                if iw > w or ih > h or id_ > d:
+                    for i in members:
+                        active[i] = False
+                    continue
+
+                # The whole chunk is a view; a subset is gathered into a copy
+                t = table if len(members) == size else table[members]
+                # Accumulated in place, so no term allocates a temporary
+                counts = np.subtract(t[:, iw:, ih:, id_:], t[:, :w - iw + 1, ih:, id_:])
+                counts -= t[:, iw:, :h - ih + 1, id_:]
+                counts -= t[:, iw:, ih:, :d - id_ + 1]
+                counts += t[:, :w - iw + 1, :h - ih + 1, id_:]
+                counts += t[:, :w - iw + 1, ih:, :d - id_ + 1]
+                counts += t[:, iw:, :h - ih + 1, :d - id_ + 1]
+                counts -= t[:, :w - iw + 1, :h - ih + 1, :d - id_ + 1]
+
+                # First free anchor in x, y, z order (bottom-left-front)
+                free = (counts == 0).reshape(len(members), -1)
+                first = free.argmax(axis=1)
+                found = free[np.arange(len(members)), first]
+                xs, ys, zs = np.unravel_index(first, counts.shape[1:])
+
+                for i, ok, x, y, z in zip(members, found, xs, ys, zs):
+                    if not ok:
+                        active[i] = False
+                        continue
+                    item = population[i][step][0]
+                    x, y, z = int(x), int(y), int(z)
+                    np.clip(axis_x - x, 0, iw, out=overlap_x[i])
+                    np.clip(axis_y - y, 0, ih, out=overlap_y[i])
+                    np.clip(axis_z - z, 0, id_, out=overlap_z[i])
+                    placements[i].append((item.id, x, y, z, iw, ih, id_))
+                    placed_volume[i] += item.volume
+
+            # A placed box adds the product of its per-axis overlaps to the table,
+            # so the whole population is updated in one vectorized pass
+            np.multiply((overlap_x[:, :, None] * overlap_y[:, None, :])[..., None],
+                        overlap_z[:, None, None, :], out=update)
+            table += update
+
+        results = []
+        for i, individual in enumerate(population):
+            utilization = (placed_volume[i] / total_volume) * 100
+            all_placed = active[i] and len(placements[i]) == len(individual)
+            if not all_placed and sum(item.volume for item, _ in individual) > total_volume:
+                results.append((0, [], False))
+            else:
+                results.append((utilization, placements[i], all_placed))
+        return results
@@ -0,0 +1,60 @@
+import json
+import os
+import re
+import tempfile
+import time
+
+
+class CheckpointStore:
+    """Keeps genetic algorithm checkpoints as JSON files on local disk."""
+
+    DEFAULT_DIRECTORY = os.environ.get("CHECKPOINT_DIR", "checkpoints")
+    # Finished checkpoints answer retries of the same job; after this many seconds
+    # without a save they are deleted
+    MAX_AGE = float(os.environ.get("CHECKPOINT_MAX_AGE", 7 * 24 * 3600))
+
+    def __init__(self, directory=None):
+        self.directory = directory or self.DEFAULT_DIRECTORY
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, job_id):
+        # Job ids come from clients, so keep them to a safe file name
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(job_id))[:128]
+        return os.path.join(self.directory, f"{safe_id}.json")
+
+    def save(self, job_id, state):
+        """Write a checkpoint atomically, so a killed worker never leaves a torn file."""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as temp_file:
+                json.dump(state, temp_file)
+            os.replace(temp_path, self.path(job_id))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def load(self, job_id):
+        """Return the saved state for a job, or None if there is no usable checkpoint."""
+        try:
+            with open(self.path(job_id)) as checkpoint_file:
+                return json.load(checkpoint_file)
+        except (OSError, ValueError):
+            return None
+
+    def delete(self, job_id):
+        try:
+            os.remove(self.path(job_id))
+        except OSError:
+            pass
+
+    def prune(self, max_age=None):
+        """Delete checkpoints, and temp files of killed saves, not written for max_age seconds."""
+        cutoff = time.time() - (max_age or self.MAX_AGE)
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith((".json", ".tmp")) and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                # Another worker got there first
+                pass
@@ -1,12 +1,46 @@
+import threading
+from functools import lru_cache
 import numpy as np
 
 
+# Running totals of occupancy buffers allocated in this process
+ALLOCATION_STATS = {"buffers": 0, "bytes": 0}
+
+
+@lru_cache(maxsize=4096)
+def depth_mask(z, d):
+    """Byte range and bit mask covering depth cells [z, z + d) of a bit-packed grid."""
+    first_byte = z // 8
+    last_byte = (z + d - 1) // 8 + 1
+    bits = np.zeros((last_byte - first_byte) * 8, dtype=bool)
+    bits[z - first_byte * 8:z - first_byte * 8 + d] = True
+    mask = np.packbits(bits, bitorder="little")
+    mask.flags.writeable = False
+    return first_byte, last_byte, mask
+
+
 class Container:
-    def __init__(self, w, h, d):
+    def __init__(self, w, h, d, packed=False):
         self.w, self.h, self.d = w, h, d
+        self.packed = packed
         self.placements = []  # Store placed item positions
-        # Using numpy array instead of nested lists for better performance
-        self.space = np.zeros((w, h, d), dtype=np.int8)
+        # Using numpy array instead of nested lists for better performance.
+        # Packed grids hold 8 depth cells per byte instead of one int8 each
+        self.space = self._allocate_space()
+
+    def _allocate_space(self):
+        if self.packed:
+            space = np.zeros((self.w, self.h, (self.d + 7) // 8), dtype=np.uint8)
+        else:
+            space = np.zeros((self.w, self.h, self.d), dtype=np.int8)
+        ALLOCATION_STATS["buffers"] += 1
+        ALLOCATION_STATS["bytes"] += space.nbytes
+        return space
+
+    def reset(self):
+        """Clear all placements so the buffer can be reused without reallocating."""
+        self.space.fill(0)
+        self.placements = []
 
     def fits(self, x, y, z, w, h, d):
         """Check if an item fits at (x, y, z) using array slicing"""
@@ -14,15 +48,66 @@ class Container:
         if x + w > self.w or y + h > self.h or z + d > self.d:
             return False
 
+        if self.packed:
+            first_byte, last_byte, mask = depth_mask(z, d)
+            return not np.any(self.space[x:x+w, y:y+h, first_byte:last_byte] & mask)
+
         # Check if space is already occupied using numpy's any() - much faster than nested loops
         return not np.any(self.space[x:x+w, y:y+h, z:z+d])
 
     def place_item(self, item, x, y, z, w, h, d):
         """Place an item and update space using array slicing"""
-        self.space[x:x+w, y:y+h, z:z+d] = 1
+        if self.packed:
+            first_byte, last_byte, mask = depth_mask(z, d)
+            self.space[x:x+w, y:y+h, first_byte:last_byte] |= mask
+        else:
+            self.space[x:x+w, y:y+h, z:z+d] = 1
         self.placements.append((item.id, x, y, z, w, h, d))
 
     def get_utilization(self):
         total_volume = self.w * self.h * self.d
-        used_volume = np.sum(self.space)
+        if self.packed:
+            # Padding bits past the depth are never set, so they don't inflate the count
+            used_volume = int(np.unpackbits(self.space).sum())
+        else:
+            used_volume = np.sum(self.space)
         return (used_volume / total_volume) * 100
+
+
+class ContainerPool:
+    """Per-process pool of preallocated containers that are reset instead of reallocated."""
+
+    def __init__(self, max_per_shape=4):
+        self.max_per_shape = max_per_shape
+        self._free = {}
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.reused = 0
+
+    def acquire(self, w, h, d, packed=False):
+        """Return an empty container of the given shape, reusing a pooled buffer if possible."""
+        key = (w, h, d, packed)
+        with self._lock:
+            self.acquired += 1
+            free = self._free.get(key)
+            if free:
+                self.reused += 1
+                return free.pop()
+        return Container(w, h, d, packed=packed)
+
+    def release(self, container):
+        """Reset a container and keep it for the next caller."""
+        container.reset()
+        key = (container.w, container.h, container.d, container.packed)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) < self.max_per_shape:
+                free.append(container)
+
+    def clear(self):
+        with self._lock:
+            self._free = {}
+
+
+# Each gunicorn worker is a separate process, so this pool is per worker
+container_pool = ContainerPool()
@@ -0,0 +1,35 @@
+from SpatialIndex import *
+
+
+class ContinuousContainer:
+    """Container that keeps placements as real-valued boxes instead of a voxel grid."""
+
+    def __init__(self, w, h, d, cell_size=None):
+        self.w, self.h, self.d = w, h, d
+        self.placements = []  # Store placed item positions
+        self.used_volume = 0
+
+        # Without a hint, aim for roughly 16 index cells along the longest side
+        if not cell_size:
+            cell_size = max(w, h, d) / 16
+        self.index = SpatialIndex(cell_size)
+
+    def fits(self, x, y, z, w, h, d):
+        """Check if an item fits at (x, y, z) by querying the spatial index"""
+        eps = SpatialIndex.EPSILON
+        # Check boundaries
+        if x < -eps or y < -eps or z < -eps or \
+                x + w > self.w + eps or y + h > self.h + eps or z + d > self.d + eps:
+            return False
+
+        return not self.index.intersects(x, y, z, w, h, d)
+
+    def place_item(self, item, x, y, z, w, h, d):
+        """Place an item and register its box in the spatial index"""
+        self.index.insert(x, y, z, w, h, d)
+        self.placements.append((item.id, x, y, z, w, h, d))
+        self.used_volume += w * h * d
+
+    def get_utilization(self):
+        total_volume = self.w * self.h * self.d
+        return (self.used_volume / total_volume) * 100
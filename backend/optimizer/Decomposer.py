@@ -0,0 +1,202 @@
+import contextlib
+import io
+import math
+import time
+from AutoTuner import *
+from EmptySpaceTracker import *
+from ExactSolver import *
+from Optimizer import *
+import ProcessPool
+
+
+AXES = ("width", "height", "depth")
+
+
+def solve_region(container_data, items_data, engine, config, target_latency):
+    """Solve one region with the regular optimizer; runs in a pool process."""
+    optimizer = Optimizer(container_data, items_data, engine=engine, seed=config.get("seed"))
+    # Region logs would interleave across processes, so keep them quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        if len(items_data) <= ExactSolver.MAX_ITEMS:
+            return ExactSolver(optimizer).solve()
+
+        params = dict(config)
+        if "population_size" not in params or "generations" not in params:
+            params = AutoTuner(optimizer).tune(target_latency, config)
+        return optimizer.genetic_algorithm(
+            params["population_size"], params["generations"],
+            elite_count=params.get("elite_count"),
+            mutation_rate=params.get("mutation_rate", 0.2),
+            mutation_growth=params.get("mutation_growth", 0.05))
+
+
+class Decomposer:
+    """Splits a large load into slabs of the container that are solved independently."""
+
+    # /optimize decomposes loads with at least this many items
+    MIN_ITEMS = 150
+    # Aim for regions small enough that the GA stays fast
+    ITEMS_PER_REGION = 50
+
+    def __init__(self, container_data, items_data, engine="ems", max_workers=None):
+        self.container_data = container_data
+        self.items_data = items_data
+        self.engine = engine
+        self.max_workers = max_workers or ProcessPool.pool_size()
+
+    def plan_regions(self):
+        """Cluster items by size and give each cluster a slab along the longest axis.
+
+        Returns a list of (axis, offset, thickness, item indices).
+        """
+        sizes = [self.container_data[name] for name in AXES]
+        axis = sizes.index(max(sizes))
+        integer = all(isinstance(size, int) for size in sizes)
+
+        dimensions = [sorted((item["dimensions"][name] for name in AXES), reverse=True)
+                      for item in self.items_data]
+        volumes = [math.prod(dims) for dims in dimensions]
+
+        # Similar items pack well together, so sort by size before cutting clusters
+        order = sorted(range(len(self.items_data)), key=lambda i: dimensions[i], reverse=True)
+        cluster_count = max(1, math.ceil(len(order) / self.ITEMS_PER_REGION))
+        cluster_volume = sum(volumes) / cluster_count
+
+        clusters = [[]]
+        filled = 0
+        for index in order:
+            if filled >= cluster_volume * len(clusters) and len(clusters) < cluster_count:
+                clusters.append([])
+            clusters[-1].append(index)
+            filled += volumes[index]
+
+        # Slab thickness follows each cluster's share of the volume, but a slab must
+        # be at least as thick as the smallest side of its largest item
+        length = sizes[axis]
+        shares = [sum(volumes[i] for i in cluster) for cluster in clusters]
+        minimums = [max(dimensions[i][2] for i in cluster) for cluster in clusters]
+        if integer:
+            minimums = [math.ceil(minimum) for minimum in minimums]
+        # Slabs whose share falls short are held at their minimum and the rest of
+        # the length is split again among the others, until no slab is too thin
+        pinned = set()
+        while True:
+            free_length = length - sum(minimums[i] for i in pinned)
+            free_share = sum(share for i, share in enumerate(shares) if i not in pinned)
+            thicknesses = [free_length * share / free_share if i not in pinned and free_share
+                           else minimums[i] for i, share in enumerate(shares)]
+            short = {i for i, t in enumerate(thicknesses) if i not in pinned and t < minimums[i]}
+            if not short:
+                break
+            pinned |= short
+        if integer:
+            thicknesses = [max(1, math.floor(t)) for t in thicknesses]
+
+        regions = []
+        offset = 0
+        for cluster, thickness in zip(clusters, thicknesses):
+            if offset >= length:
+                break
+            thickness = min(thickness, length - offset)
+            regions.append((axis, offset, thickness, cluster))
+            offset += thickness
+        # The last slab takes whatever rounding left over
+        if regions and offset < length:
+            axis, start, thickness, cluster = regions[-1]
+            regions[-1] = (axis, start, length - start, cluster)
+        return regions
+
+    def solve(self, config=None, target_latency=None):
+        """Solve every region in parallel and stitch the placements back together."""
+        start_time = time.time()
+        config = dict(config or {})
+        target_latency = target_latency or AutoTuner.DEFAULT_TARGET_LATENCY
+        regions = self.plan_regions()
+
+        # Regions beyond the worker count queue up, so each gets a share of the budget
+        workers = max(1, min(self.max_workers, len(regions)))
+        region_latency = target_latency / math.ceil(len(regions) / workers)
+
+        jobs = []
+        for axis, offset, thickness, cluster in regions:
+            region_container = dict(self.container_data)
+            region_container[AXES[axis]] = thickness
+            # Region items are identified by their index in the full load
+            region_items = [{"id": index, "dimensions": self.items_data[index]["dimensions"]}
+                            for index in cluster]
+            jobs.append((region_container, region_items, self.engine, config, region_latency))
+
+        if workers == 1:
+            results = [solve_region(*job) for job in jobs]
+        else:
+            results = list(ProcessPool.get_executor().map(solve_region, *zip(*jobs)))
+
+        # Shift each region's placements to its slab
+        placements = []
+        placed = set()
+        region_summaries = []
+        for (axis, offset, thickness, cluster), result in zip(regions, results):
+            for index, x, y, z, w, h, d in result["placements"]:
+                position = [x, y, z]
+                position[axis] += offset
+                placements.append((index, *position, w, h, d))
+                placed.add(index)
+            region_summaries.append({
+                "axis": AXES[axis],
+                "offset": offset,
+                "thickness": thickness,
+                "items": len(cluster),
+                "space_utilization": result["space_utilization"],
+            })
+
+        # Items that didn't fit their slab get a final pass over the whole container
+        leftovers = [index for index in range(len(self.items_data)) if index not in placed]
+        placements += self._place_leftovers(placements, leftovers)
+
+        container = self.container_data
+        total_volume = container["width"] * container["height"] * container["depth"]
+        used_volume = sum(w * h * d for _, _, _, _, w, h, d in placements)
+        utilization = (used_volume / total_volume) * 100
+        all_placed = len(placements) == len(self.items_data)
+
+        print(f"Decomposed {len(self.items_data)} items into {len(regions)} regions, "
+              f"utilization {utilization:.2f}% in {time.time() - start_time:.2f} seconds")
+
+        # Report the client's item ids, not the internal indices
+        placements = [(self.items_data[index].get("id"), *rest) for index, *rest in placements]
+        result = {
+            "status": "success" if all_placed else "failure",
+            "placements": placements,
+            "space_utilization": round(utilization, 2),
+            "regions": region_summaries,
+        }
+        if not all_placed:
+            result["message"] = "Not all items could be placed."
+        return result
+
+    def _place_leftovers(self, placements, leftovers):
+        if not leftovers:
+            return []
+
+        container = self.container_data
+        # Discard thin spaces and tolerate round-off the same way the GA does
+        optimizer = Optimizer(container, self.items_data)
+        spaces = EmptySpaceTracker(container["width"], container["height"], container["depth"],
+                                   optimizer.min_item_dimension, optimizer.epsilon)
+        for _, x, y, z, w, h, d in placements:
+            spaces.place(x, y, z, w, h, d)
+
+        extra = []
+        # Largest first, they are the hardest to fit
+        leftovers = sorted(leftovers, key=lambda index: math.prod(
+            self.items_data[index]["dimensions"][name] for name in AXES), reverse=True)
+        for index in leftovers:
+            dims = self.items_data[index]["dimensions"]
+            item = Item(index, dims["width"], dims["height"], dims["depth"])
+            for w, h, d in item.orientations:
+                position = spaces.find_position(w, h, d)
+                if position is not None:
+                    spaces.place(*position, w, h, d)
+                    extra.append((index, *position, w, h, d))
+                    break
+        return extra
@@ -0,0 +1,97 @@
+class EmptySpaceTracker:
+    """Maintains the list of maximal empty boxes (EMS) left inside a container."""
+
+    # Tolerance for real-valued coordinates, so round-off doesn't reject exact fits
+    EPSILON = 1e-9
+
+    def __init__(self, w, h, d, min_dimension=0, epsilon=EPSILON):
+        self.w, self.h, self.d = w, h, d
+        # Integer problems pass 0, which keeps all comparisons int-to-int
+        self.epsilon = epsilon
+        # Spaces narrower than this on any side can never host an item
+        self.min_dimension = min_dimension
+        # Each space is stored as its two corners (x1, y1, z1, x2, y2, z2)
+        self.spaces = [(0, 0, 0, w, h, d)]
+
+    def copy(self):
+        """Return an independent copy, used when exploring alternative placements."""
+        clone = EmptySpaceTracker.__new__(EmptySpaceTracker)
+        clone.w, clone.h, clone.d = self.w, self.h, self.d
+        clone.min_dimension = self.min_dimension
+        clone.epsilon = self.epsilon
+        clone.spaces = list(self.spaces)
+        return clone
+
+    def find_position(self, w, h, d):
+        """Return the lowest (x, y, z) anchor of a free space that holds a w*h*d box."""
+        # Spaces are kept sorted by their min corner, so the first match is the
+        # bottom-left-front most position, and every anchor is known to be free
+        if self.epsilon:
+            w, h, d = w - self.epsilon, h - self.epsilon, d - self.epsilon
+        for x1, y1, z1, x2, y2, z2 in self.spaces:
+            if x2 - x1 >= w and y2 - y1 >= h and z2 - z1 >= d:
+                return x1, y1, z1
+        return None
+
+    def place(self, x, y, z, w, h, d):
+        """Carve a placed box out of every space it intersects and prune dominated spaces."""
+        eps = self.epsilon
+        bx2, by2, bz2 = x + w, y + h, z + d
+        # Box faces pulled inwards by the tolerance, so touching spaces aren't split,
+        # and pushed outwards, so no sliver spaces are cut off
+        ix1, iy1, iz1 = x + eps, y + eps, z + eps
+        ix2, iy2, iz2 = bx2 - eps, by2 - eps, bz2 - eps
+        ox1, oy1, oz1 = x - eps, y - eps, z - eps
+        ox2, oy2, oz2 = bx2 + eps, by2 + eps, bz2 + eps
+        untouched = []
+        created = []
+
+        for space in self.spaces:
+            x1, y1, z1, x2, y2, z2 = space
+            # Keep spaces that do not overlap the placed box
+            if ix1 >= x2 or ix2 <= x1 or iy1 >= y2 or iy2 <= y1 or iz1 >= z2 or iz2 <= z1:
+                untouched.append(space)
+                continue
+
+            # Split the overlapped space into up to six maximal sub-spaces
+            if ox1 > x1:
+                created.append((x1, y1, z1, x, y2, z2))
+            if ox2 < x2:
+                created.append((bx2, y1, z1, x2, y2, z2))
+            if oy1 > y1:
+                created.append((x1, y1, z1, x2, y, z2))
+            if oy2 < y2:
+                created.append((x1, by2, z1, x2, y2, z2))
+            if oz1 > z1:
+                created.append((x1, y1, z1, x2, y2, z))
+            if oz2 < z2:
+                created.append((x1, y1, bz2, x2, y2, z2))
+
+        # Drop spaces too thin to hold anything
+        min_dim = self.min_dimension - eps
+        created = [s for s in set(created) if
+                   s[3] - s[0] >= min_dim and
+                   s[4] - s[1] >= min_dim and
+                   s[5] - s[2] >= min_dim]
+
+        # Only new spaces can be dominated: untouched ones were already maximal
+        # and every new space lies inside a space that was just removed
+        kept = []
+        for space in created:
+            if not self._is_dominated(space, untouched) and \
+                    not self._is_dominated(space, created):
+                kept.append(space)
+
+        self.spaces = untouched + kept
+        self.spaces.sort()
+
+    @staticmethod
+    def _is_dominated(space, others):
+        x1, y1, z1, x2, y2, z2 = space
+        for other in others:
+            if other is space:
+                continue
+            if other[0] <= x1 and other[1] <= y1 and other[2] <= z1 and \
+                    other[3] >= x2 and other[4] >= y2 and other[5] >= z2:
+                return True
+        return False
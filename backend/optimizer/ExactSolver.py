@@ -0,0 +1,176 @@
+import time
+import numpy as np
+from EmptySpaceTracker import *
+from Metrics import EXACT_NODES
+
+
+class ExactSolver:
+    """Branch-and-bound search over item order and orientation for small loads.
+
+    Items are placed with the same maximal-empty-space rule as the "ems"
+    engine. An item that fits nowhere is skipped, since free space only
+    shrinks and it could never fit later. The search maximizes packed volume.
+    A completed search (search_exhausted) is the best packing over every order
+    and orientation under that placement rule, not over all possible packings.
+    """
+
+    # /optimize routes "ems" loads up to this many items to the exact solver
+    MAX_ITEMS = 9
+    # Safety limits; hitting either returns the best packing found so far, with
+    # search_exhausted false. Loads that don't fit are the slow case, everything else finishes in milliseconds
+    NODE_LIMIT = 200000
+    TIME_LIMIT = 1.0  # seconds
+
+    def __init__(self, optimizer):
+        self.optimizer = optimizer
+        container = optimizer.container
+        self.w, self.h, self.d = container.w, container.h, container.d
+        # Largest items first, so good packings are found early and prune more
+        self.items = sorted(optimizer.items, key=lambda item: item.volume, reverse=True)
+        self.bits = {id(item): 1 << index for index, item in enumerate(self.items)}
+
+    def solve(self):
+        """Return the best packing in the same format as Optimizer.genetic_algorithm."""
+        start_time = time.time()
+        self.deadline = start_time + self.TIME_LIMIT
+        self.nodes = 0
+        self.exhausted = False
+        self.best_volume = -1
+        self.best_placements = []
+        self.total_items_volume = sum(item.volume for item in self.items)
+        total_volume = self.w * self.h * self.d
+        self.total_volume = total_volume
+        # Packed volume of every subset of items, indexed by bit mask
+        self.subset_volumes = [0] * (1 << len(self.items))
+        for mask in range(1, len(self.subset_volumes)):
+            lowest = mask & -mask
+            self.subset_volumes[mask] = self.subset_volumes[mask ^ lowest] + \
+                self.items[lowest.bit_length() - 1].volume
+        self.bounds = {}
+        # Layouts already explored; different orders often build the same one
+        self.visited = set()
+
+        spaces = EmptySpaceTracker(self.w, self.h, self.d,
+                                   self.optimizer.min_item_dimension, self.optimizer.epsilon)
+        self._search(spaces, self.items, 0, [])
+
+        search_exhausted = not self.exhausted
+        EXACT_NODES.inc(self.nodes)
+        all_placed = len(self.best_placements) == len(self.items)
+        utilization = (self.best_volume / total_volume) * 100
+
+        print(f"Exact solver explored {self.nodes} nodes in {time.time() - start_time:.3f} seconds"
+              f" ({'exhausted' if search_exhausted else 'limit reached'})")
+
+        result = {
+            "status": "success" if all_placed else "failure",
+            "placements": self.best_placements,
+            "space_utilization": round(utilization, 2),
+            "solver": "exact",
+            "search_exhausted": search_exhausted,
+        }
+        if not all_placed:
+            result["message"] = "Not all items could be placed."
+        return result
+
+    def _search(self, spaces, remaining, volume, placements):
+        """Depth-first search; returns True once the search must stop."""
+        self.nodes += 1
+        if volume > self.best_volume:
+            self.best_volume = volume
+            self.best_placements = list(placements)
+
+        # Everything placed: nothing can beat this
+        if volume == self.total_items_volume:
+            return True
+        if self.nodes >= self.NODE_LIMIT or time.time() > self.deadline:
+            self.exhausted = True
+            return True
+
+        layout = tuple(sorted(placement[1:] for placement in placements))
+        if layout in self.visited:
+            return False
+        self.visited.add(layout)
+
+        # Free space only shrinks, so an item that fits nowhere now can't be placed
+        # anywhere below this node either; dropping it tightens the bound
+        moves = []
+        for item in remaining:
+            for w, h, d in item.orientations:
+                position = spaces.find_position(w, h, d)
+                if position is not None:
+                    moves.append((item, position, (w, h, d)))
+        remaining = [item for item in remaining if any(move[0] is item for move in moves)]
+
+        # Upper bound: the largest subset of placeable items that fits the free volume
+        if volume + self._bound(remaining, self.total_volume - volume) <= self.best_volume:
+            return False
+        # Tighter but costlier: only space inside a free box that can hold some
+        # remaining item is usable
+        usable_volume = self._usable_volume(spaces, remaining)
+        if volume + self._bound(remaining, usable_volume) <= self.best_volume:
+            return False
+
+        tried = set()
+        for item, (x, y, z), (w, h, d) in moves:
+            # Identical items lead to identical subtrees, so only branch on one of them
+            key = (tuple(sorted(item.orientations[0])), w, h, d)
+            if key in tried:
+                continue
+            tried.add(key)
+
+            child_spaces = spaces.copy()
+            child_spaces.place(x, y, z, w, h, d)
+            placements.append((item.id, x, y, z, w, h, d))
+            rest = [other for other in remaining if other is not item]
+            stop = self._search(child_spaces, rest, volume + item.volume, placements)
+            placements.pop()
+            if stop:
+                return True
+
+            if volume + self._bound(remaining, usable_volume) <= self.best_volume:
+                return False
+
+        return False
+
+    def _bound(self, remaining, capacity):
+        """Largest total volume of remaining items that fits in the given capacity."""
+        mask = 0
+        for item in remaining:
+            mask |= self.bits[id(item)]
+        key = (mask, capacity)
+        if key not in self.bounds:
+            capacity += self.optimizer.epsilon
+            best = 0
+            # Walk every subset of the remaining items
+            subset = mask
+            while subset:
+                subset_volume = self.subset_volumes[subset]
+                if best < subset_volume <= capacity:
+                    best = subset_volume
+                subset = (subset - 1) & mask
+            self.bounds[key] = best
+        return self.bounds[key]
+
+    @staticmethod
+    def _usable_volume(spaces, remaining):
+        """Volume of the union of free spaces that can hold at least one remaining item."""
+        usable = []
+        for space in spaces.spaces:
+            x1, y1, z1, x2, y2, z2 = space
+            if any(x2 - x1 >= w and y2 - y1 >= h and z2 - z1 >= d
+                   for item in remaining for w, h, d in item.orientations):
+                usable.append(space)
+        if not usable:
+            return 0
+
+        # Spaces overlap, so measure their union on a grid compressed to their edges
+        boxes = np.array(usable, dtype=float)
+        edges = [np.unique(boxes[:, [axis, axis + 3]]) for axis in range(3)]
+        covered = np.zeros([len(edge) - 1 for edge in edges], dtype=bool)
+        for box in boxes:
+            covered[tuple(slice(np.searchsorted(edges[axis], box[axis]),
+                                np.searchsorted(edges[axis], box[axis + 3]))
+                          for axis in range(3))] = True
+        cell_sizes = [np.diff(edge) for edge in edges]
+        return float(np.einsum("ijk,i,j,k->", covered, *cell_sizes))
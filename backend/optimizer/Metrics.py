@@ -0,0 +1,30 @@
+from prometheus_client import Counter, Histogram
+from service_common.metrics import RequestMetrics
+
+
+# Request timings; GA runs can take most of gunicorn's 30s timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+# Request latency, counts, sizes and admission control, with the /metrics endpoint
+REQUEST_METRICS = RequestMetrics("optimizer", LATENCY_BUCKETS)
+init_app = REQUEST_METRICS.init_app
+
+# Domain metrics
+GENERATIONS = Counter("optimizer_generations_total", "Genetic algorithm generations run", ["engine"])
+FITNESS_EVALUATIONS = Counter("optimizer_fitness_evaluations_total", "Packing fitness evaluations",
+                              ["engine"])
+EXACT_NODES = Counter("optimizer_exact_nodes_total", "Search nodes explored by the exact solver")
+SOLVES = Counter("optimizer_solves_total", "Optimization results by solver and status",
+                 ["solver", "status"])
+ITEMS = Histogram("optimizer_items_per_request", "Items in each optimization request",
+                  buckets=(1, 5, 10, 25, 50, 100, 150, 250, 500, 1000, 2500))
+UTILIZATION = Histogram("optimizer_space_utilization_percent", "Space utilization of results",
+                        buckets=tuple(range(10, 101, 10)))
+
+
+def record_result(solver, items, result):
+    """Count one optimization result."""
+    SOLVES.labels(solver, result.get("status", "error")).inc()
+    ITEMS.observe(items)
+    if "space_utilization" in result:
+        UTILIZATION.observe(result["space_utilization"])
@@ -1,45 +1,98 @@
+import hashlib
+import json
 import random
 import time
 from Container import *
 from Item import *
+from BatchEvaluator import *
+from ContinuousContainer import *
+from EmptySpaceTracker import *
+from Metrics import FITNESS_EVALUATIONS, GENERATIONS
 
 
 class Optimizer:
-    def __init__(self, container_data, items_data):
-        # Convert to Container and Item objects
-        w, h, d = container_data["width"], container_data["height"], container_data["depth"]
-        self.container = Container(w, h, d)
+    # Placement engines: "ems" draws anchors from maximal empty spaces,
+    # "grid" probes adjacent points against the voxel occupancy grid and
+    # "continuous" probes them against a spatial index of real-valued boxes and
+    # "batch" evaluates the whole population at once on stacked voxel grids
+    ENGINES = ("ems", "grid", "continuous", "batch")
+    # Grids at least this large are bit-packed by default. Packed probes are
+    # slightly slower, so small grids keep one int8 per cell
+    PACKED_GRID_MIN_CELLS = 1 << 22
+
+    def __init__(self, container_data, items_data, engine="ems", packed_grid=None, seed=None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {self.ENGINES}")
+        self.engine = engine
+        # Private generator, so a run's random state can be checkpointed and restored
+        self.random = random.Random(seed)
 
+        # Convert to Container and Item objects
         self.items = []
         for item_data in items_data:
             item_id = item_data.get("id")
             w, h, d = item_data["dimensions"]["width"], item_data["dimensions"]["height"], item_data["dimensions"]["depth"]
 
             self.items.append(Item(item_id, w, h, d))
-        
-    def initialize_population(self, size, items):
-        """Generate an initial population of random solutions with smarter initialization."""
-        population = []
+
+        # Smallest side of any item, free spaces thinner than this are discarded
+        self.min_item_dimension = min(
+            (min(item.orientations[0]) for item in self.items), default=0)
+
+        w, h, d = container_data["width"], container_data["height"], container_data["depth"]
+        # Real-valued dimensions need a round-off tolerance in the free-space checks
+        all_integer = all(isinstance(value, int) for value in (w, h, d)) and \
+            all(isinstance(value, int) for item in self.items for value in item.orientations[0])
+        self.epsilon = 0 if all_integer else EmptySpaceTracker.EPSILON
+
+        if packed_grid is None:
+            packed_grid = w * h * d >= self.PACKED_GRID_MIN_CELLS
+        # Bit-packed grids use one bit per cell instead of one int8
+        self.packed_grid = packed_grid
+
+        if engine == "grid":
+            self.container = Container(w, h, d, packed=packed_grid)
+        else:
+            # Resolution-free engines never touch a voxel grid, so don't allocate one.
+            # Index cells sized like an average item keep few boxes per cell
+            cell_size = sum(max(item.orientations[0]) for item in self.items) / max(1, len(self.items))
+            self.container = ContinuousContainer(w, h, d, cell_size=cell_size)
+
+    def initialize_population(self, size, items, random_share=0.3, sorted_share=0.7, seeds=None):
+        """Generate an initial population of random solutions with smarter initialization.
+
+        random_share of the individuals are fully random permutations; of the
+        rest, sorted_share are sorted by volume and the others lightly shuffled.
+        Seed arrangements, such as a similar past solution, are kept as-is
+        along with mutated copies filling up to a quarter of the population.
+        """
+        population = [list(seed) for seed in (seeds or [])][:size]
+        if population:
+            originals = list(population)
+            while len(population) < max(len(originals), size // 4):
+                variant = list(originals[len(population) % len(originals)])
+                population.append(self.mutate(variant) if len(variant) > 1 else variant)
 
         # Sort items by volume for better initial packing (largest first)
         sorted_items = sorted(
             items, key=lambda item: item.volume, reverse=True)
 
-        for _ in range(size):
+        for _ in range(size - len(population)):
             # Create different permutations - some ordered by size, some random
-            if random.random() < 0.3:  # 30% completely random
-                random.shuffle(items)
-                item_list = items
-            elif random.random() < 0.7:  # 40% sorted by volume
+            if self.random.random() < random_share:  # 30% completely random by default
+                # Shuffle a copy so the caller's item order stays stable
+                item_list = items.copy()
+                self.random.shuffle(item_list)
+            elif self.random.random() < sorted_share:  # 49% sorted by volume by default
                 item_list = sorted_items.copy()
-            else:  # 30% slightly shuffled sorted
+            else:  # 21% slightly shuffled sorted by default
                 item_list = sorted_items.copy()
                 # Swap a few items to introduce variety
                 for _ in range(len(item_list) // 3):
-                    i, j = random.sample(range(len(item_list)), 2)
+                    i, j = self.random.sample(range(len(item_list)), 2)
                     item_list[i], item_list[j] = item_list[j], item_list[i]
 
-            orientations = [random.choice(item.orientations)
+            orientations = [self.random.choice(item.orientations)
                             for item in item_list]
             population.append(list(zip(item_list, orientations)))
 
@@ -47,9 +100,57 @@ class Optimizer:
 
     def fitness(self, container, arrangement):
         """Evaluate the fitness of a packing arrangement with early stopping."""
+        if self.engine == "ems":
+            return self.fitness_ems(container, arrangement)
+        if self.engine == "continuous":
+            return self.fitness_continuous(container, arrangement)
+        if self.engine == "batch":
+            return BatchEvaluator(container.w, container.h, container.d).evaluate([arrangement])[0]
+        return self.fitness_grid(container, arrangement)
+
+    def evaluate_population(self, population):
+        """Return the fitness of every individual, batching them when the engine supports it."""
+        FITNESS_EVALUATIONS.labels(self.engine).inc(len(population))
+        if self.engine == "batch":
+            container = self.container
+            return BatchEvaluator(container.w, container.h, container.d).evaluate(population)
+        return [self.fitness(self.container, individual) for individual in population]
+
+    def fitness_ems(self, container, arrangement):
+        """Place items at the lowest free anchor taken from the maximal empty spaces."""
+        all_placed = False
+        total_volume = container.w * container.h * container.d
+        total_items_volume = sum(item.volume for item, _ in arrangement)
+
+        # If total items volume is too large, fail early
+        if total_items_volume > total_volume:
+            return 0, [], all_placed
+
+        spaces = EmptySpaceTracker(
+            container.w, container.h, container.d, self.min_item_dimension, self.epsilon)
+        placements = []
+        total_placed_volume = 0
+
+        for item, (w, h, d) in arrangement:
+            # Any box that fits somewhere lies inside some maximal space,
+            # so an empty result means the item cannot be placed at all
+            position = spaces.find_position(w, h, d)
+            if position is None:
+                utilization = (total_placed_volume / total_volume) * 100
+                return utilization, placements, all_placed
 
+            x, y, z = position
+            spaces.place(x, y, z, w, h, d)
+            placements.append((item.id, x, y, z, w, h, d))
+            total_placed_volume += item.volume
+
+        all_placed = True
+        utilization = (total_placed_volume / total_volume) * 100
+        return utilization, placements, all_placed
+
+    def fitness_continuous(self, container, arrangement):
+        """Place items at adjacent points, checking overlaps through a spatial index."""
         all_placed = False
-        temp_container = Container(container.w, container.h, container.d)
         total_volume = container.w * container.h * container.d
         total_items_volume = sum(item.volume for item, _ in arrangement)
 
@@ -57,6 +158,57 @@ class Optimizer:
         if total_items_volume > total_volume:
             return 0, [], all_placed
 
+        temp_container = ContinuousContainer(
+            container.w, container.h, container.d, cell_size=container.index.cell_size)
+        placements = []
+        total_placed_volume = 0
+        # Extreme points: the origin plus the right, back and top corner of each placement
+        candidates = {(0, 0, 0)}
+
+        for item, (w, h, d) in arrangement:
+            position = None
+            # Lowest coordinates first (bottom-left-front strategy)
+            for x, y, z in sorted(candidates):
+                if temp_container.fits(x, y, z, w, h, d):
+                    position = (x, y, z)
+                    break
+
+            # There is no finite set of positions to scan, so the item is unplaceable
+            if position is None:
+                utilization = (total_placed_volume / total_volume) * 100
+                return utilization, placements, all_placed
+
+            x, y, z = position
+            temp_container.place_item(item, x, y, z, w, h, d)
+            placements.append((item.id, x, y, z, w, h, d))
+            total_placed_volume += item.volume
+            candidates.discard(position)
+            candidates.update([(x + w, y, z), (x, y + h, z), (x, y, z + d)])
+
+        all_placed = True
+        utilization = (total_placed_volume / total_volume) * 100
+        return utilization, placements, all_placed
+
+    def fitness_grid(self, container, arrangement):
+        """Place items by probing adjacent points against a voxel occupancy grid."""
+        total_volume = container.w * container.h * container.d
+        total_items_volume = sum(item.volume for item, _ in arrangement)
+
+        # If total items volume is too large, fail early
+        if total_items_volume > total_volume:
+            return 0, [], False
+
+        # Borrow a zeroed grid from the worker's pool instead of allocating one per call
+        temp_container = container_pool.acquire(
+            container.w, container.h, container.d, packed=self.packed_grid)
+        try:
+            return self._fill_grid(temp_container, container, arrangement)
+        finally:
+            container_pool.release(temp_container)
+
+    def _fill_grid(self, temp_container, container, arrangement):
+        all_placed = False
+        total_volume = container.w * container.h * container.d
         placements = []
         total_placed_volume = 0
 
@@ -142,7 +294,7 @@ class Optimizer:
         """Select parents using tournament selection."""
         selected = []
         for _ in range(2):
-            tournament = random.sample(evaluated_population, tournament_size)
+            tournament = self.random.sample(evaluated_population, tournament_size)
             winner = max(tournament, key=lambda x: x[0][0])
             selected.append(winner[1])
         return selected
@@ -150,8 +302,8 @@ class Optimizer:
     def crossover(self, parent1, parent2):
         """Perform order-based crossover between two parents."""
         # Choose a random segment to preserve from parent1
-        start = random.randint(0, len(parent1) - 1)
-        end = random.randint(start + 1, len(parent1))
+        start = self.random.randint(0, len(parent1) - 1)
+        end = self.random.randint(start + 1, len(parent1))
 
         # Create a mapping of items from parent2 to their indices
         parent2_items = {item[0].id: i for i, item in enumerate(parent2)}
@@ -170,19 +322,19 @@ class Optimizer:
 
     def mutate(self, arrangement):
         """Apply multiple types of mutations."""
-        if random.random() < 0.3:  # Swap mutation
-            i, j = random.sample(range(len(arrangement)), 2)
+        if self.random.random() < 0.3:  # Swap mutation
+            i, j = self.random.sample(range(len(arrangement)), 2)
             arrangement[i], arrangement[j] = arrangement[j], arrangement[i]
 
-        if random.random() < 0.3:  # Orientation mutation
-            i = random.randint(0, len(arrangement) - 1)
+        if self.random.random() < 0.3:  # Orientation mutation
+            i = self.random.randint(0, len(arrangement) - 1)
             item, _ = arrangement[i]
-            arrangement[i] = (item, random.choice(item.orientations))
+            arrangement[i] = (item, self.random.choice(item.orientations))
 
-        if random.random() < 0.2:  # Rotation mutation - rotate a random segment
+        if self.random.random() < 0.2:  # Rotation mutation - rotate a random segment
             if len(arrangement) > 3:
-                start = random.randint(0, len(arrangement) - 3)
-                end = random.randint(
+                start = self.random.randint(0, len(arrangement) - 3)
+                end = self.random.randint(
                     start + 2, min(len(arrangement), start + 5))
                 segment = arrangement[start:end]
                 segment.reverse()
@@ -190,29 +342,108 @@ class Optimizer:
 
         return arrangement
 
-    def genetic_algorithm(self, population_size, generations):
-        """Run the genetic algorithm with early stopping and adaptive parameters."""
+    def problem_key(self):
+        """Fingerprint of the problem, so a checkpoint is never applied to a different one."""
+        problem = {
+            "engine": self.engine,
+            "container": [self.container.w, self.container.h, self.container.d],
+            "items": [[item.id, sorted(item.orientations[0])] for item in self.items],
+        }
+        return hashlib.sha1(json.dumps(problem, sort_keys=True).encode()).hexdigest()
+
+    def encode_arrangement(self, arrangement):
+        """Convert a genome to JSON-friendly (item index, orientation) pairs."""
+        indices = {id(item): index for index, item in enumerate(self.items)}
+        return [[indices[id(item)], list(orientation)] for item, orientation in arrangement]
+
+    def decode_arrangement(self, encoded):
+        return [(self.items[index], tuple(orientation)) for index, orientation in encoded]
+
+    def genetic_algorithm(self, population_size, generations, elite_count=None,
+                          mutation_rate=0.2, mutation_growth=0.05,
+                          checkpoint_store=None, job_id=None, checkpoint_interval=5,
+                          random_share=0.3, sorted_share=0.7, deadline=None, progress_callback=None,
+                          seed_arrangements=None):
+        """Run the genetic algorithm with early stopping and adaptive parameters.
+
+        With a checkpoint store and job id, the run state is saved every
+        checkpoint_interval generations and an existing checkpoint is resumed.
+        The run also stops at the deadline (a time.time() value), or when
+        progress_callback(generation, best_utilization, best_all_placed) returns True.
+        Seed arrangements warm-start the initial population.
+        """
         start_time = time.time()
-
-        population = self.initialize_population(population_size, self.items)
-        best_solution = None
-        best_utilization = 0
-        best_placements = []
-        best_all_placed = False
-
-        # Track progress to detect stagnation
-        stagnation_counter = 0
-        last_best = 0
+        checkpointing = checkpoint_store is not None and job_id is not None
+
+        state = checkpoint_store.load(job_id) if checkpointing else None
+        if state and state.get("problem_key") != self.problem_key():
+            print(f"Ignoring checkpoint for job {job_id}: it belongs to a different problem")
+            state = None
+
+        if state:
+            # A finished run already covers these generations, or can't improve further.
+            # It may have stopped early, so compare with the count it was asked for
+            if state["finished"] and (generations <= state["requested_generations"] or
+                                      state["best_utilization"] > 99.9):
+                print(f"Job {job_id} already finished at generation {state['generation']}")
+                return dict(state["result"], resumed_from_generation=state["generation"])
+
+            start_gen = state["generation"]
+            population = [self.decode_arrangement(encoded) for encoded in state["population"]]
+            best_solution = self.decode_arrangement(state["best_solution"]) if state["best_solution"] else None
+            best_utilization = state["best_utilization"]
+            best_placements = [tuple(placement) for placement in state["best_placements"]]
+            best_all_placed = state["best_all_placed"]
+            # Continuing a finished run means the client asked for more search
+            stagnation_counter = 0 if state["finished"] else state["stagnation_counter"]
+            last_best = state["last_best"]
+            version, internal_state, gauss_next = state["rng_state"]
+            self.random.setstate((version, tuple(internal_state), gauss_next))
+            start_time -= state["elapsed"]
+            print(f"Resuming job {job_id} from generation {start_gen}")
+        else:
+            start_gen = 0
+            population = self.initialize_population(
+                population_size, self.items, random_share, sorted_share, seed_arrangements)
+            best_solution = None
+            best_utilization = 0
+            best_placements = []
+            best_all_placed = False
+
+            # Track progress to detect stagnation
+            stagnation_counter = 0
+            last_best = 0
+
+        def save_checkpoint(generation, finished=False, result=None):
+            checkpoint_store.save(job_id, {
+                "problem_key": self.problem_key(),
+                "generation": generation,
+                "requested_generations": generations,
+                "finished": finished,
+                "result": result,
+                "population": [self.encode_arrangement(individual) for individual in population],
+                "best_solution": self.encode_arrangement(best_solution) if best_solution else None,
+                "best_utilization": best_utilization,
+                "best_placements": best_placements,
+                "best_all_placed": best_all_placed,
+                "stagnation_counter": stagnation_counter,
+                "last_best": last_best,
+                "rng_state": self.random.getstate(),
+                "elapsed": time.time() - start_time,
+            })
 
         # Store all results for statistical analysis
         all_results = []
+        completed_generations = start_gen
+
+        for gen in range(start_gen, generations):
+            completed_generations = gen + 1
+            GENERATIONS.labels(self.engine).inc()
 
-        for gen in range(generations):
             # Evaluate population in parallel if possible
             evaluated_population = []
-            for individual in population:
-                fitness_value, placement, all_placed = self.fitness(
-                    self.container, individual)
+            fitness_results = self.evaluate_population(population)
+            for individual, (fitness_value, placement, all_placed) in zip(population, fitness_results):
                 evaluated_population.append(
                     ((fitness_value, placement, all_placed), individual))
 
@@ -249,7 +480,8 @@ class Optimizer:
                 break
 
             # Elitism - keep top solutions
-            elite_count = max(1, population_size // 10)
+            if not elite_count:
+                elite_count = max(1, population_size // 10)
             new_population = [individual for _,
                               individual in evaluated_population[:elite_count]]
 
@@ -260,42 +492,59 @@ class Optimizer:
                     evaluated_population, tournament_size=3)
 
                 # Crossover
-                if random.random() < 0.7:  # 70% chance of crossover
+                if self.random.random() < 0.7:  # 70% chance of crossover
                     child = self.crossover(parent1, parent2)
                 else:
-                    child = random.choice([parent1, parent2])
+                    child = self.random.choice([parent1, parent2])
 
                 # Mutation (adaptive rate)
                 # Increase mutation as stagnation increases
-                mutation_rate = 0.2 + (stagnation_counter / 20)
-                if random.random() < mutation_rate:
+                if self.random.random() < mutation_rate + stagnation_counter * mutation_growth:
                     child = self.mutate(child)
 
                 new_population.append(child)
 
             population = new_population
 
+            if checkpointing and completed_generations % checkpoint_interval == 0:
+                save_checkpoint(completed_generations)
+
             # Optionally print progress
             if gen % 5 == 0:
                 elapsed = time.time() - start_time
                 print(
                     f"Generation {gen}, Best: {best_utilization:.2f}%, Time: {elapsed:.2f}s")
 
+            # Stop when the caller's time budget runs out or it asks us to
+            if deadline and time.time() >= deadline:
+                print(f"Stopping at generation {gen}: deadline reached")
+                break
+            if progress_callback and progress_callback(gen, best_utilization, best_all_placed):
+                print(f"Stopping at generation {gen}: stopped by caller")
+                break
+
         # Calculate final statistics
         print("\nOptimization completed:")
         print(f"Best utilization: {best_utilization:.2f}%")
         print(f"Time taken: {time.time() - start_time:.2f} seconds")
 
         if best_solution and best_all_placed:
-            return {
+            result = {
                 "status": "success",
                 "placements": best_placements,
                 "space_utilization": round(best_utilization, 2)
             }
         else:
-            return {
+            result = {
                 "status": "failure",
                 "placements": best_placements,
                 "space_utilization": round(best_utilization, 2),
                 "message": "Not all items could be placed."
             }
+
+        if checkpointing:
+            save_checkpoint(completed_generations, finished=True, result=result)
+            if state:
+                result["resumed_from_generation"] = start_gen
+
+        return result
@@ -0,0 +1,175 @@
+import contextlib
+import io
+import math
+import time
+from concurrent.futures import wait
+from AutoTuner import *
+from Optimizer import *
+import ProcessPool
+
+
+def run_configuration(container_data, items_data, engine, configuration, seed,
+                      latency, deadline, target_utilization, signal):
+    """Run one portfolio configuration; runs in a pool process."""
+    start_time = time.time()
+    optimizer = Optimizer(container_data, items_data, engine=engine, seed=seed)
+    params = AutoTuner(optimizer).tune(latency, configuration)
+
+    # The best utilization of the whole portfolio, shared with the other runs
+    signals = ProcessPool.signals
+
+    def share_progress(generation, best_utilization, best_all_placed):
+        with signals.get_lock():
+            if best_utilization > signals[signal]:
+                signals[signal] = best_utilization
+            # Once any configuration packs everything, nobody can do better. The
+            # portfolio also stops its stragglers by setting this to infinity
+            return signals[signal] >= target_utilization
+
+    # Portfolio logs would interleave across processes, so keep them quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = optimizer.genetic_algorithm(
+            params["population_size"], params["generations"],
+            elite_count=params.get("elite_count"),
+            mutation_rate=params.get("mutation_rate", 0.2),
+            mutation_growth=params.get("mutation_growth", 0.05),
+            random_share=params.get("random_share", 0.3),
+            sorted_share=params.get("sorted_share", 0.7),
+            deadline=min(deadline, start_time + latency),
+            progress_callback=share_progress)
+    result["runtime"] = round(time.time() - start_time, 3)
+    return result
+
+
+class PortfolioError(Exception):
+    """No configuration finished; status is 400 when every one rejected its parameters."""
+
+    def __init__(self, message, status, configurations):
+        super().__init__(message)
+        self.status = status
+        self.configurations = configurations
+
+
+class Portfolio:
+    """Races several genetic algorithm configurations and keeps the best result."""
+
+    # Each entry overrides the auto-tuned parameters; every configuration also
+    # gets its own seed, so repeating one explores a different part of the search
+    DEFAULT_CONFIGURATIONS = [
+        {"name": "default"},
+        {"name": "sorted-heavy", "random_share": 0.1, "sorted_share": 0.9},
+        {"name": "random-heavy", "random_share": 0.8, "sorted_share": 0.5},
+        {"name": "high-mutation", "mutation_rate": 0.5, "mutation_growth": 0.02},
+    ]
+
+    # Time allowed past the deadline for workers to finish their last generation
+    GRACE_PERIOD = 2.0  # seconds
+
+    def __init__(self, container_data, items_data, engine="ems", configurations=None,
+                 max_workers=None, seed=None):
+        self.container_data = container_data
+        self.items_data = items_data
+        self.engine = engine
+        self.configurations = configurations or self.DEFAULT_CONFIGURATIONS
+        self.max_workers = max_workers or ProcessPool.pool_size()
+        self.seed = seed
+
+    def solve(self, target_latency=None):
+        """
+        Run every configuration until the deadline and return the best result.
+        Raises PortfolioError if none finished.
+        """
+        start_time = time.time()
+        target_latency = target_latency or AutoTuner.DEFAULT_TARGET_LATENCY
+        deadline = start_time + target_latency
+
+        # Configurations beyond the worker count queue up, so each gets a share of the budget
+        workers = max(1, min(self.max_workers, len(self.configurations)))
+        latency = target_latency / math.ceil(len(self.configurations) / workers)
+
+        container = self.container_data
+        container_volume = container["width"] * container["height"] * container["depth"]
+        items_volume = sum(item["dimensions"]["width"] * item["dimensions"]["height"] *
+                           item["dimensions"]["depth"] for item in self.items_data)
+        target_utilization = (items_volume / container_volume) * 100 - 1e-6
+
+        jobs = []
+        for index, configuration in enumerate(self.configurations):
+            params = {key: value for key, value in configuration.items() if key != "name"}
+            seed = None if self.seed is None else self.seed + index
+            jobs.append((self.container_data, self.items_data, self.engine, params, seed,
+                         latency, deadline, target_utilization))
+
+        # Each result is the run's result, the exception it raised, or None if it didn't finish
+        signal = ProcessPool.acquire_signal()
+        if workers == 1:
+            results = []
+            try:
+                for job in jobs:
+                    try:
+                        results.append(run_configuration(*job, signal))
+                    except Exception as e:
+                        results.append(e)
+            finally:
+                ProcessPool.release_signal(signal)
+        else:
+            executor = ProcessPool.get_executor()
+            futures = [executor.submit(run_configuration, *job, signal) for job in jobs]
+            wait(futures, timeout=deadline - time.time() + self.GRACE_PERIOD)
+            results = [None if not future.done() or future.cancelled() else
+                       future.exception() or future.result() for future in futures]
+            # Don't hold up the response for stragglers: queued runs are cancelled and
+            # running ones stop after their current generation, freeing the pool
+            ProcessPool.signals[signal] = math.inf
+            for future in futures:
+                future.cancel()
+            ProcessPool.release_signal(signal, futures)
+
+        summaries = []
+        winner = None
+        for index, (configuration, result) in enumerate(zip(self.configurations, results)):
+            name = configuration.get("name", f"configuration-{index}")
+            if result is None:
+                summaries.append({"name": name, "status": "timeout"})
+                continue
+            if isinstance(result, Exception):
+                summaries.append({"name": name, "status": "error",
+                                  "message": str(result) or type(result).__name__})
+                continue
+            summaries.append({
+                "name": name,
+                "status": result["status"],
+                "space_utilization": result["space_utilization"],
+                "runtime": result.pop("runtime"),
+            })
+            # Earlier configurations win ties, so the defaults stay the reference
+            if winner is None or self._score(result) > self._score(results[winner]):
+                winner = index
+
+        if winner is None:
+            errors = [summary for summary in summaries if summary["status"] == "error"]
+            if not errors:
+                raise PortfolioError("No configuration finished before the deadline", 500, summaries)
+            # Parameters of the wrong type or range fail as TypeError or ValueError
+            bad_input = len(errors) == len(summaries) and \
+                all(isinstance(result, (TypeError, ValueError)) for result in results)
+            raise PortfolioError("No configuration finished: " + "; ".join(
+                f"{summary['name']}: {summary['message']}" for summary in errors),
+                400 if bad_input else 500, summaries)
+
+        winning_name = summaries[winner]["name"]
+        print(f"Portfolio of {len(self.configurations)} configurations won by {winning_name}, "
+              f"utilization {results[winner]['space_utilization']:.2f}% "
+              f"in {time.time() - start_time:.2f} seconds")
+
+        result = dict(results[winner])
+        result["portfolio"] = {
+            "winner": winning_name,
+            "winning_configuration": dict(self.configurations[winner]),
+            "configurations": summaries,
+        }
+        return result
+
+    @staticmethod
+    def _score(result):
+        return (result["status"] == "success", result["space_utilization"])
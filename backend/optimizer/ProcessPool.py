@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from service_common.workers import worker_count
+
+
+def pool_size():
+    """Solver processes per gunicorn worker, so the workers together use about one per core."""
+    if os.environ.get("SOLVER_PROCESSES"):
+        return int(os.environ["SOLVER_PROCESSES"])
+    return max(1, (os.cpu_count() or 1) // worker_count())
+
+
+# Stop signals for work racing in the pool, such as portfolio runs. Each slot holds
+# the best utilization found so far; infinity tells the remaining runs to stop
+SIGNAL_SLOTS = 32
+# Seconds a request waits for a free stop signal before it is turned away
+SIGNAL_TIMEOUT = float(os.environ.get("SIGNAL_TIMEOUT", 5))
+signals = None
+
+_lock = threading.Lock()
+_executor = None
+_free_signals = []
+_signals_available = threading.Semaphore(SIGNAL_SLOTS)
+
+
+def _context():
+    # gunicorn workers run request threads, and a process forked from them can
+    # inherit a lock some other thread held; the fork server starts clean ones
+    return multiprocessing.get_context("forkserver")
+
+
+def _init_worker(shared_signals):
+    global signals
+    signals = shared_signals
+
+
+def _create_signals():
+    global signals
+    if signals is None:
+        signals = _context().Array("d", SIGNAL_SLOTS)
+        _free_signals.extend(range(SIGNAL_SLOTS))
+
+
+def get_executor():
+    """
+    The worker's process pool of pool_size() processes, shared by every request.
+    It is started on first use, so preloading the app doesn't create it in the
+    gunicorn master and each worker gets its own.
+    """
+    global _executor
+    with _lock:
+        _create_signals()
+        # A pool whose process died (killed for memory, say) fails every later
+        # submission, so it is replaced
+        if _executor is None or _executor._broken:
+            _executor = ProcessPoolExecutor(max_workers=pool_size(), mp_context=_context(),
+                                            initializer=_init_worker, initargs=(signals,))
+        return _executor
+
+
+class SignalsBusy(Exception):
+    """Every stop signal stayed in use for the whole timeout."""
+
+
+def acquire_signal(timeout=None):
+    """
+    Reserve a stop signal, reset to 0, waiting up to timeout seconds
+    (SIGNAL_TIMEOUT by default) if every slot is in use; raises SignalsBusy
+    if none frees up in time.
+    """
+    if not _signals_available.acquire(timeout=SIGNAL_TIMEOUT if timeout is None else timeout):
+        raise SignalsBusy("Every stop signal is in use")
+    with _lock:
+        _create_signals()
+        index = _free_signals.pop()
+    signals[index] = 0.0
+    return index
+
+
+def release_signal(index, futures=()):
+    """Free a stop signal once every future using it has finished or been cancelled."""
+    remaining = [len(futures)]
+
+    def release(_=None):
+        with _lock:
+            remaining[0] -= 1
+            if remaining[0] > 0:
+                return
+            _free_signals.append(index)
+        _signals_available.release()
+
+    if not futures:
+        remaining[0] = 1
+        release()
+    for future in futures:
+        future.add_done_callback(release)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+def dimension_key(w, h, d):
+    """Orientation-free key of a box, so rotated copies of a SKU match."""
+    return tuple(sorted(round(value, 6) for value in (w, h, d)))
+
+
+class SolutionStore:
+    """Keeps past problems and their best arrangements in a local SQLite database.
+
+    Problems are indexed by container dimensions and a histogram of item
+    dimensions, so a new load can be seeded with the arrangement of the most
+    similar load solved before.
+    """
+
+    DEFAULT_PATH = os.environ.get("SOLUTION_DB", "solutions.sqlite3")
+    # Loads further apart than this share too little to be worth seeding from
+    MAX_DISTANCE = 0.5
+    # Past problems compared per lookup, most recent first
+    CANDIDATE_LIMIT = 200
+    # Container dimensions may differ by this fraction and still match
+    CONTAINER_TOLERANCE = 0.1
+    # Past problems are dropped once there are more than MAX_ROWS, oldest first,
+    # or once they haven't been updated for MAX_AGE seconds
+    MAX_ROWS = 10000
+    MAX_AGE = float(os.environ.get("SOLUTION_MAX_AGE", 30 * 24 * 3600))
+
+    def __init__(self, path=None):
+        self.path = path or self.DEFAULT_PATH
+        self.created = False
+
+    def _connect(self):
+        # Several gunicorn workers share the file, so wait for their locks
+        connection = sqlite3.connect(self.path, timeout=5)
+        if not self.created:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS solutions (
+                    problem_key TEXT PRIMARY KEY,
+                    width REAL, height REAL, depth REAL,
+                    histogram TEXT, arrangement TEXT,
+                    space_utilization REAL, updated REAL)""")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS solutions_container ON solutions (width, height, depth)")
+            connection.execute("CREATE INDEX IF NOT EXISTS solutions_updated ON solutions (updated)")
+            self.created = True
+        return connection
+
+    @staticmethod
+    def histogram(items_data):
+        """Count of items per orientation-free dimension key."""
+        counts = {}
+        for item in items_data:
+            dims = item["dimensions"]
+            key = dimension_key(dims["width"], dims["height"], dims["depth"])
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    @staticmethod
+    def distance(first, second):
+        """Share of items that differ between two histograms, from 0 (same SKUs) to 1."""
+        total = sum(first.values()) + sum(second.values())
+        if not total:
+            return 0.0
+        keys = set(first) | set(second)
+        return sum(abs(first.get(key, 0) - second.get(key, 0)) for key in keys) / total
+
+    @staticmethod
+    def _encode_histogram(histogram):
+        return json.dumps(sorted([list(key), count] for key, count in histogram.items()))
+
+    @staticmethod
+    def _decode_histogram(text):
+        return {tuple(key): count for key, count in json.loads(text)}
+
+    def save(self, container_data, items_data, result):
+        """Record a result, keeping only the best arrangement per problem; database errors are logged."""
+        if not result.get("placements"):
+            return
+        histogram = self.histogram(items_data)
+        size = [container_data["width"], container_data["height"], container_data["depth"]]
+        encoded_histogram = self._encode_histogram(histogram)
+        problem_key = hashlib.sha1(json.dumps([size, encoded_histogram]).encode()).hexdigest()
+        # Placement order and oriented sizes are all it takes to replay a packing
+        arrangement = [[list(dimension_key(w, h, d)), [w, h, d]]
+                       for _, _, _, _, w, h, d in result["placements"]]
+
+        now = time.time()
+        # Warm starts are an optimization, so a locked or unwritable database
+        # must not cost the client the result it is waiting for
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("""
+                        INSERT INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (problem_key) DO UPDATE SET
+                            arrangement = excluded.arrangement,
+                            space_utilization = excluded.space_utilization,
+                            updated = excluded.updated
+                        WHERE excluded.space_utilization >= solutions.space_utilization""",
+                                       (problem_key, *size, encoded_histogram, json.dumps(arrangement),
+                                        result["space_utilization"], now))
+                    self._prune(connection, now)
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            print(f"Could not save the solution to {self.path}: {e}")
+
+    def _prune(self, connection, now):
+        # Only rows past a threshold are deleted, found through the updated index;
+        # counting reads the smallest index rather than the table
+        connection.execute("DELETE FROM solutions WHERE updated < ?", (now - self.MAX_AGE,))
+        (count,) = connection.execute("SELECT COUNT(*) FROM solutions").fetchone()
+        if count > self.MAX_ROWS:
+            connection.execute("""
+                DELETE FROM solutions WHERE problem_key IN (
+                    SELECT problem_key FROM solutions ORDER BY updated LIMIT ?)""",
+                               (count - self.MAX_ROWS,))
+
+    def nearest(self, container_data, items_data):
+        """Return the closest past solution as a dict, or None if nothing is similar enough."""
+        size = [container_data["width"], container_data["height"], container_data["depth"]]
+        bounds = []
+        for value in size:
+            bounds += [value * (1 - self.CONTAINER_TOLERANCE), value * (1 + self.CONTAINER_TOLERANCE)]
+
+        try:
+            connection = self._connect()
+            try:
+                rows = connection.execute("""
+                    SELECT width, height, depth, histogram, arrangement, space_utilization
+                    FROM solutions
+                    WHERE width BETWEEN ? AND ? AND height BETWEEN ? AND ? AND depth BETWEEN ? AND ?
+                    ORDER BY updated DESC LIMIT ?""", (*bounds, self.CANDIDATE_LIMIT)).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return None
+
+        histogram = self.histogram(items_data)
+        best = None
+        for width, height, depth, encoded_histogram, arrangement, utilization in rows:
+            # Item mix matters most; container mismatch adds its relative difference
+            distance = self.distance(histogram, self._decode_histogram(encoded_histogram))
+            distance += sum(abs(past - value) / value
+                            for past, value in zip((width, height, depth), size)) / 3
+            if distance <= self.MAX_DISTANCE and (best is None or distance < best["distance"]):
+                best = {"distance": round(distance, 4), "space_utilization": utilization,
+                        "arrangement": json.loads(arrangement)}
+        return best
+
+    @staticmethod
+    def remap(arrangement, items, rng):
+        """Turn a stored arrangement into a genome over the current items.
+
+        Each stored box is matched to an unused item with the same dimensions;
+        items without a match are appended largest first in a random orientation.
+        """
+        available = {}
+        for item in items:
+            key = dimension_key(*item.orientations[0])
+            available.setdefault(key, []).append(item)
+
+        genome = []
+        for key, orientation in arrangement:
+            matches = available.get(tuple(key))
+            if matches:
+                item = matches.pop(0)
+                orientation = tuple(orientation)
+                if orientation not in item.orientations:
+                    orientation = rng.choice(item.orientations)
+                genome.append((item, orientation))
+
+        unmatched = sorted((item for matches in available.values() for item in matches),
+                           key=lambda item: item.volume, reverse=True)
+        genome += [(item, rng.choice(item.orientations)) for item in unmatched]
+        return genome
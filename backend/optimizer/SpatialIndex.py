@@ -0,0 +1,57 @@
+import math
+
+
+class SpatialIndex:
+    """Uniform hash grid over axis-aligned boxes for fast overlap queries."""
+
+    # Tolerance for touching faces when coordinates are real numbers
+    EPSILON = 1e-9
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}  # (i, j, k) -> list of box indices
+        self.boxes = []  # (x1, y1, z1, x2, y2, z2)
+
+    def _cell_range(self, x1, y1, z1, x2, y2, z2):
+        size = self.cell_size
+        eps = self.EPSILON
+        # Shrink by epsilon so boxes that only touch a cell border stay out of it
+        return (range(math.floor((x1 + eps) / size), math.floor((x2 - eps) / size) + 1),
+                range(math.floor((y1 + eps) / size), math.floor((y2 - eps) / size) + 1),
+                range(math.floor((z1 + eps) / size), math.floor((z2 - eps) / size) + 1))
+
+    def insert(self, x, y, z, w, h, d):
+        """Register a box and return its index."""
+        box = (x, y, z, x + w, y + h, z + d)
+        index = len(self.boxes)
+        self.boxes.append(box)
+
+        range_i, range_j, range_k = self._cell_range(*box)
+        for i in range_i:
+            for j in range_j:
+                for k in range_k:
+                    self.cells.setdefault((i, j, k), []).append(index)
+        return index
+
+    def intersects(self, x, y, z, w, h, d):
+        """Return True if the box overlaps any indexed box by more than a touching face."""
+        x2, y2, z2 = x + w, y + h, z + d
+        eps = self.EPSILON
+        boxes = self.boxes
+        cells = self.cells
+        seen = set()
+
+        range_i, range_j, range_k = self._cell_range(x, y, z, x2, y2, z2)
+        for i in range_i:
+            for j in range_j:
+                for k in range_k:
+                    for index in cells.get((i, j, k), ()):
+                        if index in seen:
+                            continue
+                        seen.add(index)
+                        bx1, by1, bz1, bx2, by2, bz2 = boxes[index]
+                        if x < bx2 - eps and bx1 < x2 - eps and \
+                                y < by2 - eps and by1 < y2 - eps and \
+                                z < bz2 - eps and bz1 < z2 - eps:
+                            return True
+        return False
@@ -1,11 +1,34 @@
+import os
 from Optimizer import *
+from AutoTuner import *
+from Checkpoint import *
+from ExactSolver import *
+from Decomposer import *
+from Portfolio import *
+from SolutionStore import *
+import Metrics
+import ProcessPool
 from flask import Flask, request, jsonify
+from service_common.admission import ConcurrencyLimiter
 
 
 app = Flask(__name__)
+Metrics.init_app(app)
+
+# The GA holds the GIL, so one optimization per worker at a time; a few more may
+# wait briefly for their turn and the rest are turned away with a 503
+QUEUE_TIMEOUT = float(os.environ.get("QUEUE_TIMEOUT", 5))
+optimize_limiter = ConcurrencyLimiter(
+    int(os.environ.get("OPTIMIZE_CONCURRENCY", 1)), int(os.environ.get("OPTIMIZE_QUEUE_SIZE", 4)),
+    QUEUE_TIMEOUT, {"status": "error", "message": "Server is busy, retry later"},
+    Metrics.REQUEST_METRICS)
+
+# Past solutions for warm starts, shared by every worker through SOLUTION_DB
+solution_store = SolutionStore()
 
 
 @app.route('/optimize', methods=['POST'])
+@optimize_limiter
 def optimize():
     try:
         data = request.get_json()
@@ -33,18 +56,108 @@ def optimize():
                 return jsonify({"status": "error", "message": "Item dimensions incomplete"}), 400
 
         # Optional configuration
-        config = data.get("config", None)
-
-        if not config:
-            config = {
-                "population_size": 30,
-                "generations": 50
-            }
-
-        optimizer = Optimizer(container, items)
+        config = data.get("config", None) or {}
+
+        engine = config.get("engine", "ems")
+        if engine not in Optimizer.ENGINES:
+            return jsonify({"status": "error", "message": f"Unknown engine '{engine}'"}), 400
+
+        solver = config.get("solver", "auto")
+        if solver not in ("auto", "exact", "ga"):
+            return jsonify({"status": "error", "message": f"Unknown solver '{solver}'"}), 400
+
+        optimizer = Optimizer(container, items, engine=engine, seed=config.get("seed"))
+
+        # The exact solver places items like the "ems" engine, so only those loads use it
+        if solver == "exact" and engine != "ems":
+            return jsonify({"status": "error", "message": "The exact solver only supports the 'ems' engine"}), 400
+
+        job_id = data.get("job_id")
+
+        # Small loads are solved exactly, which is both faster and never worse than the GA.
+        # The search is deterministic and quick, so a retried job simply runs it again
+        if solver == "exact" or (solver == "auto" and engine == "ems" and len(items) <= ExactSolver.MAX_ITEMS):
+            result = ExactSolver(optimizer).solve()
+            Metrics.record_result("exact", len(items), result)
+            if job_id:
+                result["job_id"] = job_id
+            return jsonify(result)
+
+        # Portfolio mode races several GA configurations and reports which one won;
+        # clients can send their own list of configurations instead of the defaults
+        portfolio = config.get("portfolio")
+        if portfolio:
+            configurations = portfolio if isinstance(portfolio, list) else None
+            if configurations and not all(isinstance(c, dict) for c in configurations):
+                return jsonify({"status": "error", "message": "Portfolio configurations must be objects"}), 400
+            racer = Portfolio(container, items, engine=engine, configurations=configurations,
+                              seed=config.get("seed"))
+            try:
+                result = racer.solve(config.get("target_latency"))
+            except ProcessPool.SignalsBusy:
+                return optimize_limiter.reject("signals_busy")
+            except PortfolioError as e:
+                return jsonify({"status": "error", "message": str(e),
+                                "portfolio": {"configurations": e.configurations}}), e.status
+            Metrics.record_result("portfolio", len(items), result)
+            return jsonify(result)
+
+        # Large loads are split into slabs that are solved in parallel
+        decompose = config.get("decompose", "auto")
+        if decompose is True or (decompose == "auto" and len(items) >= Decomposer.MIN_ITEMS):
+            region_config = {key: config[key] for key in
+                             ("population_size", "generations", "elite_count", "mutation_rate",
+                              "mutation_growth", "seed") if key in config}
+            decomposer = Decomposer(container, items, engine=engine)
+            result = decomposer.solve(region_config, config.get("target_latency"))
+            Metrics.record_result("decompose", len(items), result)
+            return jsonify(result)
+
+        # Clients that send a job id can retry after a restart and resume from the
+        # last checkpoint, or resend it with more generations to extend a finished run
+        checkpoint_store = CheckpointStore() if job_id else None
+
+        # Size the search to the problem unless the client fixed it
+        tuning = None
+        if "population_size" not in config or "generations" not in config:
+            tuning = AutoTuner(optimizer).tune(config.get("target_latency"), {
+                key: config[key] for key in
+                ("population_size", "generations", "elite_count", "mutation_rate", "mutation_growth")
+                if key in config})
+
+        params = tuning or config
+
+        # Loads repeat with small variations, so start from the closest past solution
+        warm_starting = config.get("warm_start", True)
+        warm_start = solution_store.nearest(container, items) if warm_starting else None
+        seed_arrangements = None
+        if warm_start:
+            seed_arrangements = [SolutionStore.remap(warm_start.pop("arrangement"),
+                                                     optimizer.items, optimizer.random)]
 
         # Perform optimization
-        result = optimizer.genetic_algorithm(config["population_size"], config["generations"])
+        result = optimizer.genetic_algorithm(
+            params["population_size"], params["generations"],
+            elite_count=params.get("elite_count"),
+            mutation_rate=params.get("mutation_rate", 0.2),
+            mutation_growth=params.get("mutation_growth", 0.05),
+            checkpoint_store=checkpoint_store, job_id=job_id,
+            checkpoint_interval=config.get("checkpoint_interval", 5),
+            seed_arrangements=seed_arrangements)
+
+        Metrics.record_result("ga", len(items), result)
+        if checkpoint_store:
+            checkpoint_store.prune()
+        if warm_starting:
+            solution_store.save(container, items, result)
+        if warm_start:
+            result["warm_start"] = warm_start
+
+        if job_id:
+            result["job_id"] = job_id
+
+        if tuning:
+            result["tuning"] = tuning
 
         return jsonify(result)
 
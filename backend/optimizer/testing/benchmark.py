@@ -0,0 +1,88 @@
+"""
+Benchmark the optimizer engines on a generated packing problem.
+
+Reports wall time, best utilization, peak traced memory and the number of
+bytes allocated for occupancy grids (churn) for each configuration.
+
+Run from backend/optimizer:
+    python testing/benchmark.py [--population 30] [--generations 50]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Container as container_module
+from Optimizer import Optimizer
+
+
+CONTAINER = {"width": 30, "height": 20, "depth": 10}
+ITEM_DIMENSIONS = [(6, 6, 2), (4, 2, 1), (4, 2, 1), (4, 2, 1), (6, 6, 2), (6, 6, 2),
+                   (6, 6, 2), (6, 6, 2), (6, 6, 2), (16, 8, 1), (16, 8, 1), (16, 8, 1),
+                   (16, 8, 1), (16, 8, 1), (16, 8, 1), (24, 12, 9), (9, 25, 7)]
+
+# (label, optimizer kwargs, pool enabled)
+CONFIGURATIONS = [
+    ("ems", {"engine": "ems"}, True),
+    ("grid int8 unpooled", {"engine": "grid", "packed_grid": False}, False),
+    ("grid int8 pooled", {"engine": "grid", "packed_grid": False}, True),
+    ("grid packed pooled", {"engine": "grid", "packed_grid": True}, True),
+    ("continuous", {"engine": "continuous"}, True),
+    ("batch", {"engine": "batch"}, True),
+]
+
+
+def build_items():
+    return [{"id": i, "dimensions": {"width": w, "height": h, "depth": d}}
+            for i, (w, h, d) in enumerate(ITEM_DIMENSIONS, start=1)]
+
+
+def run(label, kwargs, pooled, population_size, generations, seed):
+    pool = container_module.container_pool
+    pool.clear()
+    pool.max_per_shape = 4 if pooled else 0
+
+    stats = container_module.ALLOCATION_STATS
+    bytes_before, buffers_before = stats["bytes"], stats["buffers"]
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    optimizer = Optimizer(CONTAINER, build_items(), seed=seed, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = optimizer.genetic_algorithm(population_size, generations)
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "label": label,
+        "seconds": elapsed,
+        "utilization": result["space_utilization"],
+        "peak_kib": peak / 1024,
+        "grid_buffers": stats["buffers"] - buffers_before,
+        "churned_kib": (stats["bytes"] - bytes_before) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--population", type=int, default=30)
+    parser.add_argument("--generations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'configuration':<22}{'time (s)':>10}{'util %':>9}"
+          f"{'peak KiB':>11}{'buffers':>9}{'churn KiB':>11}")
+    for label, kwargs, pooled in CONFIGURATIONS:
+        row = run(label, kwargs, pooled, args.population, args.generations, args.seed)
+        print(f"{row['label']:<22}{row['seconds']:>10.3f}{row['utilization']:>9.2f}"
+              f"{row['peak_kib']:>11.1f}{row['grid_buffers']:>9}{row['churned_kib']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import unittest
+from AutoTuner import AutoTuner
+from Optimizer import Optimizer
+from app import app
+
+
+def build_optimizer(item_count, engine="ems"):
+    container = {"width": 60, "height": 50, "depth": 40}
+    items = [{"id": i, "dimensions": {"width": 3, "height": 4, "depth": 5}}
+             for i in range(item_count)]
+    return Optimizer(container, items, engine=engine)
+
+
+class TestAutoTuner(unittest.TestCase):
+
+    def test_small_problems_get_a_small_search(self):
+        tuning = AutoTuner(build_optimizer(5)).tune()
+        self.assertLess(tuning["population_size"] * tuning["generations"], 30 * 50)
+        self.assertLess(tuning["predicted_runtime"], 1.0)
+
+    def test_search_fits_the_target_latency(self):
+        for item_count in (20, 60, 120):
+            with self.subTest(item_count=item_count):
+                tuning = AutoTuner(build_optimizer(item_count)).tune(target_latency=3.0)
+                self.assertLessEqual(tuning["predicted_runtime"], 3.0)
+                self.assertGreaterEqual(tuning["elite_count"], 1)
+                self.assertLess(tuning["elite_count"], tuning["population_size"])
+
+    def test_mutation_reaches_maximum_at_stagnation_limit(self):
+        tuning = AutoTuner(build_optimizer(40)).tune()
+        final_rate = tuning["mutation_rate"] + AutoTuner.STAGNATION_LIMIT * tuning["mutation_growth"]
+        self.assertAlmostEqual(final_rate, AutoTuner.MAX_MUTATION_RATE, places=1)
+
+    def test_overfull_load_is_cheap_to_evaluate(self):
+        container = {"width": 5, "height": 5, "depth": 5}
+        items = [{"id": i, "dimensions": {"width": 5, "height": 5, "depth": 5}} for i in range(50)]
+        tuner = AutoTuner(Optimizer(container, items))
+        self.assertEqual(tuner.estimate_fitness_cost(), AutoTuner.COST_MODEL["ems"][0])
+
+    def assertConsistent(self, tuning):
+        self.assertEqual(tuning["elite_count"], max(1, tuning["population_size"] // 10))
+        self.assertEqual(tuning["predicted_runtime"],
+                         round(tuning["population_size"] * tuning["generations"] *
+                               tuning["estimated_fitness_cost"], 3))
+
+    def test_fixed_population_leaves_generations_to_the_budget(self):
+        tuning = AutoTuner(build_optimizer(40)).tune(target_latency=3.0, overrides={"population_size": 20})
+
+        self.assertEqual(tuning["population_size"], 20)
+        self.assertEqual(tuning["elite_count"], 2)
+        self.assertLessEqual(tuning["predicted_runtime"], 3.0)
+        self.assertConsistent(tuning)
+
+    def test_fixed_generations_leave_population_to_the_budget(self):
+        tuning = AutoTuner(build_optimizer(40)).tune(target_latency=3.0, overrides={"generations": 20})
+
+        self.assertEqual(tuning["generations"], 20)
+        self.assertLessEqual(tuning["predicted_runtime"], 3.0)
+        self.assertConsistent(tuning)
+
+    def test_fixed_mutation_rate_still_reaches_maximum(self):
+        tuning = AutoTuner(build_optimizer(40)).tune(overrides={"mutation_rate": 0.5})
+
+        final_rate = tuning["mutation_rate"] + AutoTuner.STAGNATION_LIMIT * tuning["mutation_growth"]
+        self.assertAlmostEqual(final_rate, AutoTuner.MAX_MUTATION_RATE, places=2)
+
+    def test_other_overrides_are_kept(self):
+        tuning = AutoTuner(build_optimizer(40)).tune(overrides={"elite_count": 3, "random_share": 0.5})
+
+        self.assertEqual((tuning["elite_count"], tuning["random_share"]), (3, 0.5))
+
+    def test_optimize_reports_the_tuning_it_ran(self):
+        payload = {"container": {"width": 60, "height": 50, "depth": 40},
+                   "items": [{"id": i, "dimensions": {"width": 3, "height": 4, "depth": 5}} for i in range(12)],
+                   "config": {"solver": "ga", "population_size": 30, "seed": 1, "warm_start": False,
+                              "target_latency": 2}}
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = app.test_client().post('/optimize', json=payload)
+
+        tuning = response.json["tuning"]
+        self.assertEqual(tuning["population_size"], 30)
+        self.assertConsistent(tuning)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import tracemalloc
+import unittest
+from BatchEvaluator import BatchEvaluator
+from Container import Container
+from Optimizer import Optimizer
+
+
+def bottom_left_front(arrangement, w, h, d):
+    """Reference packing: scan every anchor in x, y, z order on a voxel grid."""
+    container = Container(w, h, d)
+    total_volume = w * h * d
+    if sum(item.volume for item, _ in arrangement) > total_volume:
+        return 0, [], False
+
+    placements = []
+    placed_volume = 0
+    for item, (iw, ih, id_) in arrangement:
+        position = next(((x, y, z) for x in range(w - iw + 1) for y in range(h - ih + 1)
+                         for z in range(d - id_ + 1) if container.fits(x, y, z, iw, ih, id_)), None)
+        if position is None:
+            return placed_volume / total_volume * 100, placements, False
+        container.place_item(item, *position, iw, ih, id_)
+        placements.append((item.id, *position, iw, ih, id_))
+        placed_volume += item.volume
+    return placed_volume / total_volume * 100, placements, True
+
+
+class TestBatchEvaluator(unittest.TestCase):
+
+    def test_matches_sequential_bottom_left_front(self):
+        rng = random.Random(5)
+        container = {"width": 12, "height": 10, "depth": 8}
+        items = [{"id": i, "dimensions": {"width": rng.randint(1, 6), "height": rng.randint(1, 6),
+                                          "depth": rng.randint(1, 5)}} for i in range(25)]
+        optimizer = Optimizer(container, items, engine="batch", seed=3)
+        population = optimizer.initialize_population(20, optimizer.items)
+
+        results = optimizer.evaluate_population(population)
+
+        for individual, result in zip(population, results):
+            self.assertEqual(result, bottom_left_front(individual, 12, 10, 8))
+
+    def test_chunked_evaluation_gives_same_results(self):
+        container = {"width": 9, "height": 7, "depth": 5}
+        items = [{"id": i, "dimensions": {"width": 3, "height": 2, "depth": 1 + i % 3}} for i in range(12)]
+        optimizer = Optimizer(container, items, engine="batch", seed=1)
+        population = optimizer.initialize_population(9, optimizer.items)
+
+        evaluator = BatchEvaluator(9, 7, 5)
+        whole = evaluator.evaluate(population)
+        evaluator.MEMORY_BUDGET = 10 * 8 * 6 * 2 * evaluator.BYTES_PER_CELL
+        self.assertEqual(evaluator.evaluate(population), whole)
+
+    def test_peak_memory_stays_within_the_budget(self):
+        # Identical orientations put every individual in one group, the most memory per chunk
+        container = {"width": 60, "height": 50, "depth": 40}
+        items = [{"id": i, "dimensions": {"width": 10, "height": 10, "depth": 10}} for i in range(30)]
+        optimizer = Optimizer(container, items, engine="batch", seed=3)
+        population = [[(item, (10, 10, 10)) for item in optimizer.items] for _ in range(12)]
+
+        evaluator = BatchEvaluator(60, 50, 40)
+        evaluator.MEMORY_BUDGET = 4 * 61 * 51 * 41 * evaluator.BYTES_PER_CELL
+        tracemalloc.start()
+        try:
+            results = evaluator.evaluate(population)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLessEqual(peak, evaluator.MEMORY_BUDGET)
+        self.assertEqual([utilization for utilization, _, _ in results], [25.0] * 12)
+
+    def test_overfull_individuals_score_zero(self):
+        container = {"width": 2, "height": 2, "depth": 2}
+        items = [{"id": i, "dimensions": {"width": 2, "height": 2, "depth": 1}} for i in range(3)]
+        optimizer = Optimizer(container, items, engine="batch")
+        self.assertEqual(optimizer.evaluate_population(optimizer.initialize_population(2, optimizer.items)),
+                         [(0, [], False), (0, [], False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
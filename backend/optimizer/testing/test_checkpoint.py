@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from Checkpoint import CheckpointStore
+from Optimizer import Optimizer
+
+
+CONTAINER = {"width": 20, "height": 12, "depth": 9}
+ITEMS = [{"id": i, "dimensions": {"width": 2 + i % 5, "height": 3 + i % 3, "depth": 2 + i % 4}}
+         for i in range(25)]
+
+
+class WorkerKilled(Exception):
+    pass
+
+
+class KilledAfterFirstSave(CheckpointStore):
+    """Store that aborts the run right after its first checkpoint, like a recycled worker."""
+
+    def save(self, job_id, state):
+        super().save(job_id, state)
+        if not state["finished"]:
+            raise WorkerKilled()
+
+
+def run(store, generations, seed=11):
+    optimizer = Optimizer(CONTAINER, ITEMS, seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return optimizer.genetic_algorithm(
+            12, generations, checkpoint_store=store, job_id="job-1", checkpoint_interval=3)
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_resumed_run_matches_uninterrupted_run(self):
+        uninterrupted = run(None, 8)
+
+        with self.assertRaises(WorkerKilled):
+            run(KilledAfterFirstSave(self.directory.name), 8)
+        resumed = run(CheckpointStore(self.directory.name), 8)
+
+        self.assertEqual(resumed["resumed_from_generation"], 3)
+        self.assertEqual(resumed["space_utilization"], uninterrupted["space_utilization"])
+        self.assertEqual([list(p) for p in resumed["placements"]],
+                         [list(p) for p in uninterrupted["placements"]])
+
+    def test_finished_run_is_not_repeated(self):
+        store = CheckpointStore(self.directory.name)
+        first = run(store, 4)
+        again = run(store, 4)
+
+        self.assertEqual(again["resumed_from_generation"], store.load("job-1")["generation"])
+        self.assertEqual(again["space_utilization"], first["space_utilization"])
+
+    def test_run_that_stopped_early_is_not_repeated(self):
+        store = CheckpointStore(self.directory.name)
+        first = run(store, 60)
+        # Stagnation ends the search well before the requested generations
+        self.assertLess(store.load("job-1")["generation"], 60)
+
+        again = run(store, 60)
+        self.assertEqual(again["resumed_from_generation"], store.load("job-1")["generation"])
+        self.assertEqual(again["space_utilization"], first["space_utilization"])
+
+    def test_finished_run_can_be_extended(self):
+        store = CheckpointStore(self.directory.name)
+        run(store, 4)
+        extended = run(store, 7)
+
+        self.assertEqual(extended["resumed_from_generation"], 4)
+        self.assertEqual(store.load("job-1")["generation"], 7)
+
+    def test_checkpoint_of_another_problem_is_ignored(self):
+        store = CheckpointStore(self.directory.name)
+        run(store, 4)
+
+        optimizer = Optimizer(CONTAINER, ITEMS[:10], seed=11)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = optimizer.genetic_algorithm(12, 4, checkpoint_store=store, job_id="job-1")
+        self.assertNotIn("resumed_from_generation", result)
+
+    def test_prune_deletes_only_old_checkpoints(self):
+        store = CheckpointStore(self.directory.name)
+        store.save("old", {"finished": True})
+        store.save("new", {"finished": True})
+        old_time = os.path.getmtime(store.path("old")) - 3600
+        os.utime(store.path("old"), (old_time, old_time))
+
+        store.prune(max_age=60)
+        self.assertIsNone(store.load("old"))
+        self.assertIsNotNone(store.load("new"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import random
+import unittest
+from Container import Container, ContainerPool
+
+
+class Box:
+    id = 1
+
+
+class TestPackedContainer(unittest.TestCase):
+
+    def test_packed_grid_matches_int8_grid(self):
+        rng = random.Random(7)
+        dense = Container(12, 9, 21)
+        packed = Container(12, 9, 21, packed=True)
+
+        for _ in range(300):
+            w, h, d = rng.randint(1, 6), rng.randint(1, 6), rng.randint(1, 11)
+            x, y, z = rng.randint(0, 11), rng.randint(0, 8), rng.randint(0, 20)
+            fits = dense.fits(x, y, z, w, h, d)
+            self.assertEqual(fits, packed.fits(x, y, z, w, h, d))
+            if fits:
+                dense.place_item(Box, x, y, z, w, h, d)
+                packed.place_item(Box, x, y, z, w, h, d)
+
+        self.assertAlmostEqual(dense.get_utilization(), packed.get_utilization())
+        self.assertEqual(packed.space.nbytes * 8, 12 * 9 * 24)
+
+    def test_reset_clears_grid(self):
+        container = Container(4, 4, 9, packed=True)
+        container.place_item(Box, 0, 0, 0, 4, 4, 9)
+        container.reset()
+        self.assertEqual(container.get_utilization(), 0)
+        self.assertEqual(container.placements, [])
+
+
+class TestContainerPool(unittest.TestCase):
+
+    def test_released_buffers_are_reused(self):
+        pool = ContainerPool()
+        first = pool.acquire(5, 5, 5)
+        first.place_item(Box, 0, 0, 0, 2, 2, 2)
+        pool.release(first)
+
+        second = pool.acquire(5, 5, 5)
+        self.assertIs(first, second)
+        self.assertEqual(second.get_utilization(), 0)
+        self.assertIsNot(pool.acquire(5, 5, 5, packed=True), first)
+        self.assertEqual(pool.reused, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import random
+import unittest
+from ContinuousContainer import ContinuousContainer
+from Optimizer import Optimizer
+from SpatialIndex import SpatialIndex
+
+
+def overlaps(first, second):
+    _, x, y, z, w, h, d = first
+    _, ox, oy, oz, ow, oh, od = second
+    eps = SpatialIndex.EPSILON
+    return x < ox + ow - eps and ox < x + w - eps and \
+        y < oy + oh - eps and oy < y + h - eps and \
+        z < oz + od - eps and oz < z + d - eps
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def test_matches_brute_force_overlap(self):
+        rng = random.Random(3)
+        index = SpatialIndex(cell_size=2.5)
+        boxes = []
+        for _ in range(60):
+            box = (None, rng.uniform(0, 20), rng.uniform(0, 20), rng.uniform(0, 20),
+                   rng.uniform(0.5, 4), rng.uniform(0.5, 4), rng.uniform(0.5, 4))
+            index.insert(*box[1:])
+            boxes.append(box)
+
+        for _ in range(300):
+            query = (None, rng.uniform(0, 20), rng.uniform(0, 20), rng.uniform(0, 20),
+                     rng.uniform(0.5, 6), rng.uniform(0.5, 6), rng.uniform(0.5, 6))
+            expected = any(overlaps(query, box) for box in boxes)
+            self.assertEqual(index.intersects(*query[1:]), expected)
+
+    def test_touching_faces_do_not_overlap(self):
+        index = SpatialIndex(cell_size=1.0)
+        index.insert(0, 0, 0, 0.3, 1, 1)
+        self.assertFalse(index.intersects(0.1 + 0.2, 0, 0, 1, 1, 1))
+        self.assertTrue(index.intersects(0.29, 0, 0, 1, 1, 1))
+
+
+class TestContinuousEngine(unittest.TestCase):
+
+    def test_mm_precision_container_without_grid(self):
+        # A 40ft shipping container in millimetres would need a 67 billion cell grid
+        container = {"width": 12032, "height": 2352, "depth": 2393}
+        items = [{"id": i, "dimensions": {"width": 1200.5, "height": 800.25, "depth": 1000.75}}
+                 for i in range(30)]
+
+        for engine in ("continuous", "ems"):
+            with self.subTest(engine=engine):
+                optimizer = Optimizer(container, items, engine=engine)
+                self.assertIsInstance(optimizer.container, ContinuousContainer)
+                arrangement = [(item, (1200.5, 800.25, 1000.75)) for item in optimizer.items]
+
+                _, placements, all_placed = optimizer.fitness(optimizer.container, arrangement)
+
+                self.assertTrue(all_placed)
+                for i, first in enumerate(placements):
+                    for second in placements[i + 1:]:
+                        self.assertFalse(overlaps(first, second))
+
+
+if __name__ == '__main__':
+    unittest.main()
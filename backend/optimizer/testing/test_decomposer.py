@@ -0,0 +1,91 @@
+import contextlib
+import io
+import random
+import unittest
+from unittest import mock
+import Decomposer as decomposer_module
+from Decomposer import Decomposer
+from EmptySpaceTracker import EmptySpaceTracker
+
+
+def build_load(count, seed=3):
+    rng = random.Random(seed)
+    return [{"id": f"sku-{i}", "dimensions": {"width": rng.choice([4, 6, 8]),
+                                              "height": rng.choice([3, 5, 6]),
+                                              "depth": rng.choice([2, 4, 5])}}
+            for i in range(count)]
+
+
+class TestDecomposer(unittest.TestCase):
+
+    def setUp(self):
+        self.container = {"width": 60, "height": 30, "depth": 20}
+        self.decomposer = Decomposer(self.container, build_load(120), max_workers=1)
+        self.decomposer.ITEMS_PER_REGION = 30
+
+    def test_regions_tile_the_longest_axis(self):
+        regions = self.decomposer.plan_regions()
+
+        self.assertEqual(len(regions), 4)
+        offset = 0
+        for axis, start, thickness, _ in regions:
+            self.assertEqual(axis, 0)
+            self.assertEqual(start, offset)
+            offset += thickness
+        self.assertEqual(offset, self.container["width"])
+        self.assertEqual(sorted(i for *_, cluster in regions for i in cluster), list(range(120)))
+
+    def test_slabs_keep_their_minimum_thickness(self):
+        # The first slab's minimum takes more than its share, and shrinking the
+        # others proportionally used to leave the second thinner than its item
+        sizes = [(9, 9, 3), (5, 9, 3), (5, 5, 1), (1, 3, 5), (3, 5, 2)]
+        items = [{"id": i, "dimensions": {"width": w, "height": h, "depth": d}}
+                 for i, (w, h, d) in enumerate(sizes)]
+        decomposer = Decomposer({"width": 12, "height": 9, "depth": 9}, items, max_workers=1)
+        decomposer.ITEMS_PER_REGION = 1
+        regions = decomposer.plan_regions()
+
+        self.assertEqual(len(regions), 5)
+        for _, _, thickness, cluster in regions:
+            self.assertGreaterEqual(thickness, max(min(sizes[i]) for i in cluster))
+        self.assertEqual(sum(thickness for _, _, thickness, _ in regions), 12)
+
+    def test_leftovers_use_the_optimizer_tolerances(self):
+        items = [{"id": i, "dimensions": {"width": 2.5, "height": 1.5, "depth": 1}} for i in range(2)]
+        decomposer = Decomposer({"width": 5, "height": 3, "depth": 1}, items, max_workers=1)
+        with mock.patch.object(decomposer_module, "EmptySpaceTracker", wraps=EmptySpaceTracker) as tracker:
+            extra = decomposer._place_leftovers([], [0, 1])
+
+        tracker.assert_called_once_with(5, 3, 1, 1, EmptySpaceTracker.EPSILON)
+        self.assertEqual(len(extra), 2)
+
+    def test_stitched_placements_are_valid(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = self.decomposer.solve({"population_size": 8, "generations": 5, "seed": 1})
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(sorted(p[0] for p in result["placements"]),
+                         sorted(item["id"] for item in build_load(120)))
+
+        occupied = set()
+        for _, x, y, z, w, h, d in result["placements"]:
+            self.assertLessEqual(x + w, 60)
+            self.assertLessEqual(y + h, 30)
+            self.assertLessEqual(z + d, 20)
+            cells = {(i, j, k) for i in range(x, x + w) for j in range(y, y + h) for k in range(z, z + d)}
+            self.assertFalse(occupied & cells)
+            occupied |= cells
+
+    def test_process_pool_matches_a_single_process(self):
+        config = {"population_size": 8, "generations": 5, "seed": 1}
+        parallel = Decomposer(self.container, build_load(120), max_workers=2)
+        parallel.ITEMS_PER_REGION = 30
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = self.decomposer.solve(config)
+            result = parallel.solve(config)
+
+        self.assertEqual(result["placements"], expected["placements"])
+
+
+if __name__ == '__main__':
+    unittest.main()
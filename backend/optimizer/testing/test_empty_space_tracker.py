@@ -0,0 +1,55 @@
+import unittest
+from EmptySpaceTracker import EmptySpaceTracker
+from Optimizer import Optimizer
+
+
+class TestEmptySpaceTracker(unittest.TestCase):
+
+    def test_first_item_goes_to_origin(self):
+        spaces = EmptySpaceTracker(10, 10, 10)
+        self.assertEqual(spaces.find_position(4, 5, 6), (0, 0, 0))
+
+    def test_place_splits_into_maximal_spaces(self):
+        spaces = EmptySpaceTracker(10, 10, 10)
+        spaces.place(0, 0, 0, 4, 10, 10)
+        # A full-height slab leaves exactly one maximal space to its right
+        self.assertEqual(spaces.spaces, [(4, 0, 0, 10, 10, 10)])
+
+        spaces.place(4, 0, 0, 6, 5, 10)
+        self.assertEqual(spaces.spaces, [(4, 5, 0, 10, 10, 10)])
+
+    def test_dominated_spaces_are_pruned(self):
+        spaces = EmptySpaceTracker(10, 10, 10)
+        spaces.place(0, 0, 0, 2, 2, 2)
+        spaces.place(2, 0, 0, 2, 2, 2)
+
+        for space in spaces.spaces:
+            others = [other for other in spaces.spaces if other is not space]
+            self.assertFalse(EmptySpaceTracker._is_dominated(space, others))
+
+    def test_item_larger_than_any_space_is_rejected(self):
+        spaces = EmptySpaceTracker(10, 10, 10)
+        spaces.place(0, 0, 0, 10, 10, 5)
+        self.assertIsNone(spaces.find_position(10, 10, 6))
+        self.assertEqual(spaces.find_position(10, 10, 5), (0, 0, 5))
+
+    def test_ems_placements_do_not_overlap(self):
+        container = {"width": 30, "height": 20, "depth": 10}
+        items = [{"id": i, "dimensions": {"width": 6, "height": 4, "depth": 3}}
+                 for i in range(20)]
+        optimizer = Optimizer(container, items, engine="ems")
+        arrangement = [(item, item.orientations[0]) for item in optimizer.items]
+
+        _, placements, all_placed = optimizer.fitness(optimizer.container, arrangement)
+
+        self.assertTrue(all_placed)
+        occupied = set()
+        for _, x, y, z, w, h, d in placements:
+            cells = {(i, j, k) for i in range(x, x + w)
+                     for j in range(y, y + h) for k in range(z, z + d)}
+            self.assertFalse(occupied & cells)
+            occupied |= cells
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import contextlib
+import io
+import unittest
+from ExactSolver import ExactSolver
+from Optimizer import Optimizer
+from app import app
+
+
+def solve(container, dimensions):
+    items = [{"id": i, "dimensions": {"width": w, "height": h, "depth": d}}
+             for i, (w, h, d) in enumerate(dimensions)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ExactSolver(Optimizer(container, items)).solve()
+
+
+class TestExactSolver(unittest.TestCase):
+
+    def test_finds_a_perfect_packing(self):
+        # Fills the box exactly, but only with the right orientations
+        result = solve({"width": 4, "height": 4, "depth": 2},
+                       [(4, 2, 1), (2, 2, 4), (4, 2, 1)])
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["space_utilization"], 100)
+        self.assertTrue(result["search_exhausted"])
+
+    def test_packs_the_best_subset_of_an_overfull_load(self):
+        # 3 + 5 + 6 units can't all go into a 10 unit box; 4 + 6 fills it
+        result = solve({"width": 10, "height": 1, "depth": 1},
+                       [(3, 1, 1), (5, 1, 1), (6, 1, 1), (4, 1, 1)])
+
+        self.assertEqual(result["status"], "failure")
+        self.assertEqual(result["space_utilization"], 100)
+        self.assertEqual(sorted(p[0] for p in result["placements"]), [2, 3])
+        self.assertTrue(result["search_exhausted"])
+
+    def test_limit_returns_unproven_result(self):
+        dimensions = [(3, 5, 2), (4, 4, 3), (7, 3, 2), (5, 5, 5), (6, 2, 3), (3, 3, 7), (4, 6, 2)]
+        original_limit = ExactSolver.NODE_LIMIT
+        ExactSolver.NODE_LIMIT = 3
+        self.addCleanup(setattr, ExactSolver, "NODE_LIMIT", original_limit)
+
+        result = solve({"width": 9, "height": 8, "depth": 6}, dimensions)
+        self.assertFalse(result["search_exhausted"])
+        self.assertGreater(result["space_utilization"], 0)
+
+
+class TestExactRoute(unittest.TestCase):
+
+    def optimize(self, config, job_id=None):
+        payload = {
+            "container": {"width": 10, "height": 10, "depth": 10},
+            "items": [{"id": i, "dimensions": {"width": 5, "height": 5, "depth": 5}} for i in range(3)],
+            "config": config,
+        }
+        if job_id:
+            payload["job_id"] = job_id
+        with contextlib.redirect_stdout(io.StringIO()):
+            return app.test_client().post('/optimize', json=payload)
+
+    def test_small_load_is_solved_exactly_with_its_job_id(self):
+        response = self.optimize({}, job_id="small-job")
+        self.assertEqual(response.json["solver"], "exact")
+        self.assertEqual(response.json["job_id"], "small-job")
+
+    def test_other_engines_use_the_genetic_algorithm(self):
+        response = self.optimize({"engine": "continuous", "population_size": 6, "generations": 2,
+                                  "warm_start": False})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("solver", response.json)
+
+    def test_exact_solver_rejects_other_engines(self):
+        response = self.optimize({"engine": "grid", "solver": "exact"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
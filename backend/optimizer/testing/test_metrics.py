@@ -0,0 +1,44 @@
+import contextlib
+import io
+import unittest
+from app import app
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        samples = {}
+        for line in response.get_data(as_text=True).splitlines():
+            if line and not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_counts_requests_and_solver_work(self):
+        before = self.scrape()
+        payload = {
+            "container": {"width": 10, "height": 10, "depth": 10},
+            "items": [{"id": i, "dimensions": {"width": 5, "height": 5, "depth": 5}} for i in range(3)],
+            "config": {"solver": "exact"},
+        }
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.client.post('/optimize', json=payload).status_code, 200)
+        after = self.scrape()
+
+        def delta(name):
+            return after.get(name, 0) - before.get(name, 0)
+
+        self.assertEqual(delta('optimizer_requests_total{endpoint="/optimize",method="POST",status="200"}'), 1)
+        self.assertEqual(delta('optimizer_request_duration_seconds_count{endpoint="/optimize",method="POST"}'), 1)
+        self.assertEqual(delta('optimizer_solves_total{solver="exact",status="success"}'), 1)
+        self.assertGreater(delta('optimizer_exact_nodes_total'), 0)
+        self.assertEqual(after['optimizer_requests_in_flight{endpoint="/optimize"}'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
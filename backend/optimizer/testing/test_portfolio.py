@@ -0,0 +1,132 @@
+import contextlib
+import io
+import math
+import time
+import unittest
+from unittest import mock
+import ProcessPool
+from Portfolio import Portfolio, PortfolioError, run_configuration
+from app import app
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def setUp(self):
+        self.container = {"width": 10, "height": 10, "depth": 10}
+        self.items = [{"id": f"box-{i}", "dimensions": {"width": 5, "height": 5, "depth": 5}}
+                      for i in range(6)]
+
+    def solve(self, configurations=None, max_workers=1):
+        portfolio = Portfolio(self.container, self.items, configurations=configurations,
+                              max_workers=max_workers, seed=7)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return portfolio.solve(target_latency=5)
+
+    def test_reports_the_winning_configuration(self):
+        result = self.solve()
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(len(result["placements"]), 6)
+        names = [summary["name"] for summary in result["portfolio"]["configurations"]]
+        self.assertEqual(names, [c["name"] for c in Portfolio.DEFAULT_CONFIGURATIONS])
+        self.assertIn(result["portfolio"]["winner"], names)
+
+    def test_ties_go_to_the_earlier_configuration(self):
+        configurations = [{"name": "first", "population_size": 8, "generations": 50},
+                          {"name": "second", "population_size": 8, "generations": 50}]
+        result = self.solve(configurations)
+
+        # Both pack everything, and the earlier configuration stays the reference
+        self.assertEqual(result["portfolio"]["winner"], "first")
+        self.assertEqual(result["portfolio"]["configurations"][1]["status"], "success")
+
+    def test_runs_configurations_in_parallel(self):
+        result = self.solve(max_workers=2)
+
+        self.assertEqual(result["status"], "success")
+        self.assertNotIn("timeout", [s["status"] for s in result["portfolio"]["configurations"]])
+
+    def test_signals_are_released_after_the_race(self):
+        self.solve(max_workers=2)
+
+        # Cancelled and stopped runs release the signal as they finish
+        deadline = time.time() + 10
+        while len(ProcessPool._free_signals) < ProcessPool.SIGNAL_SLOTS and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len(ProcessPool._free_signals), ProcessPool.SIGNAL_SLOTS)
+
+    def test_stop_signal_ends_a_run(self):
+        signal = ProcessPool.acquire_signal()
+        self.addCleanup(ProcessPool.release_signal, signal)
+        ProcessPool.signals[signal] = math.inf
+
+        # Nine boxes can't fit, so only the signal stops this long run early
+        items = self.items + self.items[:3]
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_configuration(self.container, items, "ems",
+                                       {"population_size": 8, "generations": 100000},
+                                       7, 60, time.time() + 60, 200, signal)
+        self.assertLess(result["runtime"], 5)
+
+    def test_configurations_must_be_objects(self):
+        payload = {"container": self.container, "items": self.items,
+                   "config": {"solver": "ga", "portfolio": ["default", 3]}}
+        response = app.test_client().post('/optimize', json=payload)
+
+        self.assertEqual(response.status_code, 400)
+
+    def post(self, portfolio):
+        payload = {"container": self.container, "items": self.items,
+                   "config": {"solver": "ga", "portfolio": portfolio, "target_latency": 5}}
+        with contextlib.redirect_stdout(io.StringIO()):
+            return app.test_client().post('/optimize', json=payload)
+
+    def test_failed_configurations_are_reported(self):
+        configurations = [{"name": "broken", "population_size": "many"},
+                          {"name": "working", "population_size": 8, "generations": 50}]
+
+        for max_workers in (1, 2):
+            with self.subTest(max_workers=max_workers):
+                result = self.solve(configurations, max_workers=max_workers)
+
+                self.assertEqual(result["portfolio"]["winner"], "working")
+                broken = result["portfolio"]["configurations"][0]
+                self.assertEqual(broken["status"], "error")
+                self.assertIn("not supported between instances of 'str'", broken["message"])
+
+    def test_bad_configurations_are_rejected(self):
+        configurations = [{"name": "broken", "population_size": "many"}]
+        with self.assertRaises(PortfolioError) as raised:
+            self.solve(configurations)
+        self.assertEqual(raised.exception.status, 400)
+
+        response = self.post(configurations)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["status"], "error")
+        self.assertIn("broken: '>' not supported", response.json["message"])
+        self.assertEqual(response.json["portfolio"]["configurations"][0]["status"], "error")
+
+    def test_failures_of_the_solver_are_server_errors(self):
+        with mock.patch("Portfolio.run_configuration", side_effect=RuntimeError("solver crashed")):
+            response = self.post([{"name": "default"}])
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("default: solver crashed", response.json["message"])
+
+    def test_busy_signals_are_turned_away(self):
+        signals = []
+        self.addCleanup(lambda: [ProcessPool.release_signal(signal) for signal in signals])
+        for _ in range(ProcessPool.SIGNAL_SLOTS):
+            signals.append(ProcessPool.acquire_signal())
+
+        with self.assertRaises(ProcessPool.SignalsBusy):
+            ProcessPool.acquire_signal(timeout=0.01)
+        with mock.patch("ProcessPool.SIGNAL_TIMEOUT", 0.01):
+            response = self.post(True)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
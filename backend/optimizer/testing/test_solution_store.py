@@ -0,0 +1,118 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+import unittest
+from unittest import mock
+from Optimizer import Optimizer
+from SolutionStore import SolutionStore
+import app
+
+
+def build_load(count, seed=5):
+    rng = random.Random(seed)
+    return [{"id": f"sku-{i}", "dimensions": {"width": rng.choice([2, 4]),
+                                              "height": rng.choice([2, 3]),
+                                              "depth": rng.choice([1, 2])}}
+            for i in range(count)]
+
+
+class TestSolutionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SolutionStore(os.path.join(self.directory.name, "solutions.sqlite3"))
+        self.container = {"width": 12, "height": 10, "depth": 8}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def solve(self, items, seed_arrangements=None):
+        optimizer = Optimizer(self.container, items, seed=3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = optimizer.genetic_algorithm(10, 5, seed_arrangements=seed_arrangements)
+        return optimizer, result
+
+    def test_nearest_finds_a_similar_load(self):
+        items = build_load(30)
+        _, result = self.solve(items)
+        self.store.save(self.container, items, result)
+
+        similar = build_load(30)[:-2] + [{"id": "new", "dimensions": {"width": 1, "height": 1, "depth": 1}}]
+        match = self.store.nearest(self.container, similar)
+        self.assertIsNotNone(match)
+        self.assertGreater(match["distance"], 0)
+        self.assertEqual(len(match["arrangement"]), len(result["placements"]))
+
+        other = [{"id": i, "dimensions": {"width": 7, "height": 7, "depth": 7}} for i in range(3)]
+        self.assertIsNone(self.store.nearest(self.container, other))
+        self.assertIsNone(self.store.nearest({"width": 40, "height": 10, "depth": 8}, items))
+
+    def test_keeps_the_best_arrangement_per_problem(self):
+        items = build_load(10)
+        self.store.save(self.container, items, {"placements": [(0, 0, 0, 0, 4, 3, 2)],
+                                                 "space_utilization": 50.0})
+        self.store.save(self.container, items, {"placements": [(0, 0, 0, 0, 2, 3, 4)],
+                                                 "space_utilization": 10.0})
+
+        match = self.store.nearest(self.container, items)
+        self.assertEqual(match["space_utilization"], 50.0)
+        self.assertEqual(match["arrangement"], [[[2, 3, 4], [4, 3, 2]]])
+
+    def test_remapped_seed_replays_the_past_packing(self):
+        items = build_load(30)
+        _, result = self.solve(items)
+        self.store.save(self.container, items, result)
+
+        # Same SKUs under new ids and in a new order
+        renamed = [{"id": f"new-{i}", "dimensions": item["dimensions"]}
+                   for i, item in enumerate(reversed(items))]
+        optimizer = Optimizer(self.container, renamed, seed=3)
+        match = self.store.nearest(self.container, renamed)
+        genome = SolutionStore.remap(match["arrangement"], optimizer.items, optimizer.random)
+
+        self.assertEqual(sorted(id(item) for item, _ in genome), sorted(id(item) for item in optimizer.items))
+        utilization, _, _ = optimizer.fitness(optimizer.container, genome)
+        self.assertAlmostEqual(utilization, result["space_utilization"], places=1)
+
+    def test_prunes_old_and_surplus_problems(self):
+        self.store.MAX_ROWS = 2
+        result = {"placements": [(0, 0, 0, 0, 4, 3, 2)], "space_utilization": 50.0}
+        loads = [[{"id": i, "dimensions": {"width": size, "height": size, "depth": size}} for i in range(3)]
+                 for size in (1, 2, 3)]
+        for items in loads:
+            self.store.save(self.container, items, result)
+
+        # Only the two most recent problems are kept
+        self.assertIsNone(self.store.nearest(self.container, loads[0]))
+        self.assertIsNotNone(self.store.nearest(self.container, loads[2]))
+
+        self.store.MAX_AGE = 0
+        time.sleep(0.01)
+        self.store.save(self.container, build_load(10), result)
+        self.assertIsNone(self.store.nearest(self.container, loads[2]))
+
+    def test_unwritable_store_keeps_the_result(self):
+        # A file can't be a directory, so the database can never be created
+        blocker = os.path.join(self.directory.name, "blocker")
+        open(blocker, "w").close()
+        store = SolutionStore(os.path.join(blocker, "solutions.sqlite3"))
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            store.save(self.container, build_load(3), {"placements": [(0, 0, 0, 0, 4, 3, 2)],
+                                                       "space_utilization": 50.0})
+        self.assertIn("Could not save the solution", output.getvalue())
+
+        payload = {"container": self.container, "items": build_load(12),
+                   "config": {"solver": "ga", "population_size": 6, "generations": 3, "seed": 3}}
+        with mock.patch.object(app, "solution_store", store), contextlib.redirect_stdout(io.StringIO()):
+            response = app.app.test_client().post('/optimize', json=payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["status"], "success")
+
+
+if __name__ == '__main__':
+    unittest.main()
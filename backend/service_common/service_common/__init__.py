@@ -0,0 +1 @@
+"""Request metrics, admission control and server settings shared by the optimizer and measurement services."""
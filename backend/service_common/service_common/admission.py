@@ -0,0 +1,80 @@
+import functools
+import math
+import threading
+import time
+from flask import Response, jsonify, request
+
+
+class ConcurrencyLimiter:
+    """Admits a bounded number of concurrent requests to an endpoint.
+
+    Requests beyond the limit wait for a slot up to queue_timeout seconds;
+    when the queue is full or the wait times out they get a fast 503 with a
+    Retry-After estimate instead of piling up until gunicorn kills them.
+    Queue waits and rejections are recorded in the service's RequestMetrics.
+    """
+
+    # Weight of the newest request in the running average of handling time
+    SMOOTHING = 0.2
+
+    def __init__(self, limit, queue_size, queue_timeout, error_body, metrics):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.error_body = error_body
+        self.metrics = metrics
+        self.slots = threading.BoundedSemaphore(limit)
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.average_duration = 1.0
+
+    def retry_after(self):
+        """Seconds until the current queue has likely drained."""
+        rounds = (self.waiting + self.limit) / self.limit
+        return max(1, math.ceil(self.average_duration * rounds))
+
+    def reject(self, reason):
+        self.metrics.rejected.labels(request.path, reason).inc()
+        response = jsonify(self.error_body)
+        response.status_code = 503
+        response.headers["Retry-After"] = str(self.retry_after())
+        return response
+
+    def __call__(self, view):
+        @functools.wraps(view)
+        def limited_view(*args, **kwargs):
+            with self.lock:
+                if self.waiting >= self.queue_size:
+                    return self.reject("queue_full")
+                self.waiting += 1
+            start = time.perf_counter()
+            try:
+                admitted = self.slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self.lock:
+                    self.waiting -= 1
+            self.metrics.queue_wait.labels(request.path).observe(time.perf_counter() - start)
+            if not admitted:
+                return self.reject("queue_timeout")
+
+            start = time.perf_counter()
+            try:
+                response = view(*args, **kwargs)
+            except BaseException:
+                self.release(start)
+                raise
+            if isinstance(response, Response) and response.is_streamed:
+                # A streamed body is produced after the view returns, so the
+                # slot is held until it has been sent
+                response.call_on_close(lambda: self.release(start))
+            else:
+                self.release(start)
+            return response
+
+        return limited_view
+
+    def release(self, start):
+        duration = time.perf_counter() - start
+        with self.lock:
+            self.average_duration += self.SMOOTHING * (duration - self.average_duration)
+        self.slots.release()
@@ -0,0 +1,77 @@
+import os
+import time
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+
+
+# Payload sizes from 256 bytes to 64 MiB in powers of four
+SIZE_BUCKETS = tuple(256 * 4 ** power for power in range(10))
+
+
+def registry():
+    """Registry to expose; under gunicorn every worker writes to the shared multiprocess directory."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+def endpoint_label():
+    # Route templates keep the label set small; unknown paths share one label
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+class RequestMetrics:
+    """Request metrics of one service, named after its prefix, and its /metrics endpoint."""
+
+    def __init__(self, prefix, latency_buckets):
+        self.request_latency = Histogram(f"{prefix}_request_duration_seconds", "Request latency",
+                                         ["endpoint", "method"], buckets=latency_buckets)
+        self.requests = Counter(f"{prefix}_requests_total", "Requests by response status",
+                                ["endpoint", "method", "status"])
+        self.in_flight = Gauge(f"{prefix}_requests_in_flight", "Requests being handled",
+                               ["endpoint"], multiprocess_mode="livesum")
+        self.request_size = Histogram(f"{prefix}_request_size_bytes", "Request body size",
+                                      ["endpoint"], buckets=SIZE_BUCKETS)
+        self.response_size = Histogram(f"{prefix}_response_size_bytes", "Response body size",
+                                       ["endpoint"], buckets=SIZE_BUCKETS)
+        self.queue_wait = Histogram(f"{prefix}_queue_wait_seconds", "Time spent waiting for a concurrency slot",
+                                    ["endpoint"], buckets=latency_buckets)
+        self.rejected = Counter(f"{prefix}_requests_rejected_total", "Requests turned away by admission control",
+                                ["endpoint", "reason"])
+
+    def init_app(self, app):
+        """Add request metrics and a Prometheus /metrics endpoint to a Flask app."""
+
+        @app.before_request
+        def start_request_metrics():
+            if request.endpoint == "metrics":
+                return
+            g.metrics_endpoint = endpoint_label()
+            g.metrics_start = time.perf_counter()
+            self.in_flight.labels(g.metrics_endpoint).inc()
+
+        @app.after_request
+        def record_request_metrics(response):
+            endpoint = g.get("metrics_endpoint")
+            if endpoint is None:
+                return response
+            self.request_latency.labels(endpoint, request.method).observe(
+                time.perf_counter() - g.metrics_start)
+            self.requests.labels(endpoint, request.method, response.status_code).inc()
+            self.request_size.labels(endpoint).observe(request.content_length or 0)
+            if response.content_length is not None:
+                self.response_size.labels(endpoint).observe(response.content_length)
+            return response
+
+        @app.teardown_request
+        def finish_request_metrics(error=None):
+            endpoint = g.pop("metrics_endpoint", None)
+            if endpoint is not None:
+                self.in_flight.labels(endpoint).dec()
+
+        @app.route('/metrics', methods=['GET'])
+        def metrics():
+            return Response(generate_latest(registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+from service_common.workers import DEFAULT_PORT, worker_count
+
+
+def gunicorn_settings(service):
+    """
+    gunicorn settings shared by the services, for a service's gunicorn.conf.py to
+    load with globals().update(). Also prepares the service's metrics directory.
+    """
+    # Workers write their metrics to files in a shared directory, so /metrics on any
+    # worker reports totals for the whole server. It must exist before the app
+    # imports prometheus_client, which a preloaded app does before any server hook
+    # runs, so it is set up here. Counts from a previous server are cleared, or they
+    # would be added to the new ones
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR",
+                          os.path.join(tempfile.gettempdir(), f"{service}-metrics"))
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+    return {
+        "workers": worker_count(),
+        "bind": f"0.0.0.0:{os.environ.get('PORT', DEFAULT_PORT)}",
+        # Threads accept requests while others run, so admission control in the app can
+        # queue or turn away the excess instead of leaving it in the socket backlog
+        "worker_class": "gthread",
+        "threads": int(os.environ.get("THREADS", 8)),
+        # Import the app once in the master, so workers fork with the heavy libraries
+        # already loaded and share those pages instead of each importing their own copy
+        "preload_app": os.environ.get("PRELOAD_APP", "1") != "0",
+        "child_exit": child_exit,
+    }
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,12 @@
+import os
+
+
+# gunicorn worker processes when WEB_CONCURRENCY isn't set
+DEFAULT_WORKERS = 4
+# Port a service binds when PORT isn't set; clients of a service default to it too
+DEFAULT_PORT = 8000
+
+
+def worker_count():
+    """Number of gunicorn worker processes, read the same way by the config and the pools it sizes."""
+    return int(os.environ.get("WEB_CONCURRENCY", DEFAULT_WORKERS))
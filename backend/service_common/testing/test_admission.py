@@ -0,0 +1,104 @@
+import threading
+import time
+import unittest
+from flask import Flask, Response, jsonify
+from service_common.admission import ConcurrencyLimiter
+from service_common.metrics import RequestMetrics
+
+
+METRICS = RequestMetrics("admission_test", (0.1, 1, 10))
+
+
+def wait_until(condition, timeout=5):
+    """Poll condition until it holds or timeout seconds pass; returns whether it held."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.limiter = ConcurrencyLimiter(1, 1, 0.2, {"status": "error", "message": "busy"}, METRICS)
+        app = Flask(__name__)
+
+        @app.route('/slow')
+        @self.limiter
+        def slow():
+            self.started.release()
+            self.release.wait(5)
+            return jsonify({"status": "success"})
+
+        @app.route('/stream')
+        @self.limiter
+        def stream():
+            def chunks():
+                yield "first\n"
+                self.release.wait(5)
+                yield "second\n"
+            return Response(chunks(), mimetype="text/plain")
+
+        self.client = app.test_client()
+
+    def request_in_background(self, responses):
+        thread = threading.Thread(target=lambda: responses.append(self.client.get('/slow')))
+        thread.start()
+        return thread
+
+    def test_rejects_when_queue_is_full(self):
+        self.limiter.queue_timeout = 5
+        responses = []
+        running = self.request_in_background(responses)
+        self.assertTrue(self.started.acquire(timeout=5))
+        waiting = self.request_in_background(responses)
+        # Let the second request take the only queue position
+        self.assertTrue(wait_until(lambda: self.limiter.waiting == 1))
+
+        response = self.client.get('/slow')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()["message"], "busy")
+        self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+
+        self.release.set()
+        running.join()
+        waiting.join()
+
+    def test_queued_request_times_out(self):
+        responses = []
+        running = self.request_in_background(responses)
+        self.assertTrue(self.started.acquire(timeout=5))
+
+        response = self.client.get('/slow')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+
+        self.release.set()
+        running.join()
+        self.assertEqual(responses[0].status_code, 200)
+
+    def test_admits_requests_up_to_the_limit(self):
+        self.release.set()
+        for _ in range(3):
+            self.assertEqual(self.client.get('/slow').status_code, 200)
+        self.assertEqual(self.limiter.waiting, 0)
+
+    def test_streamed_response_holds_its_slot_until_closed(self):
+        response = self.client.get('/stream', buffered=False)
+        self.assertEqual(next(response.response), b"first\n")
+
+        # The body is still being produced, so the slot is taken
+        self.assertEqual(self.client.get('/slow').status_code, 503)
+
+        self.release.set()
+        self.assertEqual(b"".join(response.response), b"second\n")
+        response.close()
+        self.assertEqual(self.client.get('/slow').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import urllib.request
+
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SERVICES = ("optimizer", "measurement_system")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestGunicornStartup(unittest.TestCase):
+    """Starts each service with its gunicorn.conf.py, as its Procfile does."""
+
+    def start(self, service, metrics_directory, data_directory):
+        port = free_port()
+        env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY="1", THREADS="2",
+                   PROMETHEUS_MULTIPROC_DIR=metrics_directory,
+                   MEASUREMENT_DB=os.path.join(data_directory, "measurements.sqlite3"),
+                   SOLUTION_DB=os.path.join(data_directory, "solutions.sqlite3"),
+                   CHECKPOINT_DIR=os.path.join(data_directory, "checkpoints"))
+        server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                                  cwd=os.path.join(BACKEND_DIRECTORY, service), env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self.addCleanup(server.stderr.close)
+
+        status = None
+        deadline = time.time() + 60
+        try:
+            while status is None and time.time() < deadline and server.poll() is None:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                        status = response.status
+                except OSError:
+                    time.sleep(0.2)
+        finally:
+            server.terminate()
+            _, errors = server.communicate(timeout=30)
+        return status, errors.decode(errors="replace")[-2000:]
+
+    def test_starts_without_a_metrics_directory(self):
+        for service in SERVICES:
+            with self.subTest(service=service):
+                directory = tempfile.TemporaryDirectory()
+                self.addCleanup(directory.cleanup)
+                metrics_directory = os.path.join(directory.name, "missing", "metrics")
+
+                status, errors = self.start(service, metrics_directory, directory.name)
+
+                self.assertEqual(status, 200, errors)
+                self.assertTrue(os.path.isdir(metrics_directory))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,20 @@
+import os
+import unittest
+from unittest import mock
+from service_common.workers import DEFAULT_WORKERS, worker_count
+
+
+class TestWorkerCount(unittest.TestCase):
+
+    def test_default_matches_gunicorn(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("WEB_CONCURRENCY", None)
+            self.assertEqual(worker_count(), DEFAULT_WORKERS)
+
+    def test_reads_web_concurrency(self):
+        with mock.patch.dict(os.environ, WEB_CONCURRENCY="3"):
+            self.assertEqual(worker_count(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
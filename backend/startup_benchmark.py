@@ -0,0 +1,97 @@
+"""Measure import time and per-worker memory of the optimizer and measurement services.
+
+Usage: python startup_benchmark.py [--workers 4] [--runs 5] [--no-preload]
+
+Import time is the median of fresh interpreters importing app.py. Memory is
+read from /proc for every gunicorn worker: RSS counts pages shared with the
+master, PSS splits shared pages between the processes using them, so it is the
+better measure of what each extra worker costs.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+SERVICES = ("optimizer", "measurement_system")
+BACKEND_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_time(service, runs):
+    """Median seconds for a fresh interpreter to import the service's app module."""
+    code = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(BACKEND_DIRECTORY, service),
+                                capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def memory_kib(pid):
+    """Rss and Pss of a process in KiB, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as smaps:
+        for line in smaps:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0])
+    return values
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def worker_memory(service, workers, preload):
+    """Start gunicorn, wait for its workers to boot and report their memory."""
+    env = dict(os.environ, PORT=str(free_port()), WEB_CONCURRENCY=str(workers),
+               PRELOAD_APP="1" if preload else "0")
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    server = subprocess.Popen(command, cwd=os.path.join(BACKEND_DIRECTORY, service), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # Workers log "Booting worker" before importing the app, so wait until
+        # their memory stops growing
+        deadline = time.time() + 60
+        pids, previous = [], None
+        while time.time() < deadline:
+            time.sleep(1)
+            children = f"/proc/{server.pid}/task/{server.pid}/children"
+            with open(children) as children_file:
+                pids = [int(pid) for pid in children_file.read().split()]
+            if len(pids) == workers:
+                current = [memory_kib(pid)["Rss"] for pid in pids]
+                if current == previous:
+                    break
+                previous = current
+        return {"master": memory_kib(server.pid), "workers": [memory_kib(pid) for pid in pids]}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-preload", action="store_true", help="fork workers before importing the app")
+    args = parser.parse_args()
+
+    for service in SERVICES:
+        seconds = import_time(service, args.runs)
+        memory = worker_memory(service, args.workers, not args.no_preload)
+        workers = memory["workers"]
+        print(f"{service}: import {seconds * 1000:.0f} ms, "
+              f"master RSS {memory['master']['Rss'] / 1024:.1f} MiB, "
+              f"worker RSS {statistics.mean(w['Rss'] for w in workers) / 1024:.1f} MiB, "
+              f"worker PSS {statistics.mean(w['Pss'] for w in workers) / 1024:.1f} MiB, "
+              f"total PSS {(memory['master']['Pss'] + sum(w['Pss'] for w in workers)) / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()